@@ -0,0 +1,264 @@
+# --- Dificultad Adaptativa (modelo de Rasch en línea) ---
+# Estima para cada usuario una habilidad por tema (theta) y para cada tarjeta
+# una dificultad (b); la probabilidad de acierto es sigmoide(theta - b). Cada
+# respuesta ajusta ambos parámetros con un paso tipo Elo, cuyo tamaño decrece
+# con el número de respuestas ya vistas: O(1) por respuesta, sin recorrer el
+# historial.
+#
+# La latencia matiza el resultado: un acierto lento (respecto al tiempo
+# habitual del usuario en ese tema) cuenta algo menos que uno rápido.
+#
+# Con el modelo se ordenan las tarjetas de estudio (primero las de
+# probabilidad de acierto cercana a P_OBJETIVO, ni triviales ni imposibles) y
+# se elige el nivel de dificultad que se pide al generar un mazo nuevo.
+#
+# Los parámetros viven en arrays NumPy (uno por magnitud) y se persisten en
+# las tablas `adaptativo_tarjetas` y `adaptativo_temas` de la base de datos de
+# la biblioteca; al borrar un mazo, sus tarjetas se borran en cascada.
+
+import math
+import sqlite3
+import threading
+
+import numpy as np
+
+from estadisticas import tema_de_mazo
+
+# Probabilidad de acierto a la que se apunta al ordenar y al generar.
+P_OBJETIVO = 0.7
+# Paso inicial del ajuste y su decaimiento con las respuestas acumuladas.
+PASO_INICIAL = 0.6
+PASO_MINIMO = 0.05
+DECAIMIENTO_PASO = 0.1
+# Un acierto cuatro veces más lento que lo habitual cuenta como 1 - PESO_LENTITUD.
+PESO_LENTITUD = 0.3
+FACTOR_LENTITUD_MAXIMO = 4.0
+# Media móvil exponencial del log de la latencia por tema.
+SUAVIZADO_LATENCIA = 0.1
+LATENCIA_MINIMA = 0.5
+LATENCIA_MAXIMA = 600.0
+# Habilidad (theta) a partir de la cual se pide cada nivel al generar.
+UMBRALES_NIVEL = ((-0.5, "Fácil"), (0.75, "Medio"), (math.inf, "Difícil"))
+# Clave de la habilidad global (temas sin historial).
+TEMA_GLOBAL = ""
+_CAPACIDAD_INICIAL = 64
+
+
+def sigmoide(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def paso(respuestas):
+    """Tamaño del paso de ajuste tras `respuestas` respuestas (escalar o array)."""
+    return np.maximum(PASO_MINIMO, PASO_INICIAL / (1.0 + DECAIMIENTO_PASO * np.asarray(respuestas)))
+
+
+class AlmacenAdaptativo:
+    """Persistencia de los parámetros del modelo en la base de datos de la biblioteca."""
+
+    def __init__(self, ruta):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(ruta, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS adaptativo_tarjetas (
+                tarjeta_id INTEGER PRIMARY KEY REFERENCES tarjetas(id) ON DELETE CASCADE,
+                dificultad REAL NOT NULL,
+                respuestas INTEGER NOT NULL,
+                aciertos INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS adaptativo_temas (
+                usuario TEXT NOT NULL,
+                tema TEXT NOT NULL,
+                habilidad REAL NOT NULL,
+                respuestas INTEGER NOT NULL,
+                aciertos INTEGER NOT NULL,
+                log_latencia REAL NOT NULL,
+                PRIMARY KEY (usuario, tema)
+            );
+            """
+        )
+        self._db.commit()
+
+    def cargar(self, usuario):
+        """(filas de tarjetas, filas de temas) del usuario."""
+        with self._lock:
+            tarjetas = self._db.execute(
+                "SELECT a.tarjeta_id, a.dificultad, a.respuestas, a.aciertos FROM adaptativo_tarjetas a"
+                " JOIN tarjetas t ON t.id = a.tarjeta_id JOIN mazos m ON m.id = t.mazo_id"
+                " WHERE m.usuario = ?",
+                (usuario,),
+            ).fetchall()
+            temas = self._db.execute(
+                "SELECT tema, habilidad, respuestas, aciertos, log_latencia FROM adaptativo_temas WHERE usuario = ?",
+                (usuario,),
+            ).fetchall()
+        return tarjetas, temas
+
+    def guardar(self, usuario, tarjeta, temas):
+        """Guarda en una transacción la fila de la tarjeta (o None) y las de los temas."""
+        with self._lock, self._db:
+            if tarjeta is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO adaptativo_tarjetas (tarjeta_id, dificultad, respuestas, aciertos)"
+                    " VALUES (?, ?, ?, ?)",
+                    tarjeta,
+                )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO adaptativo_temas"
+                " (usuario, tema, habilidad, respuestas, aciertos, log_latencia) VALUES (?, ?, ?, ?, ?, ?)",
+                [(usuario,) + fila for fila in temas],
+            )
+
+    def olvidar_usuarios(self, usuarios):
+        """Borra las habilidades por tema de esos usuarios (las dificultades por tarjeta se borran con sus mazos)."""
+        with self._lock, self._db:
+            self._db.executemany("DELETE FROM adaptativo_temas WHERE usuario = ?", [(u,) for u in usuarios])
+
+
+class _Parametros:
+    """Columnas NumPy de longitud creciente con un índice clave -> fila."""
+
+    def __init__(self, columnas):
+        self.filas = {}
+        self.columnas = {nombre: np.zeros(_CAPACIDAD_INICIAL, dtype) for nombre, dtype in columnas.items()}
+
+    def fila(self, clave):
+        """Fila de la clave, creándola (con ceros) si no existe. O(1) amortizado."""
+        fila = self.filas.get(clave)
+        if fila is None:
+            fila = self.filas[clave] = len(self.filas)
+            if fila == len(self.columnas["respuestas"]):
+                for nombre, valores in self.columnas.items():
+                    self.columnas[nombre] = np.concatenate((valores, np.zeros_like(valores)))
+        return fila
+
+    def __getitem__(self, nombre):
+        return self.columnas[nombre]
+
+
+class MotorAdaptativo:
+    """Modelo de Rasch de un usuario: habilidad por tema y dificultad por tarjeta."""
+
+    def __init__(self, almacen=None, usuario=""):
+        self.almacen = almacen
+        self.usuario = usuario
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Vuelve a cargar los parámetros guardados (p. ej. tras eliminar un mazo)."""
+        tarjetas = _Parametros({"dificultad": np.float64, "respuestas": np.int64, "aciertos": np.int64})
+        temas = _Parametros({"habilidad": np.float64, "respuestas": np.int64, "aciertos": np.int64,
+                             "log_latencia": np.float64})
+        if self.almacen is not None:
+            filas_tarjetas, filas_temas = self.almacen.cargar(self.usuario)
+            for tarjeta_id, *valores in filas_tarjetas:
+                fila = tarjetas.fila(tarjeta_id)
+                for nombre, valor in zip(("dificultad", "respuestas", "aciertos"), valores):
+                    tarjetas[nombre][fila] = valor
+            for tema, *valores in filas_temas:
+                fila = temas.fila(tema)
+                for nombre, valor in zip(("habilidad", "respuestas", "aciertos", "log_latencia"), valores):
+                    temas[nombre][fila] = valor
+        with self._lock:
+            self._tarjetas, self._temas = tarjetas, temas
+
+    # --- Ajuste en línea ---
+    def _resultado(self, fila_tema, correcta, latencia):
+        """Resultado en [0, 1]: 0 si falla; 1 si acierta, rebajado si tardó más de lo habitual."""
+        if not correcta:
+            return 0.0
+        if latencia is None or not self._temas["respuestas"][fila_tema]:
+            return 1.0
+        exceso = math.log(max(LATENCIA_MINIMA, min(latencia, LATENCIA_MAXIMA))) - self._temas["log_latencia"][fila_tema]
+        return 1.0 - PESO_LENTITUD * min(1.0, max(0.0, exceso / math.log(FACTOR_LENTITUD_MAXIMO)))
+
+    def registrar(self, tarjeta_id, mazo, correcta, latencia=None):
+        """Ajusta la dificultad de la tarjeta y la habilidad del usuario en el tema del mazo. O(1)."""
+        tema = tema_de_mazo(mazo)
+        with self._lock:
+            temas, tarjetas = self._temas, self._tarjetas
+            filas_temas = (temas.fila(tema), temas.fila(TEMA_GLOBAL))
+            fila_tarjeta = tarjetas.fila(tarjeta_id) if tarjeta_id is not None else None
+            dificultad = tarjetas["dificultad"][fila_tarjeta] if fila_tarjeta is not None else 0.0
+            habilidad = temas["habilidad"][filas_temas[0]]
+            error = self._resultado(filas_temas[0], correcta, latencia) - sigmoide(habilidad - dificultad)
+
+            for fila in filas_temas:
+                temas["habilidad"][fila] += paso(temas["respuestas"][fila]) * error
+                if latencia is not None:
+                    log_latencia = math.log(max(LATENCIA_MINIMA, min(latencia, LATENCIA_MAXIMA)))
+                    anterior = temas["log_latencia"][fila]
+                    temas["log_latencia"][fila] = (
+                        log_latencia if not temas["respuestas"][fila]
+                        else anterior + SUAVIZADO_LATENCIA * (log_latencia - anterior)
+                    )
+                temas["respuestas"][fila] += 1
+                temas["aciertos"][fila] += bool(correcta)
+            fila_guardar = None
+            if fila_tarjeta is not None:
+                tarjetas["dificultad"][fila_tarjeta] -= paso(tarjetas["respuestas"][fila_tarjeta]) * error
+                tarjetas["respuestas"][fila_tarjeta] += 1
+                tarjetas["aciertos"][fila_tarjeta] += bool(correcta)
+                fila_guardar = (tarjeta_id, float(tarjetas["dificultad"][fila_tarjeta]),
+                                int(tarjetas["respuestas"][fila_tarjeta]), int(tarjetas["aciertos"][fila_tarjeta]))
+            filas_temas_guardar = [
+                (clave, float(temas["habilidad"][fila]), int(temas["respuestas"][fila]),
+                 int(temas["aciertos"][fila]), float(temas["log_latencia"][fila]))
+                for clave, fila in zip((tema, TEMA_GLOBAL), filas_temas)
+            ]
+        if self.almacen is not None:
+            self.almacen.guardar(self.usuario, fila_guardar, filas_temas_guardar)
+        return float(error)
+
+    # --- Consultas ---
+    def _habilidad(self, tema):
+        """Habilidad en el tema; la global si el tema aún no tiene respuestas."""
+        fila = self._temas.filas.get(tema)
+        if fila is None or not self._temas["respuestas"][fila]:
+            fila = self._temas.filas.get(TEMA_GLOBAL)
+        return float(self._temas["habilidad"][fila]) if fila is not None else 0.0
+
+    def probabilidades(self, tarjetas):
+        """Probabilidad estimada de acertar cada tarjeta (objetos Tarjeta), vectorizada."""
+        with self._lock:
+            filas = np.fromiter((self._tarjetas.filas.get(t.id, -1) for t in tarjetas), np.int64, len(tarjetas))
+            dificultad = np.where(filas >= 0, self._tarjetas["dificultad"][np.maximum(filas, 0)], 0.0)
+            habilidad_por_tema = {}
+            habilidad = np.fromiter(
+                (habilidad_por_tema.setdefault(t.mazo, self._habilidad(tema_de_mazo(t.mazo or "Sin mazo")))
+                 for t in tarjetas),
+                np.float64, len(tarjetas),
+            )
+        return sigmoide(habilidad - dificultad)
+
+    def orden(self, tarjetas):
+        """Índices de las tarjetas de más a menos cercanas a P_OBJETIVO (a igualdad, en su orden original)."""
+        if not len(tarjetas):
+            return np.arange(0)
+        return np.argsort(np.abs(self.probabilidades(tarjetas) - P_OBJETIVO), kind="stable")
+
+    def ordenar(self, tarjetas):
+        """Tarjetas ordenadas según `orden`."""
+        return [tarjetas[i] for i in self.orden(tarjetas)]
+
+    def nivel(self, tema):
+        """(nivel de dificultad, probabilidad estimada de acierto, respuestas) para generar sobre un tema."""
+        with self._lock:
+            habilidad = self._habilidad(tema)
+            fila = self._temas.filas.get(tema)
+            respuestas = int(self._temas["respuestas"][fila]) if fila is not None else 0
+        nivel = next(nombre for umbral, nombre in UMBRALES_NIVEL if habilidad < umbral)
+        return nivel, float(sigmoide(habilidad)), respuestas
+
+    def dificultad_generacion(self, tema):
+        """Texto de nivel para el prompt de generación, ajustado al historial del usuario en el tema."""
+        nivel, probabilidad, respuestas = self.nivel(tema)
+        if not respuestas and TEMA_GLOBAL not in self._temas.filas:
+            return f"{nivel} (adaptativo: aún no hay respuestas del estudiante)"
+        return (
+            f"{nivel} (adaptativo: el estudiante acierta aproximadamente el {probabilidad:.0%} de las preguntas "
+            f"de dificultad media sobre '{tema}'; ajusta la dificultad para que acierte en torno al {P_OBJETIVO:.0%})"
+        )
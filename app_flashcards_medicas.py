@@ -1,13 +1,33 @@
 import streamlit as st
-from PIL import Image
-import fitz  # PyMuPDF
-from pptx import Presentation
-import pandas as pd
+import hashlib
 import io
-import google.generativeai as genai
+import os
 import json
 import random # Importar random
-import plotly.graph_objects as go # Importar Plotly
+import tempfile
+import time
+import uuid
+from itertools import chain
+from cache_extraccion import CacheExtraccion
+from generacion import iterar_preguntas
+from backends import BACKEND_LOCAL, crear_backend, leer_configuracion, requiere_api_key, tipo_backend
+from cliente_modelo import ClienteModelo
+from biblioteca import BibliotecaMazos
+from mazos_compartidos import AlmacenMazos, ManejadorMazo
+from modelo_tarjetas import Respuesta
+from repaso import AlmacenRepasos, PlanificadorRepaso
+from estadisticas import RegistroRespuestas, tema_de_mazo
+from adaptativo import AlmacenAdaptativo, MotorAdaptativo
+from ingesta import combinar_corpus, expandir_archivos, iterar_ingesta
+from documento import DocumentoTexto
+from ocr import contar_paginas_sin_ocr
+from verificacion import InformeVerificacion, crear_cache_informes, verificar_secciones
+from recuperacion import AlmacenIndices, buscar_fragmentos
+from duplicados import UMBRAL_SIMILITUD, DetectorDuplicados
+from intercambio import EXTENSION, ErrorIntercambio, exportar_anki, exportar_biblioteca, importar_biblioteca
+from cola_trabajos import CANCELADO, FALLIDO, PRIORIDAD_INTERACTIVA, PRIORIDAD_LOTE, ColaTrabajos
+import instrumentacion
+from instrumentacion import RegistroTiempos, tramo
 
 # --- FRASES MOTIVACIONALES ---
 STOIC_QUOTES = [
@@ -19,6 +39,21 @@ STOIC_QUOTES = [
     "“El éxito es la suma de pequeños esfuerzos repetidos día tras día.” — Robert Collier"
 ]
 
+# Tarjetas vencidas que se cargan en cada sesión de repaso.
+TARJETAS_POR_REPASO = 20
+# Tope del número de pendientes que se cuenta y muestra en el botón de repaso.
+MAX_PENDIENTES_MOSTRADOS = 99
+# Fragmentos del corpus que se envían a Gemini al generar sobre un tema concreto.
+FRAGMENTOS_POR_TEMA = 12
+# Sesiones sin nombre: prefijo de su usuario y horas sin actividad tras las que se borran sus datos.
+PREFIJO_ANONIMO = "anonimo:"
+CADUCIDAD_ANONIMOS = 24 * 3600  # segundos
+INTERVALO_ACTIVIDAD = 10 * 60   # cada cuánto anota su actividad una sesión anónima
+# Usuarios con planificador, detector de duplicados y modelo adaptativo en memoria
+# (cada uno abre su conexión a SQLite); los que salen se recargan de disco al volver.
+MAX_USUARIOS_EN_MEMORIA = 200
+TTL_USUARIO_EN_MEMORIA = 3600  # segundos
+
 # --- Configuración de la Página ---
 st.set_page_config(
     page_title="Med-Flash AI",
@@ -27,160 +62,96 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
+# --- Instrumentación ---
+# Cada rerun mide sus partes; los tiempos van al registro del proceso y al de la sesión.
+inicio_rerun = time.perf_counter()
+if 'tiempos' not in st.session_state:
+    st.session_state.tiempos = RegistroTiempos()
+instrumentacion.activar_sesion(st.session_state.tiempos)
+
 # --- ESTILOS CSS ---
-st.markdown("""
-<style>
-    /* Paleta de colores */
-    :root {
-        --primary-color: #F5A6C1; /* Rosa Principal */
-        --secondary-color: #E0E0E0; /* Gris Claro */
-        --text-color: #4A4A4A; /* Gris Oscuro */
-        --bg-color: #FFFFFF; /* Blanco */
-        --dark-bg: #1E1E1E; /* Fondo oscuro opcional */
-        --dark-text: #F0F0F0; /* Texto claro opcional */
-    }
+# Los estilos y el SVG de la barra lateral viven en static/ y se sirven como
+# archivos estáticos (server.enableStaticServing en .streamlit/config.toml):
+# cada rerun solo envía un @import o un <img> que el navegador resuelve desde
+# su caché. Si el servidor no sirve static/, se incrustan (leídos una vez).
+RUTA_ESTATICOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
 
-    /* Estilo para tema oscuro (preferido por Streamlit) */
-    body {
-        background-color: var(--dark-bg);
-        color: var(--dark-text);
-    }
-    
-    /* Contenedor principal */
-    .stApp {
-        background-color: var(--dark-bg);
-    }
+@st.cache_resource
+def leer_estatico(nombre):
+    """Contenido de un archivo de static/ y su versión (hash), leídos una vez por proceso."""
+    with open(os.path.join(RUTA_ESTATICOS, nombre), encoding="utf-8") as f:
+        contenido = f.read()
+    return contenido, hashlib.sha256(contenido.encode("utf-8")).hexdigest()[:12]
 
-    /* Barra lateral */
-    [data-testid="stSidebar"] {
-        background-color: #2F2F2F;
-        border-right: 2px solid var(--primary-color);
-    }
-    [data-testid="stSidebar"] .stButton button {
-        background-color: transparent;
-        color: var(--dark-text);
-        border: 2px solid var(--primary-color);
-        border-radius: 12px;
-        width: 100%;
-        margin-bottom: 10px;
-    }
-    [data-testid="stSidebar"] .stButton button:hover {
-        background-color: var(--primary-color);
-        color: var(--text-color);
-        border-color: var(--primary-color);
-    }
-    [data-testid="stSidebar"] .stRadio > label {
-        color: var(--dark-text) !important;
-    }
+def url_estatico(nombre):
+    """URL de un archivo de static/; la versión evita que el navegador use una copia vieja."""
+    return f"app/static/{nombre}?v={leer_estatico(nombre)[1]}"
 
-    /* Botones principales */
-    .stButton > button {
-        background-color: var(--primary-color);
-        color: var(--text-color);
-        font-weight: bold;
-        border-radius: 12px;
-        padding: 10px 20px;
-        border: none;
-    }
-    .stButton > button:hover {
-        background-color: #F7BACF;
-        color: var(--text-color);
-    }
+with tramo("rerun.estilos"):
+    if st.get_option("server.enableStaticServing"):
+        st.html(f"<style>@import url('{url_estatico('estilos.css')}');</style>")
+    else:
+        st.html(f"<style>{leer_estatico('estilos.css')[0]}</style>")
 
-    /* Estilo de Tarjetas (Flashcards) */
-    .flashcard {
-        background-color: #2F2F2F; /* Fondo de tarjeta oscuro */
-        border-radius: 12px;
-        padding: 24px;
-        margin-top: 20px;
-        margin-bottom: 20px;
-        box-shadow: 0 4px 12px rgba(0,0,0,0.4);
-        border: 1px solid #4A4A4A;
-        color: var(--dark-text); /* Texto dentro de la tarjeta */
-    }
-    .flashcard h5 {
-        color: var(--primary-color); /* Título de la pregunta en rosa */
-        margin-bottom: 15px;
-        font-size: 1.25rem;
-    }
+# --- Recursos Compartidos (por proceso) ---
+@st.cache_resource
+def obtener_cache_extraccion():
+    """Caché de texto extraído compartida por todas las sesiones."""
+    return CacheExtraccion()
 
-    /* Cajas de Alerta (Info, Success, Error) */
-    [data-testid="stAlert"] {
-        border-radius: 12px;
-    }
-    [data-testid="stAlert"] [data-testid="stMarkdownContainer"] p {
-        color: #000; /* Texto oscuro para mejor legibilidad en alertas */
-    }
+@st.cache_resource
+def obtener_almacen_indices():
+    """Índices de recuperación por fuente, compartidos y persistidos junto a la caché de extracción."""
+    return AlmacenIndices()
 
-    /* Contenedores de Feedback (más coloridos) */
-    .feedback-correct {
-        background-color: #2F2F2F;
-        border: 2px solid #28a745; /* Verde */
-        border-radius: 12px;
-        padding: 16px;
-        margin-top: 10px;
-        color: #F0F0F0;
-    }
-    .feedback-incorrect {
-        background-color: #2F2F2F;
-        border: 2px solid #dc3545; /* Rojo */
-        border-radius: 12px;
-        padding: 16px;
-        margin-top: 10px;
-        color: #F0F0F0;
-    }
-    .feedback-explanation {
-        background-color: #2F2F2F;
-        border: 2px solid #17a2b8; /* Azul info */
-        border-radius: 12px;
-        padding: 16px;
-        margin-top: 10px;
-        color: #F0F0F0;
-    }
+@st.cache_resource
+def obtener_cola_trabajos():
+    """Cola de trabajos del LLM (prioridades, límite de peticiones y reintentos) del proceso."""
+    return ColaTrabajos()
 
-    /* Contenedor de "Doodle" (Ahora con SVG) */
-    .doodle-container {
-        width: 100%;
-        height: 150px;
-        background-color: var(--primary-color);
-        border-radius: 12px;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        margin-bottom: 20px;
-        padding: 10px;
-    }
-    .doodle-container svg {
-        max-width: 80%;
-        max-height: 80%;
-        fill: var(--text-color); /* Color de relleno para el SVG */
-    }
-</style>
-""", unsafe_allow_html=True)
-
-# --- Funciones de Extracción ---
-def extraer_texto_pdf(file_stream):
-    try:
-        doc = fitz.open(stream=file_stream.read(), filetype="pdf")
-        texto = ""
-        for page in doc:
-            texto += page.get_text()
-        doc.close()
-        return texto
-    except Exception as e:
-        return f"Error al procesar PDF: {e}"
-
-def extraer_texto_pptx(file_stream):
-    try:
-        prs = Presentation(file_stream)
-        texto = ""
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if hasattr(shape, "text"):
-                    texto += shape.text + "\n"
-        return texto
-    except Exception as e:
-        return f"Error al procesar PPTX: {e}"
+@st.cache_resource
+def obtener_cliente_modelo():
+    """Cliente del modelo (con caché de respuestas) creado una sola vez por proceso.
+
+    El backend (Gemini o el sustituto local) se elige con MEDFLASH_BACKEND en el
+    entorno o en los Secrets.
+    """
+    return ClienteModelo(crear_backend(leer_configuracion(st.secrets)), cola=obtener_cola_trabajos())
+
+@st.cache_resource
+def obtener_cache_informes():
+    """Informes de verificación por sección (bajo el hash de su texto), compartidos por el proceso."""
+    return crear_cache_informes()
+
+@st.cache_resource
+def obtener_biblioteca():
+    """Biblioteca de mazos en disco compartida por todas las sesiones."""
+    return BibliotecaMazos()
+
+@st.cache_resource
+def obtener_almacen_mazos():
+    """Mazos abiertos, una copia inmutable por contenido compartida por todas las sesiones."""
+    return AlmacenMazos()
+
+@st.cache_resource(max_entries=MAX_USUARIOS_EN_MEMORIA, ttl=TTL_USUARIO_EN_MEMORIA)
+def obtener_planificador(usuario):
+    """Planificador de repaso espaciado de un usuario, compartido entre sus sesiones."""
+    return PlanificadorRepaso(AlmacenRepasos(obtener_biblioteca().ruta), usuario)
+
+@st.cache_resource(max_entries=MAX_USUARIOS_EN_MEMORIA, ttl=TTL_USUARIO_EN_MEMORIA)
+def obtener_detector_duplicados(usuario):
+    """Índice MinHash/LSH de las tarjetas de un usuario, compartido entre sus sesiones."""
+    return DetectorDuplicados(obtener_biblioteca().ruta, usuario)
+
+@st.cache_resource
+def obtener_registro_respuestas():
+    """Registro columnar de respuestas y sus agregados, compartido por el proceso."""
+    return RegistroRespuestas()
+
+@st.cache_resource(max_entries=MAX_USUARIOS_EN_MEMORIA, ttl=TTL_USUARIO_EN_MEMORIA)
+def obtener_motor_adaptativo(usuario):
+    """Modelo adaptativo (habilidad por tema, dificultad por tarjeta) de un usuario, compartido entre sus sesiones."""
+    return MotorAdaptativo(AlmacenAdaptativo(obtener_biblioteca().ruta), usuario)
 
 # --- Estado de Sesión ---
 if 'page' not in st.session_state:
@@ -188,10 +159,20 @@ if 'page' not in st.session_state:
 # 'api_key' ya no se guarda en session_state
 if 'user_name' not in st.session_state:
     st.session_state.user_name = ""
-if 'extracted_content' not in st.session_state:
-    st.session_state.extracted_content = None
-if 'flashcard_library' not in st.session_state:
-    st.session_state.flashcard_library = {} # Biblioteca para guardar mazos
+if 'id_anonimo' not in st.session_state:
+    st.session_state.id_anonimo = f"{PREFIJO_ANONIMO}{uuid.uuid4().hex}" # Biblioteca privada de la sesión sin nombre
+if 'corpus' not in st.session_state:
+    st.session_state.corpus = {} # Fuente (nombre de archivo) -> DocumentoTexto en disco, no el texto en sí
+if 'subidas_procesadas' not in st.session_state:
+    st.session_state.subidas_procesadas = set() # file_id de los archivos subidos ya procesados (o fallidos)
+if 'fallos_ingesta' not in st.session_state:
+    st.session_state.fallos_ingesta = {} # Fuente -> error de extracción
+if 'indices' not in st.session_state:
+    st.session_state.indices = {} # Fuente -> IndiceFuente (compartido con otras sesiones)
+# Los mazos viven en la biblioteca en disco (ver obtener_biblioteca); en la
+# sesión solo se guarda el mazo activo ('current_exam'): un ManejadorMazo
+# (tarjetas compartidas con otras sesiones, ids y orden propios) o, en el
+# repaso de pendientes, una lista de tarjetas sueltas.
 if 'current_exam' not in st.session_state:
     st.session_state.current_exam = None
 if 'current_question_index' not in st.session_state:
@@ -202,6 +183,15 @@ if 'show_explanation' not in st.session_state:
     st.session_state.show_explanation = False
 if 'exam_results' not in st.session_state:
     st.session_state.exam_results = []
+# Los trabajos del LLM corren en la cola del proceso; la sesión solo guarda su id.
+if 'trabajo_verificacion' not in st.session_state:
+    st.session_state.trabajo_verificacion = None
+if 'trabajo_generacion' not in st.session_state:
+    st.session_state.trabajo_generacion = None
+if 'trabajo_celebrado' not in st.session_state:
+    st.session_state.trabajo_celebrado = None
+if 'question_started_at' not in st.session_state:
+    st.session_state.question_started_at = None # (índice, instante) para medir la latencia
 
 # --- Funciones de Callback ---
 def go_to_next_question():
@@ -212,45 +202,262 @@ def go_to_next_question():
 
 def restart_exam():
     """Reinicia el examen limpiando el estado."""
+    if isinstance(st.session_state.current_exam, ManejadorMazo):
+        st.session_state.current_exam.liberar()
     st.session_state.current_exam = None
     st.session_state.current_question_index = 0
     st.session_state.user_answer = None
     st.session_state.show_explanation = False
     st.session_state.exam_results = []
+    st.session_state.question_started_at = None
+
+def quitar_tarjeta_actual():
+    """Quita la tarjeta actual del mazo del usuario; la sesión pasa a su propia copia del mazo."""
+    exam = st.session_state.current_exam
+    idx = st.session_state.current_question_index
+    card = exam[idx]
+    exam.quitar(idx)
+    obtener_biblioteca().quitar_tarjeta(card.id)
+    obtener_planificador(usuario_actual()).olvidar(card.id)
+    obtener_detector_duplicados(usuario_actual()).reiniciar()
+    # La siguiente tarjeta ocupa su lugar: se descarta la respuesta dada a la quitada.
+    st.session_state.exam_results.pop(idx)
+    st.session_state.pop(f"user_answer_{idx}", None)
+    st.session_state.user_answer = None
+    st.session_state.show_explanation = False
+    st.session_state.question_started_at = None
+
+def modo_adaptativo():
+    """True si la dificultad elegida es "Automático (Adaptativo)" (la opción por defecto)."""
+    return st.session_state.get("difficulty", "Automático").startswith("Automático")
+
+def usuario_actual():
+    """Usuario con el que se agrupan los mazos y el progreso.
+
+    Sin nombre, cada sesión usa su propio id anónimo: sus mazos son privados y
+    no se recuperan en otra sesión.
+    """
+    return st.session_state.user_name.strip() or st.session_state.id_anonimo
+
+def seleccionar_fuentes(key):
+    """Permite elegir qué fuentes del corpus usar y devuelve sus nombres."""
+    nombres = list(st.session_state.corpus)
+    if len(nombres) > 1:
+        nombres = st.multiselect("Fuentes a utilizar:", options=nombres, default=nombres, key=key)
+    return nombres
+
+def texto_de_fuentes(nombres):
+    """Lee de disco el texto combinado de las fuentes (solo cuando se va a enviar a la IA)."""
+    return combinar_corpus({nombre: st.session_state.corpus[nombre].leer() for nombre in nombres}, nombres)
+
+def indice_de(nombre):
+    """Índice de recuperación de una fuente (se construye al cargarla; aquí solo si falta)."""
+    if nombre not in st.session_state.indices:
+        st.session_state.indices[nombre] = obtener_almacen_indices().indexar(st.session_state.corpus[nombre].leer())
+    return st.session_state.indices[nombre]
+
+def texto_relevante(nombres, tema, k=FRAGMENTOS_POR_TEMA):
+    """Texto de los k fragmentos más relevantes para el tema, en el orden del documento."""
+    resultados = buscar_fragmentos([indice_de(nombre) for nombre in nombres], tema, k)
+    por_fuente = {}
+    for fuente, fragmento, _ in sorted(resultados):
+        nombre = nombres[fuente]
+        inicio, fin = st.session_state.indices[nombre].posiciones[fragmento]
+        por_fuente.setdefault(nombre, []).append(st.session_state.corpus[nombre].leer(inicio, fin).strip())
+    seleccion = {nombre: "\n\n[...]\n\n".join(trozos) for nombre, trozos in por_fuente.items()}
+    return combinar_corpus(seleccion, list(seleccion)) if seleccion else ""
+
+def mostrar_documento(documento, key):
+    """Visor paginado: solo la ventana actual del documento se envía al navegador."""
+    clave_pagina, clave_desde = f"{key}_pagina", f"{key}_desde"
+    if clave_pagina not in st.session_state:
+        st.session_state[clave_pagina] = 0
+        st.session_state[clave_desde] = 0
+
+    col_ant, col_pag, col_sig = st.columns([1, 2, 1])
+    with col_ant:
+        if st.button("◀ Anterior", key=f"{key}_ant", disabled=st.session_state[clave_pagina] <= 0):
+            st.session_state[clave_pagina] -= 1
+    with col_sig:
+        if st.button("Siguiente ▶", key=f"{key}_sig", disabled=st.session_state[clave_pagina] >= documento.num_paginas - 1):
+            st.session_state[clave_pagina] += 1
+
+    col_busqueda, col_boton = st.columns([3, 1])
+    with col_busqueda:
+        consulta = st.text_input("Buscar en el texto:", key=f"{key}_consulta")
+    with col_boton:
+        st.write("")
+        if st.button("🔎 Siguiente coincidencia", key=f"{key}_buscar") and consulta:
+            posicion = documento.buscar(consulta, st.session_state[clave_desde])
+            if posicion is None:
+                st.warning(f"No se encontró '{consulta}'.")
+            else:
+                st.session_state[clave_pagina] = documento.pagina_de(posicion)
+                st.session_state[clave_desde] = posicion + 1
+
+    pagina = min(st.session_state[clave_pagina], documento.num_paginas - 1)
+    with col_pag:
+        st.caption(f"Página {pagina + 1} de {documento.num_paginas} · {documento.num_caracteres} caracteres")
+    st.text_area(
+        "Texto", documento.ventana(pagina), height=300, key=f"{key}_ventana_{pagina}",
+        disabled=True, label_visibility="collapsed",
+    )
+
+# --- Trabajos en segundo plano (se ejecutan en la cola, sin llamadas a st.*) ---
+def trabajo_verificar(trabajo, cliente, cache, contenido):
+    """Verifica por secciones (solo las nuevas o modificadas van al modelo); devuelve el informe.
+
+    `trabajo.progreso` guarda el informe recompuesto con lo recibido hasta el momento.
+    """
+    informe = InformeVerificacion(contenido, cliente.nombre_modelo, cache)
+
+    def al_avanzar():
+        trabajo.progreso = informe.markdown()
+
+    al_avanzar()
+    return verificar_secciones(informe, cliente, cache, al_avanzar=al_avanzar, cancelado=lambda: trabajo.cancelado)
+
+def trabajo_generar_mazo(trabajo, cliente, biblioteca, detector, usuario, nombre, contenido,
+                         num_preguntas, dificultad, materia, omitir_duplicadas, umbral_duplicado):
+    """Genera el mazo, revisa los casi duplicados y lo guarda en la biblioteca."""
+    preguntas = trabajo.parcial
+    # Una llamada concurrente por sección del material; las tarjetas
+    # se publican a medida que el parser las va cerrando.
+    for pregunta in iterar_preguntas(contenido, cliente.generar_stream, num_preguntas, dificultad, materia):
+        if trabajo.cancelado:
+            return None
+        preguntas.append(pregunta)
+        trabajo.progreso = f"**{len(preguntas)} de {num_preguntas} tarjetas** · Última: _{pregunta['pregunta']}_"
+
+    trabajo.progreso = "Buscando tarjetas casi duplicadas..."
+    with tramo("duplicados.revisar"):
+        duplicadas = detector.revisar(preguntas, umbral_duplicado)
+    guardadas = preguntas
+    if duplicadas and omitir_duplicadas:
+        omitidas = {duplicada.posicion for duplicada in duplicadas}
+        guardadas = [p for i, p in enumerate(preguntas) if i not in omitidas]
+    if guardadas:
+        biblioteca.guardar(usuario, nombre, guardadas)
+    return {
+        "nombre": nombre,
+        "guardadas": len(guardadas),
+        "omitidas": omitir_duplicadas,
+        "duplicadas": [(preguntas[d.posicion]["pregunta"], d.mazo, d.similitud) for d in duplicadas],
+    }
+
+def trabajo_purgar_anonimos(trabajo, biblioteca, registro, ruta):
+    """Borra los mazos, estados y respuestas de las sesiones anónimas inactivas; devuelve cuántas eran."""
+    usuarios = biblioteca.purgar_inactivos(PREFIJO_ANONIMO, time.time() - CADUCIDAD_ANONIMOS)
+    if usuarios:
+        AlmacenAdaptativo(ruta).olvidar_usuarios(usuarios)
+        registro.olvidar_usuarios(usuarios)
+    return len(usuarios)
+
+@st.cache_resource(ttl=3600, show_spinner=False)
+def programar_limpieza_anonimos():
+    """Encola la limpieza de sesiones anónimas como mucho una vez por hora en el proceso."""
+    return obtener_cola_trabajos().enviar(
+        trabajo_purgar_anonimos, obtener_biblioteca(), obtener_registro_respuestas(), obtener_biblioteca().ruta,
+        prioridad=PRIORIDAD_LOTE, descripcion="Limpieza de sesiones anónimas",
+    ).id
+
+@st.fragment(run_every=1.0)
+def seguir_trabajo(trabajo_id, mostrar_parcial):
+    """Se refresca cada segundo mientras el trabajo sigue activo; al terminar, rerun completo."""
+    trabajo = obtener_cola_trabajos().obtener(trabajo_id)
+    if trabajo is None or not trabajo.activo:
+        st.rerun()
+    detalle = f" · {trabajo.reintentos} reintento(s)" if trabajo.reintentos else ""
+    st.caption(f"⏳ {trabajo.descripcion}: {trabajo.estado}{detalle}")
+    mostrar_parcial(trabajo)
+    if st.button("✖️ Cancelar", key=f"cancelar_{trabajo_id}"):
+        trabajo.cancelar()
+
+def mostrar_trabajo(trabajo_id, mostrar_parcial, mostrar_final):
+    """Muestra un trabajo de la cola: en curso (con refresco) o su resultado final."""
+    trabajo = obtener_cola_trabajos().obtener(trabajo_id)
+    if trabajo is None:
+        return
+    if trabajo.activo:
+        seguir_trabajo(trabajo_id, mostrar_parcial)
+    elif trabajo.estado == CANCELADO:
+        st.info(f"{trabajo.descripcion} cancelada.")
+    else:
+        mostrar_final(trabajo)
+
+def mostrar_verificacion(trabajo):
+    if trabajo.estado == FALLIDO:
+        st.error(f"Error al conectar con Gemini: {trabajo.error}")
+        return
+    informe = trabajo.resultado
+    st.markdown(informe.markdown())
+    primeros = [m.tiempo_primer_fragmento for m in informe.mediciones.values() if m.tiempo_primer_fragmento is not None]
+    st.caption(
+        f"{informe.analizadas} de {len(informe.secciones)} secciones enviadas a Gemini · "
+        + (f"Primer fragmento: {min(primeros):.2f} s · " if primeros else "")
+        + f"Total: {trabajo.terminado - trabajo.iniciado:.2f} s"
+        + (f" · {informe.reutilizadas} sin cambios (desde caché)" if informe.reutilizadas else "")
+        + (f" · {trabajo.reintentos} reintento(s)" if trabajo.reintentos else "")
+    )
+
+def mostrar_generacion(trabajo):
+    if trabajo.estado == FALLIDO:
+        st.error(f"Error al generar el examen con Gemini: {trabajo.error}")
+        st.error(f"Respuesta recibida (para depuración): {getattr(trabajo.error, 'respuesta', None) or 'No response'}")
+        return
+    resultado = trabajo.resultado
+    for pregunta, mazo, similitud in resultado["duplicadas"][:10]:
+        origen = f"del mazo '{mazo}'" if mazo else "de este mismo mazo"
+        st.caption(f"♻️ {pregunta} — {similitud:.0%} similar a una tarjeta {origen}.")
+    if resultado["duplicadas"] and resultado["omitidas"]:
+        st.info(f"Se omitieron {len(resultado['duplicadas'])} tarjetas casi duplicadas.")
+    elif resultado["duplicadas"]:
+        st.warning(f"{len(resultado['duplicadas'])} tarjetas se parecen a otras ya existentes.")
+    if not resultado["guardadas"]:
+        st.warning("Todas las tarjetas generadas ya estaban en tu biblioteca; no se creó el mazo.")
+        return
+    st.success(f"¡Mazo '{resultado['nombre']}' con {resultado['guardadas']} tarjetas guardado con éxito!")
+    if st.session_state.trabajo_celebrado != trabajo.id:
+        st.session_state.trabajo_celebrado = trabajo.id
+        st.balloons()
 
 # --- Función de chequeo de API Key (Secrets) ---
-def check_api_key():
-    """Verifica si la API Key está en los Secrets."""
-    if "GOOGLE_API_KEY" not in st.secrets:
-        return False
-    if not st.secrets["GOOGLE_API_KEY"]:
-        return False
-    return True
+def check_api_key(configuracion):
+    """Verifica si hay API Key (en los Secrets o en el entorno); el backend local no la necesita."""
+    if not requiere_api_key(configuracion):
+        return True
+    return bool(configuracion.get("GOOGLE_API_KEY"))
+
+with tramo("rerun.api_key"):
+    configuracion_modelo = leer_configuracion(st.secrets)
+    api_key_disponible = check_api_key(configuracion_modelo)
 
-api_key_disponible = check_api_key()
+# --- Caducidad de las sesiones anónimas ---
+if not st.session_state.user_name.strip():
+    ahora = time.time()
+    if ahora - st.session_state.get("actividad_registrada", 0) > INTERVALO_ACTIVIDAD:
+        obtener_biblioteca().registrar_actividad(st.session_state.id_anonimo, ahora)
+        st.session_state.actividad_registrada = ahora
+programar_limpieza_anonimos()
 
 # --- BARRA LATERAL (Navegación) ---
-with st.sidebar:
+with st.sidebar, tramo("rerun.barra_lateral"):
     st.title("Med-Flash AI 🧬")
     st.markdown("Tu asistente de estudio médico con IA.")
     
     # SVG de Flashcard Médica (Corazón y Cerebro)
-    st.markdown(f"""
-    <div class="doodle-container">
-        <svg viewBox="0 0 24 24" fill="currentColor">
-            <path d="M19 3H5C3.89543 3 3 3.89543 3 5V19C3 20.1046 3.89543 21 5 21H19C20.1046 21 21 20.1046 21 19V5C21 3.89543 20.1046 3 19 3ZM19 5V19H5V5H19Z"></path>
-            <path d="M17 7H7V17H17V7Z" fill="var(--primary-color)"></path>
-            <path d="M12 8C10.6667 8 9.33333 9.33333 8 10C9.33333 10.6667 10.6667 12 12 12C13.3333 12 14.6667 10.6667 16 10C14.6667 9.33333 13.3333 8 12 8Z" fill="var(--text-color)"></path>
-            <path d="M12 13C10.6667 13 9.33333 14.3333 8 15C9.33333 15.6667 10.6667 17 12 17C13.3333 17 14.6667 15.6667 16 15C14.6667 14.3333 13.3333 13 12 13Z" fill="var(--text-color)"></path>
-            <path d="M12 10.5C11.1716 10.5 10.5 11.1716 10.5 12C10.5 12.8284 11.1716 13.5 12 13.5C12.8284 13.5 13.5 12.8284 13.5 12C13.5 11.1716 12.8284 10.5 12 10.5Z" fill="var(--primary-color)"></path>
-        </svg>
-    </div>
-    """, unsafe_allow_html=True)
+    if st.get_option("server.enableStaticServing"):
+        doodle = f'<img src="{url_estatico("flashcard.svg")}" alt="Flashcard médica">'
+    else:
+        doodle = leer_estatico("flashcard.svg")[0]
+    st.markdown(f'<div class="doodle-container">{doodle}</div>', unsafe_allow_html=True)
     
     # Campo de nombre opcional
     st.session_state.user_name = st.text_input("Tu Nombre (Opcional):", st.session_state.user_name)
     if st.session_state.user_name:
         st.markdown(f"¡Hola {st.session_state.user_name}!")
+    else:
+        st.caption(f"Sin nombre, tus mazos y tu progreso son solo de esta sesión y se borran tras {CADUCIDAD_ANONIMOS // 3600} h sin actividad.")
     
     st.markdown("---")
     
@@ -263,105 +470,158 @@ with st.sidebar:
         st.session_state.page = "Generar Examen"
     if st.button("4. Estudiar y Progreso", use_container_width=True):
         st.session_state.page = "Mi Progreso"
+    # Página oculta: solo aparece con ?diagnostico=1 en la URL.
+    if st.query_params.get("diagnostico") and st.button("🩺 Diagnóstico", use_container_width=True):
+        st.session_state.page = "Diagnóstico"
         
     st.markdown("---")
     
     # Ya no se pide la API Key aquí
-    if api_key_disponible:
+    if tipo_backend(configuracion_modelo) == BACKEND_LOCAL:
+        st.info("Modelo local sin conexión (MEDFLASH_BACKEND=local): respuestas simuladas.")
+    elif api_key_disponible:
         st.success("API de Gemini conectada.")
     else:
         st.error("API Key de Google no configurada.")
-        st.info("El administrador debe configurar 'GOOGLE_API_KEY' en los Secrets de la app.")
+        st.info("El administrador debe configurar 'GOOGLE_API_KEY' en los Secrets de la app o en el entorno.")
 
 # --- CUERPO PRINCIPAL DE LA APP ---
+pagina_renderizada = st.session_state.page
+inicio_pagina = time.perf_counter()
 
 # 1. Carga de Contenido
 if st.session_state.page == "Cargar Contenido":
     st.header("1. Carga tu Contenido de Estudio 📚")
     st.markdown("Sube tus apuntes, resúmenes o presentaciones. Los analizaremos por ti.")
     
-    uploaded_file = st.file_uploader(
-        "Sube archivos .pdf, .pptx, .txt, .md",
-        type=["pdf", "pptx", "txt", "md"],
-        accept_multiple_files=False,
+    uploaded_files = st.file_uploader(
+        "Sube archivos .pdf, .pptx, .txt, .md (o un .zip con ellos)",
+        type=["pdf", "pptx", "txt", "md", "zip"],
+        accept_multiple_files=True,
     )
     
-    if uploaded_file:
-        file_type = uploaded_file.type
-        texto_extraido = ""
-        
-        with st.spinner(f"Procesando {uploaded_file.name}..."):
-            try:
-                if file_type == "application/pdf":
-                    texto_extraido = extraer_texto_pdf(uploaded_file)
-                elif file_type == "application/vnd.openxmlformats-officedocument.presentationml.presentation":
-                    texto_extraido = extraer_texto_pptx(uploaded_file)
-                elif file_type in ["text/plain", "text/markdown"]:
-                    texto_extraido = uploaded_file.read().decode("utf-8")
-                
-                st.session_state.extracted_content = texto_extraido
-                st.success("¡Archivo procesado con éxito!")
-                st.info(f"Se extrajeron {len(texto_extraido)} caracteres.")
-                
-            except Exception as e:
-                st.error(f"Ocurrió un error al procesar el archivo: {e}")
-                st.session_state.extracted_content = None
+    # Cada archivo subido se procesa una sola vez (también los que fallan), aunque sea un .zip.
+    subidos = [f for f in uploaded_files or [] if f.file_id not in st.session_state.subidas_procesadas]
+    nuevos = [(f.name, f.getvalue()) for f in subidos if f.name not in st.session_state.corpus]
+    st.session_state.subidas_procesadas.update(f.file_id for f in subidos)
+    if nuevos:
+        entradas, fallidas = expandir_archivos(nuevos)
+        entradas = [(nombre, datos) for nombre, datos in entradas if nombre not in st.session_state.corpus]
+        total = len(entradas) + len(fallidas)
+        barra_progreso = st.progress(0, text=f"Procesando {total} archivo(s)...")
+        hechos = 0
+
+        def mostrar_avance(avance):
+            # Archivos terminados más la fracción de páginas/diapositivas de los que están en curso.
+            parcial = sum(h / t for h, t in avance.values() if t)
+            detalle = " · ".join(f"{nombre}: {h} de {t}" for nombre, (h, t) in avance.items())
+            barra_progreso.progress(min(1.0, (hechos + parcial) / total),
+                                    text=f"{hechos} de {total} archivo(s)" + (f" · {detalle}" if detalle else ""))
 
-    if st.session_state.extracted_content:
-        st.subheader("Texto Extraído (Primeros 1000 caracteres):")
-        st.text_area("", st.session_state.extracted_content[:1000] + "...", height=300)
+        with st.spinner(f"Procesando {total} archivo(s)..."):
+            fuentes = iterar_ingesta(entradas, obtener_cache_extraccion(), progreso=mostrar_avance)
+            for fuente in chain(fallidas, fuentes):
+                hechos += 1
+                barra_progreso.progress(hechos / total, text=f"{hechos} de {total}: {fuente.nombre}")
+                if fuente.error:
+                    # El fallo de un archivo no detiene el resto del lote.
+                    st.session_state.fallos_ingesta[fuente.nombre] = fuente.error
+                    st.error(f"❌ {fuente.nombre}: {fuente.error}")
+                else:
+                    st.session_state.fallos_ingesta.pop(fuente.nombre, None)
+                    st.session_state.corpus[fuente.nombre] = DocumentoTexto.desde_texto(fuente.texto)
+                    # El índice se construye solo para la fuente nueva (o se lee del disco).
+                    st.session_state.indices[fuente.nombre] = obtener_almacen_indices().indexar(fuente.texto)
+                    st.success(f"✅ {fuente.nombre}: {len(fuente.texto)} caracteres extraídos.")
+                    sin_ocr = contar_paginas_sin_ocr(fuente.texto)
+                    if sin_ocr:
+                        st.warning(f"⚠️ {fuente.nombre}: {sin_ocr} página(s) escaneada(s) sin texto. "
+                                   "Instala Tesseract en el servidor para extraerlas con OCR.")
+        barra_progreso.empty()
+    elif st.session_state.fallos_ingesta:
+        with st.expander(f"⚠️ {len(st.session_state.fallos_ingesta)} archivo(s) no se pudieron procesar"):
+            for nombre, error in st.session_state.fallos_ingesta.items():
+                st.markdown(f"- **{nombre}**: {error}")
+
+    if st.session_state.corpus:
+        st.subheader("Corpus de Estudio:")
+        for nombre, documento in st.session_state.corpus.items():
+            st.markdown(f"- **{nombre}** — {documento.num_caracteres} caracteres")
+        if st.button("🗑️ Vaciar Corpus"):
+            for documento in st.session_state.corpus.values():
+                documento.cerrar()
+            st.session_state.corpus = {}
+            st.session_state.indices = {}
+            st.session_state.fallos_ingesta = {}
+            st.rerun()
+
+        nombre_vista = st.selectbox("Ver texto extraído de:", options=list(st.session_state.corpus))
+        st.subheader("Texto Extraído:")
+        mostrar_documento(st.session_state.corpus[nombre_vista], f"vista_{nombre_vista}")
 
 # 2. Verificación Médica
 elif st.session_state.page == "Verificación IA":
     st.header("2. Verificación Médica con IA 🔬")
     st.markdown("Analizamos la precisión científica de tu contenido.")
 
-    if not st.session_state.extracted_content:
+    if not st.session_state.corpus:
         st.warning("Por favor, carga un archivo primero en la pestaña 'Cargar Contenido'.")
     elif not api_key_disponible:
         st.warning("La API de Google no está configurada. Por favor, contacta al administrador.")
     else:
+        fuentes = seleccionar_fuentes("verif_fuentes")
         st.subheader("Contenido a Verificar:")
-        st.text_area("", st.session_state.extracted_content, height=300, key="verif_content")
+        if len(fuentes) > 1:
+            nombre_vista = st.selectbox("Ver fuente:", options=fuentes, key="verif_vista")
+        else:
+            nombre_vista = fuentes[0] if fuentes else None
+        if nombre_vista:
+            mostrar_documento(st.session_state.corpus[nombre_vista], f"verif_{nombre_vista}")
         
         if st.button("🔬 Analizar Precisión"):
             # --- CONEXIÓN REAL A GEMINI API (usando Secrets) ---
             try:
-                genai.configure(api_key=st.secrets["GOOGLE_API_KEY"])
-                model = genai.GenerativeModel(model_name="gemini-2.5-flash-preview-09-2025")
-                
-                prompt_parts = [
-                    "Rol: Eres un profesor de medicina y revisor científico experto.",
-                    f"Texto a revisar:\n---\n{st.session_state.extracted_content}\n---\n",
-                    "Tu Tarea: Analiza el texto y evalúa su precisión científica, coherencia y claridad.",
-                    "Marca los conceptos clave con un color/ícono:",
-                    "🟢 Correcto y claro.",
-                    "🟡 Parcialmente correcto (requiere aclaración).",
-                    "🔴 Incorrecto o confuso.",
-                    "Provee un resumen de tu análisis en formato Markdown.",
-                    "Para puntos 🟡 y 🔴, provee una breve sugerencia o corrección con referencia a fuentes médicas estándar (ej. Harrison, ILAE, etc.)."
-                ]
-
-                with st.spinner("🧠 La IA está analizando la precisión..."):
-                    response = model.generate_content(prompt_parts)
-                    st.subheader("Resultados del Análisis de Gemini:")
-                    st.markdown(response.text)
+                cliente = obtener_cliente_modelo()
+                contenido = texto_de_fuentes(fuentes)
+
+                # El análisis corre en la cola (prioridad interactiva) y sobrevive a los reruns.
+                # Solo las secciones nuevas o modificadas desde el último análisis van al modelo.
+                trabajo = obtener_cola_trabajos().enviar(
+                    trabajo_verificar, cliente, obtener_cache_informes(), contenido,
+                    prioridad=PRIORIDAD_INTERACTIVA, descripcion="Verificación",
+                )
+                st.session_state.trabajo_verificacion = trabajo.id
 
             except Exception as e:
                 st.error(f"Error al conectar con Gemini: {e}")
 
+        if st.session_state.trabajo_verificacion:
+            st.subheader("Resultados del Análisis de Gemini:")
+            # El informe se va pintando a medida que llegan los fragmentos.
+            mostrar_trabajo(
+                st.session_state.trabajo_verificacion,
+                lambda trabajo: st.markdown(trabajo.progreso + "▌"),
+                mostrar_verificacion,
+            )
+
 # 3. Generador de Preguntas (Página de CREACIÓN)
 elif st.session_state.page == "Generar Examen":
     st.header("3. Generar Mazo de Flashcards 🎓")
     st.markdown("Crea un nuevo mazo de tarjetas de estudio basado en tu material.")
 
-    if not st.session_state.extracted_content:
+    if not st.session_state.corpus:
         st.warning("Por favor, carga un archivo primero para generar preguntas sobre él.")
     elif not api_key_disponible:
         st.warning("La API de Google no está configurada. Por favor, contacta al administrador.")
     else:
+        fuentes = seleccionar_fuentes("gen_fuentes")
+
         # Nuevo campo para el nombre del mazo
         deck_name = st.text_input("Nombre del Tema (ej. Fisiología Cardíaca - Ciclo):")
+        tema_enfoque = st.text_input(
+            "Enfocar en un tema (opcional, ej. ciclo cardíaco):",
+            help="Solo se envían a Gemini los fragmentos del material más relacionados con el tema.",
+        )
         
         st.markdown("---")
         
@@ -371,67 +631,66 @@ elif st.session_state.page == "Generar Examen":
         with col2:
             st.session_state.subject = st.selectbox("Tipo de Materia:", ["Materias Básicas (Anatomía, Fisio...)", "Materias Clínicas (Neuro, Pediatría...)"])
         with col3:
-            st.session_state.num_questions = st.number_input("Número de Preguntas:", min_value=1, max_value=10, value=5)
+            st.session_state.num_questions = st.number_input("Número de Preguntas:", min_value=1, max_value=500, value=5)
+
+        with st.expander("Tarjetas casi duplicadas"):
+            omitir_duplicadas = st.radio(
+                "Si una tarjeta nueva se parece a otra de tu biblioteca:",
+                ["Omitirla (conservar la existente)", "Guardarla y avisarme"],
+            ).startswith("Omitir")
+            umbral_duplicado = st.slider(
+                "Similitud mínima para considerarlas duplicadas:",
+                min_value=0.5, max_value=1.0, value=UMBRAL_SIMILITUD, step=0.05,
+            )
 
         
         if st.button("🚀 Generar y Guardar Mazo"):
+            with tramo("recuperacion.busqueda"):
+                contenido = texto_relevante(fuentes, tema_enfoque) if tema_enfoque.strip() else None
             # Validaciones
             if not deck_name:
                 st.warning("Por favor, dale un nombre a tu mazo de tarjetas.")
-            elif deck_name in st.session_state.flashcard_library:
+            elif obtener_biblioteca().existe(usuario_actual(), deck_name):
                 st.error(f"Ya existe un mazo con el nombre '{deck_name}'. Por favor, elige otro nombre.")
+            elif contenido == "":
+                st.warning(f"No se encontró material relacionado con '{tema_enfoque}'. Prueba con otros términos o deja el campo vacío.")
             else:
                 # Limpiar el examen anterior
                 restart_exam()
                 
                 # --- CONEXIÓN REAL A GEMINI API (usando Secrets) ---
                 try:
-                    genai.configure(api_key=st.secrets["GOOGLE_API_KEY"])
-                    model = genai.GenerativeModel(model_name="gemini-2.5-flash-preview-09-2025")
-                    
-                    prompt_parts = [
-                        "Rol: Eres un profesor de medicina experto en crear preguntas de examen tipo USMLE/MIR.",
-                        f"Contexto del Estudiante: Nivel {st.session_state.difficulty}, Materia {st.session_state.subject}.",
-                        f"Texto base (Material de estudio):\n---\n{st.session_state.extracted_content}\n---\n",
-                        f"Tu Tarea: Genera {st.session_state.num_questions} preguntas de opción múltiple (4 opciones) basadas *únicamente* en el texto base.",
-                        "Las preguntas deben ser claras, concisas y relevantes al estilo de examen médico.",
-                        "Formato de Respuesta: Responde OBLIGATORIAMENTE en formato JSON. La estructura debe ser una LISTA de objetos:",
-                        """
-                        [
-                          {
-                            "pregunta": "El texto completo de la pregunta 1...",
-                            "opciones": {
-                              "A": "Texto de la opción A",
-                              "B": "Texto de la opción B",
-                              "C": "Texto de la opción C",
-                              "D": "Texto de la opción D"
-                            },
-                            "respuesta_correcta": "B",
-                            "explicacion": "Una breve pero completa explicación médica..."
-                          },
-                          {
-                            "pregunta": "El texto completo de la pregunta 2...",
-                            "opciones": { "A": "...", "B": "...", "C": "...", "D": "..." },
-                            "respuesta_correcta": "A",
-                            "explicacion": "..."
-                          }
-                        ]
-                        """
-                    ]
-
-                    with st.spinner(f"🧠 Gemini está creando tu examen de {st.session_state.num_questions} preguntas..."):
-                        response = model.generate_content(prompt_parts)
-                        clean_response = response.text.strip().replace('```json', '').replace('```', '')
-                        preguntas_json_list = json.loads(clean_response)
-                        
-                        # Guardar en la biblioteca en lugar de iniciar el examen
-                        st.session_state.flashcard_library[deck_name] = preguntas_json_list
-                        st.success(f"¡Mazo '{deck_name}' con {len(preguntas_json_list)} tarjetas guardado con éxito!")
-                        st.balloons()
+                    cliente = obtener_cliente_modelo()
+                    if contenido:
+                        total = sum(st.session_state.corpus[nombre].num_caracteres for nombre in fuentes)
+                        st.caption(f"🎯 Usando {len(contenido)} de {total} caracteres del material (fragmentos sobre '{tema_enfoque}').")
+                    else:
+                        contenido = texto_de_fuentes(fuentes)
+                    dificultad = st.session_state.difficulty
+                    if modo_adaptativo():
+                        # El nivel pedido sale del historial del estudiante en el tema del mazo.
+                        tema = tema_de_mazo(deck_name)
+                        dificultad = obtener_motor_adaptativo(usuario_actual()).dificultad_generacion(tema)
+                        st.caption(f"🎚️ Dificultad adaptativa para '{tema}': {dificultad.split(' (')[0]}.")
+
+                    # La generación corre en la cola (prioridad de lote): sigue aunque la página se recargue.
+                    trabajo = obtener_cola_trabajos().enviar(
+                        trabajo_generar_mazo, cliente, obtener_biblioteca(), obtener_detector_duplicados(usuario_actual()),
+                        usuario_actual(), deck_name, contenido, st.session_state.num_questions,
+                        dificultad, st.session_state.subject, omitir_duplicadas, umbral_duplicado,
+                        prioridad=PRIORIDAD_LOTE, descripcion=f"Generación de '{deck_name}'",
+                    )
+                    st.session_state.trabajo_generacion = trabajo.id
 
                 except Exception as e:
                     st.error(f"Error al generar el examen con Gemini: {e}")
-                    st.error(f"Respuesta recibida (para depuración): {response.text if 'response' in locals() else 'No response'}")
+
+        if st.session_state.trabajo_generacion:
+            mostrar_trabajo(
+                st.session_state.trabajo_generacion,
+                lambda trabajo: st.markdown(trabajo.progreso or "🧠 Gemini está creando tu examen..."),
+                mostrar_generacion,
+            )
 
 # --- PÁGINA DE ESTUDIO (NUEVA) ---
 elif st.session_state.page == "Estudiar":
@@ -456,7 +715,7 @@ elif st.session_state.page == "Estudiar":
             st.markdown(f"#### *{selected_quote}*")
             st.markdown("---")
             
-            correctas = sum(1 for r in st.session_state.exam_results if r['correcta'])
+            correctas = sum(1 for r in st.session_state.exam_results if r.es_correcta)
             total = len(exam)
             
             if total > 0:
@@ -466,7 +725,8 @@ elif st.session_state.page == "Estudiar":
 
             st.metric("Tu Puntaje:", f"{puntaje:.0f}%", f"{correctas} de {total} correctas")
             
-            # Gráfico de pastel (pie chart) para el resumen final
+            # Gráfico de pastel (pie chart) para el resumen final; Plotly solo se importa aquí y en "Mi Progreso".
+            import plotly.graph_objects as go
             labels = ['Correctas', 'Incorrectas']
             values = [correctas, total - correctas]
             colors = ['#28a745', '#dc3545'] # Verde y Rojo
@@ -487,25 +747,25 @@ elif st.session_state.page == "Estudiar":
             st.subheader("Revisión Detallada:")
             for i, result in enumerate(st.session_state.exam_results):
                 question_card = exam[i]
-                if result['correcta']:
+                if result.es_correcta:
                     st.markdown(f"""
                     <div class="feedback-correct">
-                        ✅ <strong>Pregunta {i+1} - ¡Correcto!</strong> (Seleccionaste: {result['seleccionada']})
+                        ✅ <strong>Pregunta {i+1} - ¡Correcto!</strong> (Seleccionaste: {question_card.opciones[result.seleccionada]})
                     </div>
                     """, unsafe_allow_html=True)
                 else:
                     st.markdown(f"""
                     <div class="feedback-incorrect">
-                        ❌ <strong>Pregunta {i+1} - Incorrecto.</strong> (Seleccionaste: {result['seleccionada']})
+                        ❌ <strong>Pregunta {i+1} - Incorrecto.</strong> (Seleccionaste: {question_card.opciones[result.seleccionada]})
                         <br>
-                        <strong>La respuesta correcta era:</strong> {result['correcta_texto']}
+                        <strong>La respuesta correcta era:</strong> {question_card.texto_correcto}
                     </div>
                     """, unsafe_allow_html=True)
                 st.markdown(f"""
                 <div class="feedback-explanation">
                     🧠 <strong>Explicación de la Pregunta {i+1}:</strong>
                     <br>
-                    {question_card['explicacion']}
+                    {question_card.explicacion}
                 </div>
                 """, unsafe_allow_html=True)
             
@@ -518,16 +778,18 @@ elif st.session_state.page == "Estudiar":
             # Mostrar la pregunta actual
             card = exam[idx]
             st.subheader(f"Tu Examen: Pregunta {idx + 1} de {len(exam)}")
+            if not st.session_state.question_started_at or st.session_state.question_started_at[0] != idx:
+                st.session_state.question_started_at = (idx, time.time())
             
             st.markdown('<div class="flashcard">', unsafe_allow_html=True)
             # La pregunta AHORA se renderiza correctamente dentro de la tarjeta
-            st.markdown(f"<h5>{card['pregunta']}</h5>", unsafe_allow_html=True)
-            
-            opciones = list(card["opciones"].values())
+            st.markdown(f"<h5>{card.pregunta}</h5>", unsafe_allow_html=True)
             
+            # El radio guarda el índice de la opción; el texto se muestra con format_func.
             st.radio(
                 "Selecciona tu respuesta:", 
-                options=opciones,
+                options=range(len(card.opciones)),
+                format_func=lambda i: card.opciones[i],
                 key=f"user_answer_{idx}", # Clave única por pregunta
                 disabled=st.session_state.show_explanation
             )
@@ -540,20 +802,22 @@ elif st.session_state.page == "Estudiar":
                     # Capturar la respuesta del radio button (usa la clave única)
                     current_user_selection = st.session_state.get(f"user_answer_{idx}") # Usar .get() para evitar error si no se selecciona
                     
-                    if current_user_selection: # Asegurarse de que el usuario haya seleccionado algo
+                    if current_user_selection is not None: # Asegurarse de que el usuario haya seleccionado algo
                         st.session_state.user_answer = current_user_selection # Actualizar el estado global con la selección actual
                         st.session_state.show_explanation = True
                         
-                        user_ans_text = st.session_state.user_answer
-                        correct_ans_letter = card["respuesta_correcta"]
-                        correct_ans_text = card["opciones"][correct_ans_letter]
-                        es_correcta = (user_ans_text == correct_ans_text)
-                        
-                        st.session_state.exam_results.append({
-                            'correcta': es_correcta,
-                            'seleccionada': user_ans_text,
-                            'correcta_texto': correct_ans_text
-                        })
+                        respuesta = Respuesta(st.session_state.user_answer, card.correcta)
+                        st.session_state.exam_results.append(respuesta)
+                        # El historial de repaso persiste aunque se reinicie el examen.
+                        if card.id is not None:
+                            obtener_planificador(usuario_actual()).registrar(card.id, respuesta.es_correcta)
+                        latencia = time.time() - st.session_state.question_started_at[1]
+                        obtener_registro_respuestas().registrar(
+                            usuario_actual(), card.mazo or "Sin mazo", card.id, respuesta.es_correcta, latencia=latencia,
+                        )
+                        obtener_motor_adaptativo(usuario_actual()).registrar(
+                            card.id, card.mazo or "Sin mazo", respuesta.es_correcta, latencia,
+                        )
                         
                         st.rerun() # Volver a cargar para mostrar la explicación
                     else:
@@ -562,18 +826,18 @@ elif st.session_state.page == "Estudiar":
             # Mostrar explicación y botón "Siguiente" (solo si ya se respondió)
             if st.session_state.show_explanation:
                 result = st.session_state.exam_results[idx]
-                if result['correcta']:
+                if result.es_correcta:
                     st.markdown(f"""
                     <div class="feedback-correct">
-                        ✅ <strong>¡Correcto!</strong> La respuesta es: {result['correcta_texto']}
+                        ✅ <strong>¡Correcto!</strong> La respuesta es: {card.texto_correcto}
                     </div>
                     """, unsafe_allow_html=True)
                 else:
                     st.markdown(f"""
                     <div class="feedback-incorrect">
-                        ❌ <strong>Respuesta incorrecta.</strong> Seleccionaste: '{result['seleccionada']}'.
+                        ❌ <strong>Respuesta incorrecta.</strong> Seleccionaste: '{card.opciones[result.seleccionada]}'.
                         <br>
-                        <strong>La respuesta correcta era:</strong> {result['correcta_texto']}
+                        <strong>La respuesta correcta era:</strong> {card.texto_correcto}
                     </div>
                     """, unsafe_allow_html=True)
                 
@@ -581,11 +845,18 @@ elif st.session_state.page == "Estudiar":
                 <div class="feedback-explanation">
                     🧠 <strong>Explicación:</strong>
                     <br>
-                    {card['explicacion']}
+                    {card.explicacion}
                 </div>
                 """, unsafe_allow_html=True)
                 
                 st.button("Siguiente Pregunta ➡️", on_click=go_to_next_question)
+                if isinstance(exam, ManejadorMazo) and card.id is not None:
+                    # Un mazo vacío no se puede estudiar: la última tarjeta se quita eliminando el mazo.
+                    ultima = len(exam) <= 1
+                    st.button("🚫 Quitar esta tarjeta del mazo", on_click=quitar_tarjeta_actual, disabled=ultima,
+                              help="Es la última tarjeta del mazo: para quitarla, elimina el mazo." if ultima else
+                                   "La tarjeta se borra de tu copia del mazo en tu biblioteca; "
+                                   "las copias de otros estudiantes no cambian.")
 
 # 4. Progreso y Gamificación
 elif st.session_state.page == "Mi Progreso":
@@ -594,12 +865,13 @@ elif st.session_state.page == "Mi Progreso":
     st.subheader("Mis Mazos de Estudio 📚")
     
     # Lógica para seleccionar y empezar a estudiar un mazo
-    if not st.session_state.flashcard_library:
+    biblioteca = obtener_biblioteca()
+    deck_names = biblioteca.nombres(usuario_actual())
+    if not deck_names:
         st.info("Aún no has generado ningún mazo. Ve a 'Generar Examen' para crear uno.")
     else:
         col1, col2 = st.columns([2, 1])
         with col1:
-            deck_names = list(st.session_state.flashcard_library.keys())
             selected_deck_name = st.selectbox("Selecciona un mazo para estudiar:", options=deck_names)
         
         with col2:
@@ -607,23 +879,98 @@ elif st.session_state.page == "Mi Progreso":
             if st.button("Iniciar Estudio 🚀", use_container_width=True, type="primary"):
                 if selected_deck_name: # Asegurarse de que haya algo seleccionado
                     restart_exam() # Limpia el estado del examen anterior
-                    st.session_state.current_exam = st.session_state.flashcard_library[selected_deck_name]
+                    # Las tarjetas se comparten con las demás sesiones que tienen abierto el mismo mazo.
+                    mazo = obtener_almacen_mazos().abrir(biblioteca, usuario_actual(), selected_deck_name)
+                    if mazo is not None and modo_adaptativo():
+                        mazo.reordenar(obtener_motor_adaptativo(usuario_actual()).orden(mazo))
+                    st.session_state.current_exam = mazo
+                    st.session_state.page = "Estudiar"
+                    st.rerun()
+
+            # Botón para repasar las tarjetas vencidas de todos los mazos
+            planificador = obtener_planificador(usuario_actual())
+            planificador.sincronizar()
+            pendientes = planificador.num_pendientes(MAX_PENDIENTES_MOSTRADOS + 1)
+            etiqueta = f"{MAX_PENDIENTES_MOSTRADOS}+" if pendientes > MAX_PENDIENTES_MOSTRADOS else pendientes
+            if st.button(f"🔁 Repasar Pendientes ({etiqueta})", use_container_width=True, disabled=not pendientes):
+                ids = planificador.proximas(TARJETAS_POR_REPASO)
+                tarjetas = biblioteca.cargar_tarjetas(ids)
+                for tarjeta_id in set(ids) - {t.id for t in tarjetas}:
+                    planificador.olvidar(tarjeta_id)  # su mazo fue eliminado
+                if tarjetas:
+                    restart_exam()
+                    if modo_adaptativo():
+                        tarjetas = obtener_motor_adaptativo(usuario_actual()).ordenar(tarjetas)
+                    st.session_state.current_exam = tarjetas
                     st.session_state.page = "Estudiar"
                     st.rerun()
 
             # Botón para eliminar un mazo
             if st.button("🗑️ Eliminar Mazo", use_container_width=True):
                 if selected_deck_name: # Asegurarse de que haya algo seleccionado
-                    del st.session_state.flashcard_library[selected_deck_name]
+                    biblioteca.eliminar(usuario_actual(), selected_deck_name)
+                    obtener_planificador(usuario_actual()).reiniciar()
+                    obtener_detector_duplicados(usuario_actual()).reiniciar()
+                    obtener_motor_adaptativo(usuario_actual()).reiniciar()
                     st.rerun()
 
+    # Compartir mazos sin regenerarlos: exportar/importar la biblioteca completa.
+    with st.expander("📦 Exportar / Importar biblioteca"):
+        col1, col2 = st.columns(2)
+        with col1:
+            formato = st.radio("Formato de exportación:", ["Med-Flash (.mflash)", "Anki (texto)"], disabled=not deck_names)
+            if st.button("Preparar exportación", disabled=not deck_names):
+                sufijo = st.session_state.user_name.strip() or "anonimo"
+                # Se exporta en streaming a un archivo temporal y se lee una sola vez:
+                # Streamlit sirve la descarga desde memoria, así que la única copia
+                # completa es la suya (el límite es el tamaño de la biblioteca exportada).
+                with tempfile.TemporaryFile() as archivo_temporal:
+                    if formato.startswith("Anki"):
+                        destino = io.TextIOWrapper(archivo_temporal, encoding="utf-8", newline="")
+                        total = exportar_anki(biblioteca, usuario_actual(), destino)
+                        destino.detach()  # sin cerrar el archivo temporal
+                        nombre_archivo, mime = f"medflash_{sufijo}_anki.txt", "text/plain"
+                    else:
+                        _, total = exportar_biblioteca(biblioteca, usuario_actual(), archivo_temporal)
+                        nombre_archivo, mime = f"medflash_{sufijo}{EXTENSION}", "application/octet-stream"
+                    archivo_temporal.seek(0)
+                    datos = archivo_temporal.read()
+                st.download_button(f"⬇️ Descargar ({total} tarjetas)", datos, file_name=nombre_archivo, mime=mime, on_click="ignore")
+        with col2:
+            archivo = st.file_uploader("Importar biblioteca (.mflash):", type=[EXTENSION.lstrip(".")], key="importar_biblioteca")
+            if archivo is not None and st.button("📥 Importar"):
+                try:
+                    resumen = importar_biblioteca(biblioteca, usuario_actual(), archivo)
+                except ErrorIntercambio as e:
+                    st.error(f"No se pudo importar: {e}")
+                    if e.resumen is not None and e.resumen.mazos:
+                        st.caption(f"Antes del error se importaron {len(e.resumen.mazos)} mazo(s) con {e.resumen.tarjetas} tarjetas; se conservan en tu biblioteca.")
+                else:
+                    st.success(f"Importados {len(resumen.mazos)} mazo(s) con {resumen.tarjetas} tarjetas.")
+                    for original, guardado in resumen.renombrados:
+                        st.caption(f"'{original}' ya existía: se guardó como '{guardado}'.")
+                    if resumen.descartadas:
+                        st.warning(f"Se descartaron {resumen.descartadas} tarjetas con formato inválido.")
+
     st.markdown("---") # Separador
     
     st.markdown("¡Sigue tu avance y colecciona insignias!")
     
+    registro = obtener_registro_respuestas()
+    resumen = registro.resumen(usuario_actual())
+
     st.subheader("Niveles de Conocimiento")
-    st.markdown("Básico ➔ Intermedio ➔ **Clínico** ➔ Experto")
-    st.progress(75) # Ejemplo
+    # El nivel se deriva de la precisión global registrada.
+    niveles = ["Básico", "Intermedio", "Clínico", "Experto"]
+    nivel = sum(resumen["precision"] >= umbral for umbral in (0.5, 0.7, 0.85))
+    st.markdown(" ➔ ".join(f"**{n}**" if i == nivel else n for i, n in enumerate(niveles)))
+    st.progress(int(resumen["precision"] * 100))
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Respuestas", resumen["respuestas"])
+    col2.metric("Precisión", f"{resumen['precision']:.0%}")
+    col3.metric("Racha de Aciertos", resumen["racha_aciertos"], f"Mejor: {resumen['mejor_racha_aciertos']}", delta_color="off")
+    col4.metric("Días Seguidos", resumen["racha_dias"])
     
     st.subheader("Mis Insignias")
     col1, col2, col3 = st.columns(3)
@@ -635,4 +982,79 @@ elif st.session_state.page == "Mi Progreso":
         st.markdown('<div class="doodle-container">🧪 Bioquímica</div>', unsafe_allow_html=True)
 
     st.subheader("Estadísticas de Desempeño")
-    st.bar_chart({"Correctas": [20, 35, 30], "Incorrectas": [10, 5, 8]}, use_container_width=True)
+    if not resumen["respuestas"]:
+        st.info("Aún no hay respuestas registradas. ¡Empieza a estudiar un mazo!")
+    else:
+        import plotly.graph_objects as go
+
+        estilo_grafico = dict(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font_color='#F0F0F0')
+
+        por_mazo = registro.por_mazo(usuario_actual())
+        fig = go.Figure(data=[
+            go.Bar(name='Correctas', x=por_mazo["mazo"], y=por_mazo["aciertos"], marker_color='#28a745'),
+            go.Bar(name='Incorrectas', x=por_mazo["mazo"], y=por_mazo["respuestas"] - por_mazo["aciertos"], marker_color='#dc3545'),
+        ])
+        fig.update_layout(barmode='stack', title_text='Respuestas por Mazo', title_x=0.5, **estilo_grafico)
+        st.plotly_chart(fig, use_container_width=True)
+
+        serie = registro.serie_diaria(usuario_actual())
+        fig = go.Figure(data=[go.Scatter(x=serie.index, y=serie["precision"] * 100, mode='lines+markers',
+                                         line_color='#F5A6C1', name='Precisión')])
+        fig.update_layout(title_text='Precisión Diaria (%)', title_x=0.5, yaxis_range=[0, 100], **estilo_grafico)
+        st.plotly_chart(fig, use_container_width=True)
+
+        st.markdown("**Precisión por Tema**")
+        por_tema = registro.por_tema(usuario_actual())
+        st.dataframe(
+            por_tema[["tema", "respuestas", "precision", "latencia_media"]],
+            column_config={
+                "tema": "Tema",
+                "respuestas": "Respuestas",
+                "precision": st.column_config.ProgressColumn("Precisión", min_value=0, max_value=1, format="percent"),
+                "latencia_media": st.column_config.NumberColumn("Tiempo medio (s)", format="%.1f"),
+            },
+            hide_index=True, use_container_width=True,
+        )
+
+# --- PÁGINA DE DIAGNÓSTICO (oculta) ---
+elif st.session_state.page == "Diagnóstico":
+    st.header("🩺 Diagnóstico de Rendimiento")
+    st.markdown("Tiempos de cada tramo instrumentado (reruns, páginas, extracción, prompts, modelo y parser).")
+
+    ambito = st.radio("Ámbito:", ["Esta sesión", "Todo el proceso"], horizontal=True)
+    registro_tiempos = st.session_state.tiempos if ambito == "Esta sesión" else instrumentacion.REGISTRO_PROCESO
+    tramos = registro_tiempos.exportar()
+    if not tramos:
+        st.info("Aún no hay tiempos registrados.")
+    else:
+        import pandas as pd
+
+        tabla = pd.DataFrame.from_dict(tramos, orient="index").drop(columns="cubetas")
+        tabla[["media", "min", "max", "p50", "p95", "p99"]] *= 1000
+        st.dataframe(
+            tabla[["n", "media", "p50", "p95", "p99", "max"]],
+            column_config={
+                "n": "Muestras",
+                **{c: st.column_config.NumberColumn(f"{c} (ms)", format="%.2f") for c in ("media", "p50", "p95", "p99", "max")},
+            },
+            use_container_width=True,
+        )
+        st.bar_chart(tabla[["p50", "p95"]])
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            "⬇️ Exportar JSON",
+            json.dumps(instrumentacion.exportar(st.session_state.tiempos), indent=2),
+            file_name="med_flash_tiempos.json",
+            mime="application/json",
+            use_container_width=True,
+        )
+    with col2:
+        if st.button("🔄 Reiniciar métricas de esta sesión", use_container_width=True):
+            st.session_state.tiempos.reiniciar()
+            st.rerun()
+
+# Los reruns interrumpidos por st.rerun() no llegan hasta aquí y no se registran.
+instrumentacion.registrar(f"pagina.{pagina_renderizada}", time.perf_counter() - inicio_pagina)
+instrumentacion.registrar("rerun.total", time.perf_counter() - inicio_rerun)
@@ -0,0 +1,255 @@
+# --- Backends del Modelo ---
+# El cliente (ClienteModelo) habla con el modelo a través de un backend con
+# dos operaciones: `generar` (texto completo) y `generar_stream` (fragmentos).
+#   - BackendGemini: la API de Google.
+#   - BackendLocal: un sustituto determinista y sin conexión, con latencia,
+#     tamaño de fragmento y tokens por segundo configurables, para medir el
+#     pipeline completo (y su coste por tarjeta) sin la API real.
+# Cuál se usa se decide solo por configuración: variables de entorno
+# MEDFLASH_* o, si no están, las mismas claves en los Secrets de la app.
+
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+
+BACKEND_GEMINI = "gemini"
+BACKEND_LOCAL = "local"
+NOMBRE_MODELO = "gemini-2.5-flash-preview-09-2025"
+
+# USD por millón de tokens (entrada, salida). Revisar con la tarifa vigente.
+PRECIOS_POR_MILLON = {
+    "gemini-2.5-flash-preview-09-2025": (0.30, 2.50),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+# Aproximación de tokens cuando el backend no los informa.
+CARACTERES_POR_TOKEN = 4
+
+# Valores por defecto del backend local.
+LATENCIA_LOCAL = 0.5            # segundos hasta el primer fragmento
+TOKENS_POR_SEGUNDO_LOCAL = 200.0
+TOKENS_POR_FRAGMENTO_LOCAL = 16
+
+OPCIONES_CONFIGURACION = (
+    "BACKEND", "MODELO", "LATENCIA", "TOKENS_POR_SEGUNDO", "TOKENS_POR_FRAGMENTO", "PROB_ERROR",
+)
+
+
+def estimar_tokens(texto):
+    return max(1, len(texto) // CARACTERES_POR_TOKEN) if texto else 0
+
+
+class _Backend:
+    nombre = ""
+    precio_entrada = 0.0  # USD por millón de tokens
+    precio_salida = 0.0
+
+    def coste(self, tokens_entrada, tokens_salida):
+        """Coste estimado (USD) de una llamada."""
+        return (tokens_entrada * self.precio_entrada + tokens_salida * self.precio_salida) / 1e6
+
+    def generar(self, prompt_parts, parametros):
+        raise NotImplementedError
+
+    def generar_stream(self, prompt_parts, parametros):
+        yield self.generar(prompt_parts, parametros)
+
+
+# --- Gemini ---
+class BackendGemini(_Backend):
+    def __init__(self, api_key, nombre_modelo=NOMBRE_MODELO):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.nombre = nombre_modelo
+        self.precio_entrada, self.precio_salida = PRECIOS_POR_MILLON.get(nombre_modelo, (0.0, 0.0))
+        self.modelo = genai.GenerativeModel(model_name=nombre_modelo)
+
+    def generar(self, prompt_parts, parametros):
+        response = self.modelo.generate_content(prompt_parts, generation_config=parametros or None)
+        return response.text
+
+    def generar_stream(self, prompt_parts, parametros):
+        """Genera los fragmentos de texto; si el modelo no admite streaming, uno solo."""
+        try:
+            response = self.modelo.generate_content(
+                prompt_parts, generation_config=parametros or None, stream=True
+            )
+        except (TypeError, NotImplementedError):
+            yield self.generar(prompt_parts, parametros)
+            return
+        recibido = False
+        for fragmento in response:
+            # Los fragmentos sin partes (bloqueos de seguridad, cierre de la respuesta) no tienen .text.
+            if not any(candidato.content.parts for candidato in fragmento.candidates):
+                continue
+            if fragmento.text:
+                recibido = True
+                yield fragmento.text
+        if not recibido:
+            # Como response.text sin streaming: una respuesta sin texto es un error, no un mazo vacío.
+            raise ValueError(f"El modelo no devolvió texto (respuesta bloqueada o vacía): {response.prompt_feedback}")
+
+
+# --- Sustituto local ---
+class SaturacionLocal(Exception):
+    """Error 429 simulado por el backend local (la cola lo trata como transitorio)."""
+
+    code = 429
+
+
+_RE_NUM_PREGUNTAS = re.compile(r"Genera (\d+) preguntas")
+_RE_SOLO_OBSERVACIONES = re.compile(r"Enumera solo los puntos 🟡 y 🔴")
+_RE_TEXTO = re.compile(r"(?:Texto base \(Material de estudio\)|Texto a revisar):\n---\n(.*)\n---", re.DOTALL)
+_RE_FRASES = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def _frases(texto):
+    frases = [f.strip() for f in _RE_FRASES.split(texto) if len(f.strip()) >= 20]
+    return frases or [texto.strip() or "Sin contenido."]
+
+
+def _recortar(frase, longitud=160):
+    return frase if len(frase) <= longitud else frase[:longitud].rsplit(" ", 1)[0] + "…"
+
+
+class BackendLocal(_Backend):
+    """Modelo falso y determinista: la misma petición produce siempre la misma respuesta.
+
+    Responde en el formato que espera cada prompt (lista JSON de preguntas o
+    informe de verificación en Markdown) a partir de frases del propio texto.
+    """
+
+    nombre = "local"
+
+    def __init__(self, latencia=LATENCIA_LOCAL, tokens_por_segundo=TOKENS_POR_SEGUNDO_LOCAL,
+                 tokens_por_fragmento=TOKENS_POR_FRAGMENTO_LOCAL, prob_error=0.0,
+                 precio_entrada=0.0, precio_salida=0.0, semilla=0):
+        self.latencia = latencia
+        self.tokens_por_segundo = tokens_por_segundo
+        self.tokens_por_fragmento = tokens_por_fragmento
+        self.prob_error = prob_error
+        self.precio_entrada = precio_entrada
+        self.precio_salida = precio_salida
+        self.llamadas = 0
+        self._errores = random.Random(semilla)
+        self._lock = threading.Lock()
+
+    def _responder(self, prompt_parts, parametros):
+        prompt = "\n".join(prompt_parts)
+        semilla = hashlib.sha256(f"{prompt}\x1e{sorted((parametros or {}).items())}".encode("utf-8")).digest()
+        rng = random.Random(semilla)
+        coincidencia = _RE_TEXTO.search(prompt)
+        frases = _frases(coincidencia.group(1) if coincidencia else prompt)
+        num = _RE_NUM_PREGUNTAS.search(prompt)
+        if num:
+            return self._preguntas(frases, int(num.group(1)), rng)
+        return self._informe(frases, rng, solo_observaciones=bool(_RE_SOLO_OBSERVACIONES.search(prompt)))
+
+    @staticmethod
+    def _preguntas(frases, num_preguntas, rng):
+        preguntas = []
+        for i in range(num_preguntas):
+            frase = frases[i % len(frases)]
+            clave = " ".join(frase.split()[:6])
+            otras = [f for f in frases if f != frase] or ["Ninguna de las anteriores."]
+            falsas = [rng.choice(otras) for _ in range(3)]
+            opciones = [_recortar(frase)] + [_recortar(f"No es cierto que {f[0].lower()}{f[1:]}") for f in falsas]
+            correcta = rng.randrange(4)
+            opciones[0], opciones[correcta] = opciones[correcta], opciones[0]
+            vuelta = f" (variante {i // len(frases) + 1})" if i >= len(frases) else ""
+            preguntas.append({
+                "pregunta": f"¿Cuál de estas afirmaciones sobre «{clave}…» recoge el material?{vuelta}",
+                "opciones": dict(zip("ABCD", opciones)),
+                "respuesta_correcta": "ABCD"[correcta],
+                "explicacion": f"Según el texto: {_recortar(frase, 300)}",
+            })
+        return json.dumps(preguntas, ensure_ascii=False, indent=2)
+
+    @staticmethod
+    def _informe(frases, rng, solo_observaciones=False):
+        lineas = [] if solo_observaciones else ["### Resumen del análisis", ""]
+        for frase in frases[:8]:
+            icono = rng.choices(["🟢", "🟡", "🔴"], weights=[6, 3, 1])[0]
+            if icono == "🟢" and solo_observaciones:
+                continue
+            lineas.append(f"- {icono} {_recortar(frase)}")
+            if icono != "🟢":
+                lineas.append("  - Sugerencia: contrastar con una referencia estándar (p. ej. Harrison).")
+        return "\n".join(lineas) or "🟢 Sin observaciones."
+
+    def _fragmentos(self, texto):
+        tamano = max(1, self.tokens_por_fragmento * CARACTERES_POR_TOKEN)
+        return [texto[i:i + tamano] for i in range(0, len(texto), tamano)]
+
+    def _iniciar(self):
+        with self._lock:
+            self.llamadas += 1
+            falla = self._errores.random() < self.prob_error
+        time.sleep(self.latencia)
+        if falla:
+            raise SaturacionLocal("429 Resource has been exhausted (simulado)")
+
+    def generar(self, prompt_parts, parametros):
+        self._iniciar()
+        texto = self._responder(prompt_parts, parametros)
+        time.sleep(estimar_tokens(texto) / self.tokens_por_segundo)
+        return texto
+
+    def generar_stream(self, prompt_parts, parametros):
+        self._iniciar()
+        for fragmento in self._fragmentos(self._responder(prompt_parts, parametros)):
+            yield fragmento
+            time.sleep(estimar_tokens(fragmento) / self.tokens_por_segundo)
+
+
+# --- Configuración ---
+def leer_configuracion(secretos=None):
+    """Opciones del backend: variables de entorno MEDFLASH_* y, si faltan, las mismas claves en `secretos`."""
+    try:
+        secretos = dict(secretos) if secretos is not None else {}
+    except FileNotFoundError:  # st.secrets sin secrets.toml
+        secretos = {}
+    configuracion = {}
+    for opcion in OPCIONES_CONFIGURACION:
+        clave = f"MEDFLASH_{opcion}"
+        if clave in os.environ:
+            configuracion[opcion] = os.environ[clave]
+        elif clave in secretos:
+            configuracion[opcion] = secretos[clave]
+    api_key = secretos.get("GOOGLE_API_KEY") or os.environ.get("GOOGLE_API_KEY")
+    if api_key:
+        configuracion["GOOGLE_API_KEY"] = api_key
+    return configuracion
+
+
+def tipo_backend(configuracion):
+    tipo = str(configuracion.get("BACKEND", BACKEND_GEMINI)).strip().lower()
+    if tipo not in (BACKEND_GEMINI, BACKEND_LOCAL):
+        raise ValueError(f"Backend desconocido: {tipo!r} (usa '{BACKEND_GEMINI}' o '{BACKEND_LOCAL}')")
+    return tipo
+
+
+def requiere_api_key(configuracion):
+    return tipo_backend(configuracion) == BACKEND_GEMINI
+
+
+def crear_backend(configuracion):
+    """Backend descrito por la configuración (ver `leer_configuracion`)."""
+    if tipo_backend(configuracion) == BACKEND_LOCAL:
+        precio_entrada, precio_salida = PRECIOS_POR_MILLON.get(configuracion.get("MODELO"), (0.0, 0.0))
+        return BackendLocal(
+            latencia=float(configuracion.get("LATENCIA", LATENCIA_LOCAL)),
+            tokens_por_segundo=float(configuracion.get("TOKENS_POR_SEGUNDO", TOKENS_POR_SEGUNDO_LOCAL)),
+            tokens_por_fragmento=int(configuracion.get("TOKENS_POR_FRAGMENTO", TOKENS_POR_FRAGMENTO_LOCAL)),
+            prob_error=float(configuracion.get("PROB_ERROR", 0.0)),
+            # Con MEDFLASH_MODELO se simula la tarifa de ese modelo (para estimar costes sin la API).
+            precio_entrada=precio_entrada,
+            precio_salida=precio_salida,
+        )
+    return BackendGemini(configuracion["GOOGLE_API_KEY"], configuracion.get("MODELO") or NOMBRE_MODELO)
@@ -0,0 +1,94 @@
+# --- Benchmark: motor de dificultad adaptativa ---
+# Simula un estudiante con habilidad conocida respondiendo tarjetas de
+# dificultad conocida y mide:
+#   - el coste de registrar una respuesta a medida que crece el historial
+#     (debe mantenerse constante), en memoria y persistiendo en SQLite,
+#   - el coste de ordenar un mazo para estudiar,
+#   - qué tan bien recupera el modelo las dificultades reales (correlación).
+#
+# Uso: python benchmarks/bench_adaptativo.py [respuestas] [tarjetas]
+
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from adaptativo import AlmacenAdaptativo, MotorAdaptativo
+from biblioteca import BibliotecaMazos
+
+HABILIDAD_REAL = 0.8
+TARJETAS_POR_MAZO = 500
+TRAMOS = 5
+
+
+def tarjeta_sintetica(i):
+    return {
+        "pregunta": f"Pregunta {i}",
+        "opciones": {letra: f"Opción {letra}" for letra in "ABCD"},
+        "respuesta_correcta": "A",
+        "explicacion": f"Explicación {i}",
+    }
+
+
+def simular(motor, tarjetas, dificultades, respuestas, rng):
+    """Registra `respuestas` respuestas; devuelve los µs por respuesta de cada tramo del historial."""
+    por_tramo = []
+    for _ in range(TRAMOS):
+        inicio = time.perf_counter()
+        for _ in range(respuestas // TRAMOS):
+            tarjeta = rng.choice(tarjetas)
+            acierto = rng.random() < 1 / (1 + math.exp(dificultades[tarjeta.id] - HABILIDAD_REAL))
+            motor.registrar(tarjeta.id, tarjeta.mazo, acierto, rng.lognormvariate(2.0, 0.4))
+        por_tramo.append((time.perf_counter() - inicio) / (respuestas // TRAMOS) * 1e6)
+    return por_tramo
+
+
+def main():
+    respuestas = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    num_tarjetas = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000
+
+    with tempfile.TemporaryDirectory() as directorio:
+        biblioteca = BibliotecaMazos(os.path.join(directorio, "biblioteca.sqlite"))
+        for inicio in range(0, num_tarjetas, TARJETAS_POR_MAZO):
+            fin = min(num_tarjetas, inicio + TARJETAS_POR_MAZO)
+            biblioteca.guardar("", f"Tema {inicio // 2000} - Mazo {inicio}", [tarjeta_sintetica(i) for i in range(inicio, fin)])
+        tarjetas = [t for nombre in biblioteca.nombres("") for t in biblioteca.cargar("", nombre)]
+        rng = random.Random(0)
+        dificultades = {t.id: rng.gauss(0, 1) for t in tarjetas}
+        print(f"{respuestas} respuestas sobre {len(tarjetas)} tarjetas")
+
+        motor = MotorAdaptativo()
+        tramos = simular(motor, tarjetas, dificultades, respuestas, random.Random(1))
+        print("  registrar en memoria (µs/respuesta por tramo del historial): "
+              + " · ".join(f"{t:.1f}" for t in tramos))
+
+        persistido = MotorAdaptativo(AlmacenAdaptativo(biblioteca.ruta))
+        tramos = simular(persistido, tarjetas, dificultades, respuestas // 10, random.Random(1))
+        print("  registrar con SQLite (µs/respuesta por tramo del historial): "
+              + " · ".join(f"{t:.1f}" for t in tramos))
+        inicio = time.perf_counter()
+        MotorAdaptativo(AlmacenAdaptativo(biblioteca.ruta))
+        print(f"  carga desde SQLite: {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+        mazo = biblioteca.cargar("", biblioteca.nombres("")[0])
+        inicio = time.perf_counter()
+        for _ in range(100):
+            motor.ordenar(mazo)
+        print(f"  ordenar un mazo de {len(mazo)} tarjetas: {(time.perf_counter() - inicio) * 10:.2f} ms")
+
+        vistas = [t for t in tarjetas if t.id in motor._tarjetas.filas]
+        estimadas = [motor._tarjetas["dificultad"][motor._tarjetas.filas[t.id]] for t in vistas]
+        correlacion = np.corrcoef(estimadas, [dificultades[t.id] for t in vistas])[0, 1]
+        nivel, probabilidad, _ = motor.nivel("Tema 0")
+        print(f"  correlación dificultad estimada/real: {correlacion:.2f} · nivel para 'Tema 0': {nivel} "
+              f"(acierto estimado {probabilidad:.0%}, real {1 / (1 + math.exp(-HABILIDAD_REAL)):.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# --- Benchmark: arranque en frío y coste de cada rerun ---
+# Mide, cada cosa en un proceso nuevo:
+#   - lo que cuesta importar cada librería pesada (tras importar Streamlit),
+#   - el primer run de la app (importaciones + script) con AppTest y qué
+#     librerías pesadas quedan cargadas en la portada y en "Mi Progreso"
+#     (fitz/pptx solo deberían aparecer al subir archivos, plotly.graph_objects
+#     lo importa ya Streamlit y pandas solo al consultar estadísticas),
+#   - la duración de los reruns siguientes y los bytes de elementos que envía
+#     cada uno, con los estilos servidos como archivo estático y sin servirlos
+#     (CSS incrustado en cada rerun).
+#
+# Uso: python benchmarks/bench_arranque.py [reruns]
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, RAIZ)
+
+RUTA_APP = os.path.join(RAIZ, "app_flashcards_medicas.py")
+PESADAS = ["fitz", "pptx", "pandas", "plotly.graph_objects", "google.generativeai"]
+
+
+def importar_en_proceso_nuevo(modulo):
+    """Milisegundos que tarda `import modulo` después de `import streamlit`; None si no está instalado."""
+    codigo = (
+        "import time, streamlit\n"
+        "inicio = time.perf_counter()\n"
+        f"import {modulo}\n"
+        "print((time.perf_counter() - inicio) * 1000)\n"
+    )
+    resultado = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, cwd=RAIZ)
+    return float(resultado.stdout.split()[-1]) if resultado.returncode == 0 else None
+
+
+def bytes_elementos(nodo):
+    """Bytes de los protos de los elementos del árbol (lo que el rerun envía al navegador)."""
+    hijos = getattr(nodo, "children", None)
+    if hijos:
+        return sum(bytes_elementos(hijo) for hijo in hijos.values())
+    proto = getattr(nodo, "proto", None)
+    return proto.ByteSize() if proto is not None and hasattr(proto, "ByteSize") else 0
+
+
+def sesion(reruns, estaticos):
+    """Se ejecuta en el proceso hijo: arranque en frío y reruns de la app."""
+    inicio = time.perf_counter()
+    from streamlit import config
+    from streamlit.testing.v1 import AppTest
+    importar_streamlit = time.perf_counter() - inicio
+    # Por defecto vale lo de .streamlit/config.toml; aquí se fuerza cada modo.
+    config.set_option("server.enableStaticServing", estaticos)
+
+    at = AppTest.from_file(RUTA_APP, default_timeout=120)
+    inicio = time.perf_counter()
+    at.run()
+    primer_run = time.perf_counter() - inicio
+    cargadas_portada = [m for m in PESADAS if m in sys.modules]
+
+    tiempos = []
+    for _ in range(reruns):
+        inicio = time.perf_counter()
+        at.run()
+        tiempos.append(time.perf_counter() - inicio)
+    bytes_rerun = bytes_elementos(at._tree)
+    estilos = sum(len(h.proto.body) for h in at.get("html"))
+
+    next(b for b in at.button if b.label.startswith("4. Estudiar")).click().run()
+    cargadas_progreso = [m for m in PESADAS if m in sys.modules]
+    return {
+        "importar_streamlit": importar_streamlit,
+        "primer_run": primer_run,
+        "rerun_p50": statistics.median(tiempos),
+        "rerun_max": max(tiempos),
+        "bytes_rerun": bytes_rerun,
+        "bytes_estilos": estilos,
+        "cargadas_portada": cargadas_portada,
+        "cargadas_progreso": cargadas_progreso,
+        "excepciones": [str(e.value) for e in at.exception],
+    }
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--sesion":
+        print(json.dumps(sesion(int(sys.argv[2]), sys.argv[3] == "estaticos")))
+        return
+    reruns = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    print("Importar cada librería pesada (proceso nuevo, tras importar Streamlit):")
+    costes = {}
+    for modulo in PESADAS:
+        costes[modulo] = importar_en_proceso_nuevo(modulo)
+        print(f"  {modulo:>22}: " + (f"{costes[modulo]:.0f} ms" if costes[modulo] is not None else "no instalado"))
+
+    for modo in ("estaticos", "incrustados"):
+        with tempfile.TemporaryDirectory() as directorio:
+            entorno = dict(
+                os.environ,
+                MEDFLASH_DATA_DIR=os.path.join(directorio, "datos"),
+                MEDFLASH_CACHE_DIR=os.path.join(directorio, "cache"),
+                MEDFLASH_BACKEND="local",
+            )
+            salida = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--sesion", str(reruns), modo],
+                capture_output=True, text=True, env=entorno, cwd=RAIZ, check=True,
+            ).stdout
+        r = json.loads(salida.strip().splitlines()[-1])
+        evitadas = [m for m in PESADAS if m not in r["cargadas_portada"] and costes[m] is not None]
+        print(f"\nEstilos {'como archivo estático' if modo == 'estaticos' else 'incrustados'}:")
+        print(f"  arranque en frío: importar Streamlit {r['importar_streamlit'] * 1000:.0f} ms · "
+              f"primer run {r['primer_run'] * 1000:.0f} ms")
+        print(f"  librerías pesadas en la portada: {', '.join(r['cargadas_portada']) or 'ninguna'} · "
+              f"en 'Mi Progreso': {', '.join(r['cargadas_progreso']) or 'ninguna'}")
+        print(f"  sin importar al arrancar: {', '.join(evitadas) or 'ninguna'} "
+              f"(~{sum(costes[m] for m in evitadas):.0f} ms)")
+        print(f"  rerun: p50 {r['rerun_p50'] * 1000:.1f} ms · máx {r['rerun_max'] * 1000:.1f} ms · "
+              f"{r['bytes_rerun']} bytes de elementos ({r['bytes_estilos']} de estilos)")
+        if r["excepciones"]:
+            print(f"  excepciones: {r['excepciones']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# --- Benchmark: pipeline de generación completo con el backend local ---
+# Genera un mazo a partir de un texto sintético pasando por el mismo camino
+# que la app (ClienteModelo con caché y cola → generar_mazo → parser) pero
+# con el sustituto local del modelo, una vez por cada tarifa conocida.
+# Informa de tiempo, tarjetas por segundo, tokens y coste por tarjeta. Los
+# tokens se estiman por caracteres y la salida es la del modelo simulado, así
+# que el coste es orientativo y sirve para comparar modelos entre sí.
+#
+# Uso: python benchmarks/bench_backends.py [num_preguntas] [caracteres] [latencia] [tokens_por_segundo]
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from backends import PRECIOS_POR_MILLON, BackendLocal
+from cliente_modelo import CacheRespuestas, ClienteModelo
+from cola_trabajos import ColaTrabajos
+from generacion import generar_mazo
+
+TERMINOS = [
+    "ventrículo", "aurícula", "válvula mitral", "nefrona", "asa de Henle", "glomérulo",
+    "insulina", "glucagón", "hipotálamo", "hipófisis", "alvéolo", "surfactante",
+]
+
+
+def texto_sintetico(caracteres, semilla=0):
+    rng = random.Random(semilla)
+    parrafos, total = [], 0
+    while total < caracteres:
+        frases = [
+            f"El {rng.choice(TERMINOS)} regula {rng.choice(TERMINOS)} en el contexto {rng.randrange(10**6)}."
+            for _ in range(rng.randint(3, 8))
+        ]
+        parrafo = " ".join(frases)
+        parrafos.append(parrafo)
+        total += len(parrafo) + 2
+    return "\n\n".join(parrafos)
+
+
+def main():
+    num_preguntas = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    caracteres = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    latencia = float(sys.argv[3]) if len(sys.argv) > 3 else 0.3
+    tokens_por_segundo = float(sys.argv[4]) if len(sys.argv) > 4 else 2000.0
+    texto = texto_sintetico(caracteres)
+
+    print(f"{num_preguntas} preguntas de {len(texto)} caracteres · latencia {latencia} s · {tokens_por_segundo:.0f} tokens/s")
+    print(f"{'tarifa':>34} {'tiempo':>8} {'tarj/s':>7} {'llamadas':>8} {'tok. ent.':>10} {'tok. sal.':>10} {'USD/tarjeta':>12}")
+    for modelo, (precio_entrada, precio_salida) in PRECIOS_POR_MILLON.items():
+        with tempfile.TemporaryDirectory() as directorio:
+            backend = BackendLocal(latencia=latencia, tokens_por_segundo=tokens_por_segundo,
+                                   precio_entrada=precio_entrada, precio_salida=precio_salida)
+            cola = ColaTrabajos(solicitudes_por_segundo=100.0, rafaga=20)
+            cliente = ClienteModelo(backend, cache=CacheRespuestas(os.path.join(directorio, "r.sqlite")), cola=cola)
+            inicio = time.perf_counter()
+            tarjetas = generar_mazo(texto, cliente.generar_stream, num_preguntas, "Medio", "Básicas")
+            tiempo = time.perf_counter() - inicio
+            consumo = cliente.consumo
+            print(
+                f"{modelo:>34} {tiempo:>7.2f}s {len(tarjetas) / tiempo:>7.1f} {consumo['llamadas']:>8} "
+                f"{consumo['tokens_entrada']:>10} {consumo['tokens_salida']:>10} "
+                f"{consumo['coste'] / max(1, len(tarjetas)):>12.6f}"
+            )
+
+            # Segunda pasada: todo sale de la caché de respuestas, sin llamadas ni coste.
+            inicio = time.perf_counter()
+            generar_mazo(texto, cliente.generar_stream, num_preguntas, "Medio", "Básicas")
+            if modelo == next(iter(PRECIOS_POR_MILLON)):
+                print(f"{'(repetición desde la caché)':>34} {time.perf_counter() - inicio:>7.2f}s"
+                      f" {'':>7} {cliente.consumo['llamadas'] - consumo['llamadas']:>8}")
+
+
+if __name__ == "__main__":
+    main()
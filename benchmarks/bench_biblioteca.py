@@ -0,0 +1,97 @@
+# --- Benchmark: biblioteca de mazos ---
+# Compara el diccionario en memoria por sesión (formato anterior) con la
+# biblioteca SQLite: tiempo de listar los nombres, de abrir un mazo y RSS del
+# proceso. Cada escenario corre en un subproceso para medir la RSS aislada.
+#
+# Uso: python benchmarks/bench_biblioteca.py [tarjetas] [tarjetas_por_mazo]
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, RAIZ)
+
+from biblioteca import BibliotecaMazos
+
+
+def tarjeta_sintetica(i):
+    return {
+        "pregunta": f"Pregunta {i}: ¿Cuál es el mecanismo de acción del fármaco {i}?",
+        "opciones": {letra: f"Opción {letra} de la tarjeta {i} " * 3 for letra in "ABCD"},
+        "respuesta_correcta": "ABCD"[i % 4],
+        "explicacion": f"Explicación detallada de la tarjeta {i}. " * 6,
+    }
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def escenario_dict(ruta_json):
+    """Formato anterior: la sesión guarda la biblioteca entera en un dict."""
+    base = rss_mb()
+    inicio = time.perf_counter()
+    with open(ruta_json, encoding="utf-8") as f:
+        flashcard_library = json.load(f)
+    nombres = list(flashcard_library.keys())
+    t_nombres = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    mazo = flashcard_library[nombres[len(nombres) // 2]]
+    t_mazo = time.perf_counter() - inicio
+    return t_nombres, t_mazo, len(mazo), rss_mb() - base
+
+
+def escenario_sqlite(ruta_db):
+    """Biblioteca en disco: nombres bajo demanda y carga perezosa del mazo activo."""
+    base = rss_mb()
+    biblioteca = BibliotecaMazos(ruta_db)
+    inicio = time.perf_counter()
+    nombres = biblioteca.nombres("")
+    t_nombres = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    mazo = biblioteca.cargar("", nombres[len(nombres) // 2])
+    t_mazo = time.perf_counter() - inicio
+    return t_nombres, t_mazo, len(mazo), rss_mb() - base
+
+
+def preparar(directorio, total, por_mazo):
+    ruta_json = os.path.join(directorio, "biblioteca.json")
+    ruta_db = os.path.join(directorio, "biblioteca.sqlite")
+    library = {}
+    biblioteca = BibliotecaMazos(ruta_db)
+    for m in range(0, total, por_mazo):
+        tarjetas = [tarjeta_sintetica(i) for i in range(m, min(m + por_mazo, total))]
+        library[f"Mazo {m // por_mazo}"] = tarjetas
+        biblioteca.guardar("", f"Mazo {m // por_mazo}", tarjetas)
+    with open(ruta_json, "w", encoding="utf-8") as f:
+        json.dump(library, f, ensure_ascii=False)
+    return ruta_json, ruta_db
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] in ("dict", "sqlite"):
+        funcion = escenario_dict if sys.argv[1] == "dict" else escenario_sqlite
+        print(json.dumps(funcion(sys.argv[2])))
+        return
+
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    por_mazo = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta_json, ruta_db = preparar(directorio, total, por_mazo)
+        print(f"{total} tarjetas en {total // por_mazo} mazos")
+        print(f"{'escenario':>10} {'nombres (ms)':>13} {'abrir mazo (ms)':>16} {'tarjetas':>9} {'ΔRSS (MB)':>10}")
+        for modo, ruta in (("dict", ruta_json), ("sqlite", ruta_db)):
+            salida = subprocess.run(
+                [sys.executable, __file__, modo, ruta], capture_output=True, text=True, check=True
+            ).stdout
+            t_nombres, t_mazo, n, rss = json.loads(salida)
+            print(f"{modo:>10} {t_nombres * 1000:>13.2f} {t_mazo * 1000:>16.2f} {n:>9} {rss:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+# --- Benchmark: carga con muchas sesiones de estudio simultáneas ---
+# Lanza N sesiones de la app en paralelo con el AppTest de Streamlit (cada
+# una con su propio session_state; los recursos de st.cache_resource se
+# comparten como en el servidor) contra el backend local del modelo. Cada
+# sesión sigue un flujo realista:
+#   subir apuntes → generar un mazo → estudiarlo en "Estudiar" (responder y
+#   "Siguiente Pregunta", que llama a go_to_next_question).
+# Para cada nivel de concurrencia informa del tiempo de script de los reruns
+# (p50/p95/p99, en total y por paso), reruns y tarjetas por segundo y la
+# memoria (RSS) que añade cada sesión. Si el tiempo de script crece con N
+# (contención en la caché, la cola, SQLite o el GIL con el trabajo en segundo
+# plano), ese es el punto en que el servidor empieza a saturarse.
+#
+# AppTest sustituye en cada run() un Runtime global del proceso, así que dos
+# run() no pueden solaparse: las sesiones viven en hilos (comparten caché,
+# cola y biblioteca como en el servidor) pero sus reruns pasan por un turno
+# del arnés. La espera de ese turno no existe en el servidor real, así que se
+# informa aparte como "cola del arnés" y no forma parte de la cifra principal;
+# por lo mismo, los reruns por segundo son una cota inferior. Lo que sí corre
+# en paralelo es el trabajo en segundo plano (generación en la cola). Entre
+# acción y acción cada estudiante "piensa" un tiempo aleatorio.
+#
+# Uso: python benchmarks/bench_carga.py [niveles, p. ej. 1,4,8] [preguntas] [latencia_modelo]
+
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, RAIZ)
+
+# Antes de importar nada de la app: datos aislados y modelo sin conexión.
+_temporal = tempfile.TemporaryDirectory()
+os.environ["MEDFLASH_DATA_DIR"] = os.path.join(_temporal.name, "datos")
+os.environ["MEDFLASH_CACHE_DIR"] = os.path.join(_temporal.name, "cache")
+os.environ["MEDFLASH_BACKEND"] = "local"
+
+from streamlit.testing.v1 import AppTest
+
+RUTA_APP = os.path.join(RAIZ, "app_flashcards_medicas.py")
+PERCENTILES = (50, 95, 99)
+ESPERA_SONDEO = 0.25   # segundos entre reruns mientras la generación está en la cola
+MAX_SONDEOS = 400
+PAUSA_USUARIO = 0.3    # segundos medios de "pensar" entre acciones
+
+_turno = threading.Lock()  # un AppTest.run() a la vez (ver cabecera); su espera no cuenta como latencia
+
+
+def memoria_rss():
+    """RSS actual del proceso en bytes (Linux); None si no se puede leer."""
+    try:
+        with open("/proc/self/status") as f:
+            for linea in f:
+                if linea.startswith("VmRSS:"):
+                    return int(linea.split()[1]) * 1024
+    except OSError:
+        return None
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+TERMINOS = [
+    "ventrículo izquierdo", "válvula mitral", "nefrona", "asa de Henle", "glomérulo", "insulina",
+    "glucagón", "hipotálamo", "hipófisis", "alvéolo", "surfactante", "tiroides", "hepatocito",
+    "eritropoyetina", "miocardio", "barorreceptor", "aldosterona", "plaqueta", "neutrófilo",
+]
+ACCIONES = ["regula", "inhibe", "estimula", "depende de", "compensa", "se altera con", "precede a"]
+
+
+def apuntes(n):
+    """Texto de estudio distinto para cada sesión (así no comparten respuestas en caché)."""
+    rng = random.Random(n)
+    parrafos = [
+        " ".join(
+            f"{rng.choice(TERMINOS).capitalize()} {rng.choice(ACCIONES)} {rng.choice(TERMINOS)} "
+            f"({rng.randrange(10, 500)} unidades, caso {n}-{t}-{i})."
+            for i in range(3)
+        )
+        for t in range(40)
+    ]
+    return "\n\n".join(parrafos).encode("utf-8")
+
+
+class Sesion:
+    """Una sesión de la app conducida como lo haría un estudiante."""
+
+    def __init__(self, n, preguntas):
+        self.n = n
+        self.preguntas = preguntas
+        self.tiempos = []  # (paso, segundos totales, segundos de script)
+        self.tarjetas = 0
+        self._rng = random.Random(n)
+        self.at = AppTest.from_file(RUTA_APP, default_timeout=120)
+
+    def _run(self, paso, widget=None):
+        if paso not in ("inicio", "sondeo"):
+            time.sleep(self._rng.uniform(0, 2 * PAUSA_USUARIO))
+        inicio = time.perf_counter()
+        with _turno:
+            inicio_script = time.perf_counter()
+            (widget.run() if widget is not None else self.at.run())
+        fin = time.perf_counter()
+        self.tiempos.append((paso, fin - inicio, fin - inicio_script))
+        if self.at.exception:
+            raise RuntimeError(f"sesión {self.n}, paso {paso}: {[e.value for e in self.at.exception]}")
+
+    def _boton(self, prefijo):
+        for boton in self.at.button:
+            if boton.label.startswith(prefijo):
+                return boton
+        raise RuntimeError(f"sesión {self.n}: no hay botón '{prefijo}' en {[b.label for b in self.at.button]}"
+                           f" (avisos: {[w.value for w in self.at.warning]})")
+
+    def _entrada(self, prefijo):
+        for entrada in self.at.text_input:
+            if entrada.label.startswith(prefijo):
+                return entrada
+        raise RuntimeError(f"sesión {self.n}: no hay campo '{prefijo}' en {[w.label for w in self.at.text_input]}"
+                           f" (página: {self.at.session_state.page})")
+
+    def flujo(self):
+        self._run("inicio")
+        self._entrada("Tu Nombre").set_value(f"estudiante{self.n}")
+        self._run("inicio")
+
+        # 1. Subir apuntes
+        self.at.file_uploader[0].set_value((f"apuntes_{self.n}.txt", apuntes(self.n), "text/plain"))
+        self._run("subir")
+
+        # 2. Generar el mazo y esperar a que termine el trabajo en la cola
+        self._run("navegar", self._boton("3. Generar Examen").click())
+        self._entrada("Nombre del Tema").set_value(f"Mazo {self.n}")
+        next(w for w in self.at.number_input if w.label.startswith("Número de Preguntas")).set_value(self.preguntas)
+        self._run("generar", self._boton("🚀 Generar").click())
+        for _ in range(MAX_SONDEOS):
+            if any("guardado" in s.value for s in self.at.success):
+                break
+            time.sleep(ESPERA_SONDEO)
+            self._run("sondeo")
+        else:
+            raise RuntimeError(f"sesión {self.n}: la generación no terminó")
+
+        # 3. Estudiar: responder cada tarjeta y pasar a la siguiente
+        self._run("navegar", self._boton("4. Estudiar y Progreso").click())
+        self._run("navegar", self._boton("Iniciar Estudio").click())
+        indice = 0
+        while True:
+            radios = [r for r in self.at.radio if r.key == f"user_answer_{indice}"]
+            if not radios:
+                break
+            radios[0].set_value(indice % len(radios[0].options))
+            self._run("responder", self._boton("Responder y ver explicación").click())
+            self._run("siguiente", self._boton("Siguiente Pregunta").click())
+            self.tarjetas += 1
+            indice += 1
+
+
+def ejecutar_nivel(num_sesiones, preguntas):
+    memoria_inicial = memoria_rss()
+    sesiones = [Sesion(n, preguntas) for n in range(ejecutar_nivel.siguiente, ejecutar_nivel.siguiente + num_sesiones)]
+    ejecutar_nivel.siguiente += num_sesiones
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=num_sesiones) as pool:
+        list(pool.map(lambda s: s.flujo(), sesiones))
+    duracion = time.perf_counter() - inicio
+    memoria_final = memoria_rss()
+
+    tiempos = [t for s in sesiones for t in s.tiempos]
+    # Los sondeos solo esperan a la cola; la latencia que nota el estudiante es la del resto.
+    interactivos = [t for t in tiempos if t[0] != "sondeo"]
+    tarjetas = sum(s.tarjetas for s in sesiones)
+    print(f"\n{num_sesiones} sesión(es) simultánea(s) · {duracion:.1f} s · {threading.active_count()} hilos")
+    print(f"  {len(tiempos)} reruns ({len(tiempos) / duracion:.1f}/s, cota inferior: el arnés los serializa) · "
+          f"{tarjetas} tarjetas estudiadas ({tarjetas / duracion:.1f}/s)")
+    print(f"  {'rerun (ms)':>10}      {'script p50/p95/p99':>20}   {'cola del arnés p50/p95/p99':>28}")
+    for paso in ("todos", "inicio", "subir", "navegar", "generar", "responder", "siguiente"):
+        valores = interactivos if paso == "todos" else [t for t in interactivos if t[0] == paso]
+        if valores:
+            script = "/".join(f"{percentil([t[2] for t in valores], p) * 1000:.0f}" for p in PERCENTILES)
+            cola = "/".join(f"{percentil([t[1] - t[2] for t in valores], p) * 1000:.0f}" for p in PERCENTILES)
+            print(f"  {paso:>10}: n={len(valores):<4} {script:>20}   {cola:>28}")
+    if memoria_inicial is not None:
+        print(f"  memoria: +{(memoria_final - memoria_inicial) / 2**20:.1f} MB "
+              f"({(memoria_final - memoria_inicial) / num_sesiones / 2**20:.1f} MB por sesión, "
+              f"RSS total {memoria_final / 2**20:.0f} MB)")
+    return sesiones
+
+
+ejecutar_nivel.siguiente = 0
+
+
+def main():
+    niveles = [int(n) for n in (sys.argv[1] if len(sys.argv) > 1 else "1,4,8").split(",")]
+    preguntas = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    os.environ["MEDFLASH_LATENCIA"] = sys.argv[3] if len(sys.argv) > 3 else "0.2"
+
+    # Calentamiento: importaciones y recursos compartidos fuera de la medición.
+    Sesion(-1, 1).flujo()
+    vivas = []
+    for num_sesiones in niveles:
+        # Las sesiones de cada nivel se mantienen vivas (como en un servidor con la cohorte conectada).
+        vivas += ejecutar_nivel(num_sesiones, preguntas)
+    print(f"\nSesiones vivas al final: {len(vivas)} · RSS {memoria_rss() / 2**20:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# --- Benchmark: cola de trabajos con el backend local ---
+# Usa el sustituto local del modelo (backends.BackendLocal) con latencia y
+# errores 429 con cierta probabilidad. Lanza a la vez muchas generaciones de
+# mazos (prioridad de lote) y varias verificaciones (interactivas) y mide:
+# espera en cola por carril, reintentos, trabajos completados y si la tasa de
+# peticiones reales respeta el cubo de tokens.
+#
+# Uso: python benchmarks/bench_cola_trabajos.py [generaciones] [verificaciones] [prob_error]
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from backends import BackendLocal
+from cliente_modelo import CacheRespuestas, ClienteModelo
+from cola_trabajos import COMPLETADO, PRIORIDAD_INTERACTIVA, PRIORIDAD_LOTE, ColaTrabajos
+from generacion import generar_mazo
+
+
+def trabajo_generar(trabajo, cliente, texto):
+    return generar_mazo(texto, cliente.generar_stream, 6, "Medio", "Básicas", max_caracteres=400)
+
+
+def trabajo_verificar(trabajo, cliente, texto):
+    return "".join(cliente.generar_stream([f"Verifica: {texto}"]))
+
+
+def main():
+    generaciones = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    verificaciones = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    prob_error = float(sys.argv[3]) if len(sys.argv) > 3 else 0.2
+    tasa = 40.0
+
+    with tempfile.TemporaryDirectory() as directorio:
+        cola = ColaTrabajos(max_trabajos=4, solicitudes_por_segundo=tasa, rafaga=5, espera_base=0.05, espera_maxima=0.5)
+        backend = BackendLocal(latencia=0.05, tokens_por_segundo=50000, prob_error=prob_error)
+        cliente = ClienteModelo(backend, cache=CacheRespuestas(os.path.join(directorio, "r.sqlite")), cola=cola)
+
+        inicio = time.monotonic()
+        trabajos = [
+            cola.enviar(trabajo_generar, cliente, "\n\n".join(f"Mazo {n}, párrafo {p}. " * 10 for p in range(6)),
+                        prioridad=PRIORIDAD_LOTE, descripcion="generación")
+            for n in range(generaciones)
+        ]
+        time.sleep(0.2)  # las verificaciones llegan con la cola ya llena
+        trabajos += [
+            cola.enviar(trabajo_verificar, cliente, f"Texto {n}", prioridad=PRIORIDAD_INTERACTIVA, descripcion="verificación")
+            for n in range(verificaciones)
+        ]
+        while any(t.activo for t in trabajos):
+            time.sleep(0.05)
+        total = time.monotonic() - inicio
+
+    print(f"{generaciones} generaciones + {verificaciones} verificaciones, prob. de error {prob_error:.0%}, límite {tasa:.0f} peticiones/s")
+    for prioridad, nombre in ((PRIORIDAD_INTERACTIVA, "interactiva"), (PRIORIDAD_LOTE, "lote")):
+        carril = [t for t in trabajos if t.prioridad == prioridad]
+        esperas = sorted(t.iniciado - t.creado for t in carril)
+        duraciones = sorted(t.terminado - t.creado for t in carril)
+        print(
+            f"  {nombre:>11}: {sum(t.estado == COMPLETADO for t in carril)}/{len(carril)} completados · "
+            f"espera en cola p50 {esperas[len(esperas) // 2]:.2f} s · "
+            f"fin p50 {duraciones[len(duraciones) // 2]:.2f} s · reintentos {sum(t.reintentos for t in carril)}"
+        )
+    # La tasa sostenida no puede superar el límite más la ráfaga inicial.
+    print(f"  peticiones reales: {backend.llamadas} en {total:.2f} s ({backend.llamadas / total:.1f}/s)")
+    fallidos = [t for t in trabajos if t.estado != COMPLETADO]
+    for t in fallidos[:3]:
+        print(f"  fallido: {t.descripcion}: {t.error!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# --- Benchmark: documento paginado frente a texto en la sesión ---
+# Simula varias sesiones con un documento extraído grande cada una. Compara
+# guardar el texto completo en la sesión (formato anterior) con guardar un
+# DocumentoTexto respaldado por mmap: RSS del proceso, bytes enviados al
+# navegador por rerun y coste de pedir una ventana o buscar. Cada escenario
+# corre en un subproceso para medir la RSS aislada.
+#
+# Uso: python benchmarks/bench_documento.py [megabytes_por_documento] [sesiones]
+
+import os
+import resource
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, RAIZ)
+
+from documento import DocumentoTexto
+
+PARRAFO = (
+    "La insuficiencia cardíaca con fracción de eyección reducida se trata con "
+    "IECA o ARA-II, betabloqueantes y antagonistas de la aldosterona. "
+)
+
+
+def texto_sintetico(megabytes):
+    repeticiones = megabytes * 1024 * 1024 // len(PARRAFO.encode("utf-8"))
+    return PARRAFO * repeticiones + "Síndrome de Takotsubo."
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def escenario(modo, megabytes, sesiones):
+    base = rss_mb()
+    inicio = time.perf_counter()
+    corpus = []
+    for _ in range(sesiones):
+        texto = texto_sintetico(megabytes)
+        corpus.append(texto if modo == "texto" else DocumentoTexto.desde_texto(texto))
+        del texto
+    t_carga = time.perf_counter() - inicio
+    if modo == "texto":
+        enviado = len(corpus[0].encode("utf-8"))  # el text_area recibía el texto completo
+        t_ventana = t_buscar = float("nan")
+    else:
+        documento = corpus[0]
+        inicio = time.perf_counter()
+        for pagina in range(0, documento.num_paginas, max(1, documento.num_paginas // 100)):
+            enviado = len(documento.ventana(pagina).encode("utf-8"))
+        t_ventana = (time.perf_counter() - inicio) / min(100, documento.num_paginas)
+        inicio = time.perf_counter()
+        assert documento.buscar("takotsubo") is not None
+        t_buscar = time.perf_counter() - inicio
+    print(f"{modo},{rss_mb() - base:.1f},{enviado},{t_carga:.3f},{t_ventana * 1e6:.1f},{t_buscar * 1000:.1f}")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--escenario":
+        escenario(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+        return
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    sesiones = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    print(f"{sesiones} sesiones con un documento de {megabytes} MB cada una")
+    print(f"{'modo':>10} {'RSS (MB)':>10} {'bytes/rerun':>12} {'carga (s)':>10} {'ventana (µs)':>13} {'búsqueda (ms)':>14}")
+    for modo in ("texto", "documento"):
+        salida = subprocess.run(
+            [sys.executable, __file__, "--escenario", modo, str(megabytes), str(sesiones)],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip().splitlines()[-1]
+        _, rss, enviado, t_carga, t_ventana, t_buscar = salida.split(",")
+        print(f"{modo:>10} {float(rss):>10.1f} {int(enviado):>12} {float(t_carga):>10.3f} {t_ventana:>13} {t_buscar:>14}")
+
+
+if __name__ == "__main__":
+    main()
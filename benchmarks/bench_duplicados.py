@@ -0,0 +1,101 @@
+# --- Benchmark: detección de casi duplicados ---
+# Crea una biblioteca sintética de 50k tarjetas (un 10 % son reformulaciones
+# de otras), mide el cálculo inicial de firmas, la recarga desde la tabla
+# `firmas`, y el coste de revisar un mazo nuevo con LSH frente a comparar
+# cada tarjeta nueva con toda la biblioteca. También estima precisión y
+# exhaustividad de LSH respecto a la comparación completa.
+#
+# Uso: python benchmarks/bench_duplicados.py [tarjetas] [tarjetas_por_mazo_nuevo]
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from biblioteca import BibliotecaMazos
+from duplicados import UMBRAL_SIMILITUD, DetectorDuplicados, firma_minhash, similitud, texto_tarjeta
+
+ORGANOS = ["corazón", "riñón", "hígado", "pulmón", "cerebro", "páncreas", "tiroides", "estómago"]
+FARMACOS = ["enalapril", "furosemida", "metformina", "salbutamol", "levotiroxina", "omeprazol", "warfarina"]
+MOLDES = [
+    "¿Cuál es el principal efecto adverso de {f} sobre el {o} en el paciente {n}?",
+    "Paciente {n} tratado con {f}: ¿qué alteración del {o} es más probable?",
+    "¿Qué mecanismo explica la acción de {f} en el {o} (caso {n})?",
+]
+
+
+def tarjeta_sintetica(i, rng):
+    f, o = rng.choice(FARMACOS), rng.choice(ORGANOS)
+    return {
+        "pregunta": rng.choice(MOLDES).format(f=f, o=o, n=i),
+        "opciones": {letra: f"{rng.choice(ORGANOS)} {rng.randrange(1000)} {letra}" for letra in "ABCD"},
+        "respuesta_correcta": rng.choice("ABCD"),
+        "explicacion": f"Explicación {i}.",
+    }
+
+
+def reformular(tarjeta):
+    """Misma tarjeta con otra redacción menor y las opciones en otro orden."""
+    opciones = list(tarjeta["opciones"].values())[::-1]
+    return {
+        "pregunta": tarjeta["pregunta"].replace("¿Cuál es", "¿Cuál sería").replace("es más probable", "es más frecuente"),
+        "opciones": dict(zip("ABCD", opciones)),
+        "respuesta_correcta": "A",
+        "explicacion": tarjeta["explicacion"],
+    }
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    por_mazo = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rng = random.Random(0)
+    tarjetas = [tarjeta_sintetica(i, rng) for i in range(total)]
+    with tempfile.TemporaryDirectory() as directorio:
+        biblioteca = BibliotecaMazos(os.path.join(directorio, "biblioteca.sqlite"))
+        for inicio in range(0, total, 500):
+            biblioteca.guardar("", f"Mazo {inicio // 500}", tarjetas[inicio:inicio + 500])
+
+        detector = DetectorDuplicados(biblioteca.ruta)
+        inicio = time.perf_counter()
+        detector.sincronizar()
+        t_firmas = time.perf_counter() - inicio
+
+        detector = DetectorDuplicados(biblioteca.ruta)
+        inicio = time.perf_counter()
+        detector.sincronizar()
+        t_recarga = time.perf_counter() - inicio
+
+        # Mazo nuevo: la mitad son reformulaciones de tarjetas existentes.
+        nuevas = [reformular(t) for t in rng.sample(tarjetas, por_mazo // 2)]
+        nuevas += [tarjeta_sintetica(total + i, rng) for i in range(por_mazo - len(nuevas))]
+
+        inicio = time.perf_counter()
+        duplicadas = detector.revisar(nuevas)
+        t_lsh = time.perf_counter() - inicio
+
+        # Referencia: comparar cada tarjeta nueva con toda la biblioteca.
+        inicio = time.perf_counter()
+        exactas = set()
+        for posicion, tarjeta in enumerate(nuevas):
+            if similitud(firma_minhash(texto_tarjeta(tarjeta)), detector._firmas).max() >= UMBRAL_SIMILITUD:
+                exactas.add(posicion)
+        t_completo = time.perf_counter() - inicio
+
+    encontradas = {d.posicion for d in duplicadas if d.tarjeta_id is not None}
+    print(f"{total} tarjetas en la biblioteca, mazo nuevo de {por_mazo} ({por_mazo // 2} reformuladas)")
+    print(f"firmas iniciales: {t_firmas:.1f} s ({t_firmas / total * 1e6:.0f} µs/tarjeta) · recarga: {t_recarga * 1000:.0f} ms")
+    print(f"revisar con LSH: {t_lsh * 1000 / por_mazo:.2f} ms/tarjeta · comparación completa: {t_completo * 1000 / por_mazo:.2f} ms/tarjeta")
+    print(
+        f"duplicadas detectadas: {len(encontradas)} (completa: {len(exactas)}) · "
+        f"exhaustividad LSH: {len(encontradas & exactas) / max(1, len(exactas)):.1%}"
+    )
+    print(f"memoria del índice: {(detector._firmas.nbytes + detector._claves_ordenadas.nbytes + detector._orden.nbytes) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
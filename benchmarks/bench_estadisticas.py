@@ -0,0 +1,80 @@
+# --- Benchmark: estadísticas con un millón de respuestas ---
+# Genera un registro columnar sintético, mide la carga inicial (group-bys
+# vectorizados), el coste de registrar una respuesta y el de las consultas
+# que usa la página "Mi Progreso".
+#
+# Uso: python benchmarks/bench_estadisticas.py [respuestas] [usuarios]
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from estadisticas import COLUMNAS, RegistroRespuestas
+
+
+def escribir_sintetico(directorio, n, usuarios, mazos=200, temas=20):
+    """Escribe directamente las columnas binarias y el diccionario de categorías."""
+    ruta = os.path.join(directorio, "respuestas")
+    os.makedirs(ruta)
+    rng = np.random.default_rng(0)
+    ahora = time.time()
+    datos = {
+        "usuario": rng.integers(0, usuarios, n),
+        "mazo": rng.integers(0, mazos, n),
+        "tarjeta": rng.integers(0, 100000, n),
+        "correcta": rng.random(n) < 0.7,
+        "latencia": rng.gamma(2.0, 4.0, n),
+        "instante": np.sort(ahora - rng.random(n) * 365 * 86400),
+    }
+    datos["tema"] = datos["mazo"] % temas
+    for columna, dtype in COLUMNAS.items():
+        datos[columna].astype(dtype).tofile(os.path.join(ruta, f"{columna}.bin"))
+    with open(os.path.join(ruta, "categorias.jsonl"), "w", encoding="utf-8") as f:
+        for i in range(usuarios):
+            f.write(json.dumps(["usuario", f"estudiante{i}"]) + "\n")
+        for i in range(mazos):
+            f.write(json.dumps(["mazo", f"Tema {i % temas} - Mazo {i}"]) + "\n")
+        for i in range(temas):
+            f.write(json.dumps(["tema", f"Tema {i}"]) + "\n")
+
+
+def cronometrar(funcion, repeticiones=20):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    usuarios = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    with tempfile.TemporaryDirectory() as directorio:
+        escribir_sintetico(directorio, n, usuarios)
+
+        inicio = time.perf_counter()
+        registro = RegistroRespuestas(directorio)
+        t_carga = time.perf_counter() - inicio
+
+        t_registrar = cronometrar(lambda: registro.registrar("estudiante0", "Tema 1 - Mazo 1", 1, True, 3.0), 1000)
+        consultas = {
+            "resumen": lambda: registro.resumen("estudiante0"),
+            "por_mazo": lambda: registro.por_mazo("estudiante0"),
+            "por_tema": lambda: registro.por_tema("estudiante0"),
+            "serie_diaria": lambda: registro.serie_diaria("estudiante0"),
+        }
+
+        print(f"{n} respuestas, {usuarios} usuarios")
+        print(f"carga inicial (agregación vectorizada): {t_carga * 1000:.0f} ms")
+        print(f"registrar(): {t_registrar * 1e6:.0f} µs por respuesta")
+        for nombre, consulta in consultas.items():
+            print(f"{nombre}(): {cronometrar(consulta) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
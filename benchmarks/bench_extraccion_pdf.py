@@ -0,0 +1,68 @@
+# --- Benchmark: extracción de PDF ---
+# Compara la función original (concatenación página a página en un solo hilo)
+# con el motor paralelo de extraccion.py sobre PDFs sintéticos grandes.
+#
+# Uso: python benchmarks/bench_extraccion_pdf.py [paginas ...]
+
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import fitz  # PyMuPDF
+
+from extraccion import extraer_texto_pdf
+
+PARRAFO = (
+    "La farmacocinética describe la absorción, distribución, metabolismo y "
+    "excreción de los fármacos. El volumen de distribución relaciona la dosis "
+    "administrada con la concentración plasmática alcanzada. "
+)
+
+
+def extraer_texto_pdf_original(file_stream):
+    """Versión anterior: lectura completa y concatenación con +=."""
+    doc = fitz.open(stream=file_stream.read(), filetype="pdf")
+    texto = ""
+    for page in doc:
+        texto += page.get_text()
+    doc.close()
+    return texto
+
+
+def crear_pdf_sintetico(paginas):
+    """Genera un PDF con texto denso en cada página."""
+    doc = fitz.open()
+    for n in range(paginas):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(36, 36, 576, 806), f"Página {n + 1}. " + PARRAFO * 12, fontsize=9)
+    datos = doc.tobytes()
+    doc.close()
+    return datos
+
+
+def medir(funcion, datos, repeticiones=3):
+    mejor = float("inf")
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(io.BytesIO(datos))
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def main():
+    tamanos = [int(a) for a in sys.argv[1:]] or [100, 400, 800]
+    print(f"{'páginas':>8} {'original (s)':>14} {'paralelo (s)':>14} {'speedup':>8}")
+    for paginas in tamanos:
+        datos = crear_pdf_sintetico(paginas)
+        t_original, texto_original = medir(extraer_texto_pdf_original, datos)
+        t_paralelo, texto_paralelo = medir(extraer_texto_pdf, datos)
+        assert texto_original == texto_paralelo, "El texto extraído no coincide"
+        print(f"{paginas:>8} {t_original:>14.3f} {t_paralelo:>14.3f} {t_original / t_paralelo:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# --- Benchmark: extracción de PPTX ---
+# Compara la función original (texto plano de las formas de primer nivel, en
+# un solo hilo) con el extractor estructurado de extraccion.py, que además
+# recorre grupos, tablas y notas del orador y reparte diapositivas entre procesos.
+#
+# Uso: python benchmarks/bench_extraccion_pptx.py [diapositivas ...]
+
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pptx import Presentation
+from pptx.util import Inches
+
+from extraccion import extraer_texto_pptx
+
+PARRAFO = (
+    "El gasto cardíaco es el producto de la frecuencia cardíaca por el volumen "
+    "sistólico. La precarga, la poscarga y la contractilidad determinan el "
+    "volumen sistólico. "
+)
+
+
+def extraer_texto_pptx_original(file_stream):
+    """Versión anterior: solo formas de primer nivel y concatenación con +=."""
+    prs = Presentation(file_stream)
+    texto = ""
+    for slide in prs.slides:
+        for shape in slide.shapes:
+            if hasattr(shape, "text"):
+                texto += shape.text + "\n"
+    return texto
+
+
+def crear_pptx_sintetico(diapositivas):
+    """Genera una presentación con título, cuerpo, tabla, grupo y notas en cada diapositiva."""
+    prs = Presentation()
+    layout = prs.slide_layouts[5]  # "Solo título"
+    for n in range(diapositivas):
+        slide = prs.slides.add_slide(layout)
+        slide.shapes.title.text = f"Fisiología Cardíaca {n + 1}"
+        cuadro = slide.shapes.add_textbox(Inches(0.5), Inches(1.5), Inches(9), Inches(2))
+        cuadro.text_frame.text = PARRAFO * 3
+        tabla = slide.shapes.add_table(3, 2, Inches(0.5), Inches(3.5), Inches(6), Inches(1.2)).table
+        for fila, (parametro, valor) in enumerate([("Parámetro", "Valor"), ("FC", "70 lpm"), ("VS", "70 ml")]):
+            tabla.cell(fila, 0).text = parametro
+            tabla.cell(fila, 1).text = valor
+        grupo = slide.shapes.add_group_shape()
+        for i in range(2):
+            forma = grupo.shapes.add_textbox(Inches(0.5 + 3 * i), Inches(5), Inches(3), Inches(0.5))
+            forma.text_frame.text = f"Esquema {n + 1}.{i + 1}: ventrículo izquierdo"
+        slide.notes_slide.notes_text_frame.text = f"Recordar la ley de Frank-Starling ({n + 1})."
+    salida = io.BytesIO()
+    prs.save(salida)
+    return salida.getvalue()
+
+
+def medir(funcion, datos, repeticiones=3):
+    mejor = float("inf")
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(io.BytesIO(datos))
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def main():
+    tamanos = [int(a) for a in sys.argv[1:]] or [50, 200, 500]
+    print(f"{'diapos':>7} {'original (diap/s)':>18} {'estructurado (diap/s)':>22} {'caracteres orig/estr':>22}")
+    for diapositivas in tamanos:
+        datos = crear_pptx_sintetico(diapositivas)
+        t_original, texto_original = medir(extraer_texto_pptx_original, datos)
+        t_nuevo, texto_nuevo = medir(extraer_texto_pptx, datos)
+        assert not texto_nuevo.startswith("Error"), texto_nuevo
+        assert f"--- Diapositiva {diapositivas}: Fisiología Cardíaca {diapositivas} ---" in texto_nuevo
+        assert "FC | 70 lpm" in texto_nuevo and "Notas: Recordar" in texto_nuevo
+        print(
+            f"{diapositivas:>7} {diapositivas / t_original:>18.0f} {diapositivas / t_nuevo:>22.0f} "
+            f"{len(texto_original):>10}/{len(texto_nuevo):<11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
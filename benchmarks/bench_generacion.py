@@ -0,0 +1,91 @@
+# --- Benchmark: generación de mazos map-reduce ---
+# Usa un modelo falso local (latencia fija + coste por pregunta) para medir sin
+# conexión el tiempo de generar mazos grandes con una sola llamada secuencial
+# por sección frente a las llamadas concurrentes de generacion.generar_mazo:
+# sin límite (64 hilos, cota de lo que permite el pipeline) y con la
+# configuración de la app (MAX_LLAMADAS_CONCURRENTES hilos y el cubo de tokens
+# de cola_trabajos, que es lo que ven los usuarios). Con más llamadas que la
+# ráfaga del cubo, la app va al ritmo del límite de peticiones: la columna
+# "mín. por límite" es esa cota, la misma para llamadas secuenciales.
+#
+# Uso: python benchmarks/bench_generacion.py [preguntas ...]
+
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cola_trabajos import RAFAGA_SOLICITUDES, SOLICITUDES_POR_SEGUNDO, CuboTokens
+from generacion import MAX_LLAMADAS_CONCURRENTES, dividir_en_secciones, generar_mazo
+
+LATENCIA_BASE = 0.4       # segundos por llamada
+LATENCIA_POR_PREGUNTA = 0.01
+
+
+class ModeloFalso:
+    """Simula Gemini: responde con N preguntas JSON tras una latencia artificial."""
+
+    def __init__(self):
+        self.llamadas = 0
+
+    def __call__(self, prompt_parts):
+        self.llamadas += 1
+        n = int(re.search(r"Genera (\d+) preguntas", " ".join(prompt_parts)).group(1))
+        seccion = re.search(r"Sección (\d+)\.", prompt_parts[2]).group(1)
+        time.sleep(LATENCIA_BASE + LATENCIA_POR_PREGUNTA * n)
+        preguntas = [
+            {
+                "pregunta": f"Pregunta {i} sobre la sección {seccion}",
+                "opciones": {"A": "uno", "B": "dos", "C": "tres", "D": "cuatro"},
+                "respuesta_correcta": "B",
+                "explicacion": "Explicación sintética.",
+            }
+            for i in range(n)
+        ]
+        return "```json\n" + json.dumps(preguntas, ensure_ascii=False) + "\n```"
+
+
+def material_sintetico(secciones):
+    parrafo = "El ciclo cardíaco comprende sístole y diástole ventricular. " * 40
+    return "\n\n".join(f"Sección {i}. {parrafo}" for i in range(secciones * 5))
+
+
+def medir(num_preguntas, max_workers, limitar=False):
+    """Segundos, tarjetas y llamadas; con `limitar`, cada llamada espera su token como en la app."""
+    modelo = ModeloFalso()
+    llamar = modelo
+    if limitar:
+        cubo = CuboTokens(SOLICITUDES_POR_SEGUNDO, RAFAGA_SOLICITUDES)
+
+        def llamar(prompt_parts):
+            cubo.adquirir()
+            return modelo(prompt_parts)
+
+    inicio = time.perf_counter()
+    mazo = generar_mazo(material_sintetico(40), llamar, num_preguntas, "Medio", "Materias Básicas",
+                        max_workers=max_workers)
+    return time.perf_counter() - inicio, len(mazo), modelo.llamadas
+
+
+def main():
+    tamanos = [int(a) for a in sys.argv[1:]] or [10, 50, 200, 500]
+    print(f"secciones en el material: {len(dividir_en_secciones(material_sintetico(40)))}")
+    print(f"app: {MAX_LLAMADAS_CONCURRENTES} llamadas simultáneas, {SOLICITUDES_POR_SEGUNDO:g} petición/s "
+          f"con ráfaga de {RAFAGA_SOLICITUDES}")
+    print(f"{'preguntas':>10} {'llamadas':>9} {'secuencial (s)':>15} {'sin límite (s)':>15} {'speedup':>8} "
+          f"{'app (s)':>8} {'speedup':>8} {'mín. por límite (s)':>20}")
+    for n in tamanos:
+        t_seq, tarjetas_seq, llamadas = medir(n, max_workers=1)
+        t_con, tarjetas_con, _ = medir(n, max_workers=64)
+        t_app, tarjetas_app, _ = medir(n, max_workers=MAX_LLAMADAS_CONCURRENTES, limitar=True)
+        assert tarjetas_seq == tarjetas_con == tarjetas_app == n
+        limite = max(0, llamadas - RAFAGA_SOLICITUDES) / SOLICITUDES_POR_SEGUNDO
+        print(f"{n:>10} {llamadas:>9} {t_seq:>15.2f} {t_con:>15.2f} {t_seq / t_con:>7.1f}x "
+              f"{t_app:>8.2f} {t_seq / t_app:>7.1f}x {limite:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
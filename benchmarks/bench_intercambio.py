@@ -0,0 +1,78 @@
+# --- Benchmark: exportar e importar la biblioteca ---
+# Crea una biblioteca sintética (por defecto 100k tarjetas en mazos de 500),
+# la exporta a .mflash con cada compresión disponible y a texto para Anki, y
+# la importa en una biblioteca vacía. Mide tiempo, tamaño del archivo y el
+# pico de memoria de Python durante la importación (tracemalloc), que no debe
+# crecer con el tamaño del archivo.
+#
+# Uso: python benchmarks/bench_intercambio.py [tarjetas] [tarjetas_por_mazo]
+
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import intercambio
+from biblioteca import BibliotecaMazos
+
+
+def tarjeta_sintetica(i):
+    return {
+        "pregunta": f"Pregunta {i}: ¿Cuál es el mecanismo de acción del fármaco {i}?",
+        "opciones": {letra: f"Opción {letra} de la tarjeta {i} " * 3 for letra in "ABCD"},
+        "respuesta_correcta": "ABCD"[i % 4],
+        "explicacion": f"Explicación detallada de la tarjeta {i}. " * 6,
+    }
+
+
+def main():
+    num_tarjetas = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    por_mazo = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    with tempfile.TemporaryDirectory() as directorio:
+        origen = BibliotecaMazos(os.path.join(directorio, "origen.sqlite"))
+        for inicio in range(0, num_tarjetas, por_mazo):
+            origen.guardar("", f"Mazo {inicio // por_mazo}", [tarjeta_sintetica(i) for i in range(inicio, min(num_tarjetas, inicio + por_mazo))])
+        bytes_sqlite = os.path.getsize(origen.ruta) + os.path.getsize(origen.ruta + "-wal")
+        print(f"{num_tarjetas} tarjetas en {-(-num_tarjetas // por_mazo)} mazos · SQLite {bytes_sqlite / 2**20:.1f} MB")
+
+        compresiones = ["gzip"] + (["zstd"] if intercambio.zstandard is not None else [])
+        for compresion in compresiones:
+            ruta = os.path.join(directorio, f"biblioteca_{compresion}{intercambio.EXTENSION}")
+            inicio = time.perf_counter()
+            with open(ruta, "wb") as f:
+                intercambio.exportar_biblioteca(origen, "", f, compresion)
+            exportar = time.perf_counter() - inicio
+            tamano = os.path.getsize(ruta)
+
+            destino = BibliotecaMazos(os.path.join(directorio, f"destino_{compresion}.sqlite"))
+            inicio = time.perf_counter()
+            with open(ruta, "rb") as f:
+                resumen = intercambio.importar_biblioteca(destino, "", f)
+            importar = time.perf_counter() - inicio
+            # Segunda importación (los nombres ya existen: se renombran) solo para medir la memoria.
+            tracemalloc.start()
+            with open(ruta, "rb") as f:
+                intercambio.importar_biblioteca(destino, "", f)
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f"  {compresion:>4}: archivo {tamano / 2**20:.1f} MB ({tamano / num_tarjetas:.0f} B/tarjeta) · "
+                f"exportar {exportar:.2f} s ({num_tarjetas / exportar:,.0f} tarjetas/s) · "
+                f"importar {importar:.2f} s ({resumen.tarjetas / importar:,.0f} tarjetas/s, pico {pico / 2**20:.1f} MB)"
+            )
+        if intercambio.zstandard is None:
+            print("  zstd: no disponible (pip install zstandard)")
+
+        inicio = time.perf_counter()
+        destino = io.StringIO()
+        intercambio.exportar_anki(origen, "", destino)
+        print(f"  anki: texto {len(destino.getvalue().encode('utf-8')) / 2**20:.1f} MB · exportar {time.perf_counter() - inicio:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
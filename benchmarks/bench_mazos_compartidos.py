@@ -0,0 +1,90 @@
+# --- Benchmark: mazos compartidos entre sesiones ---
+# Simula muchas sesiones (estudiantes) que abren los mismos mazos; cada
+# usuario tiene su propia copia del mazo en la biblioteca (como al importar un
+# mazo compartido). Compara la memoria que retienen las sesiones cuando cada
+# una carga sus tarjetas (BibliotecaMazos.cargar) con la de los manejadores
+# del almacén compartido, el tiempo de abrir un mazo (primera vez y ya
+# compartido) y el coste de quitar una tarjeta (copy-on-write).
+#
+# Uso: python benchmarks/bench_mazos_compartidos.py [sesiones] [mazos] [tarjetas_por_mazo]
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from biblioteca import BibliotecaMazos
+from mazos_compartidos import AlmacenMazos
+
+
+def tarjeta_sintetica(mazo, i):
+    return {
+        "pregunta": f"Mazo {mazo}: ¿qué efecto tiene el factor {i} sobre el gasto cardíaco en reposo?",
+        "opciones": {letra: f"Opción {letra} de la pregunta {i}" for letra in "ABCD"},
+        "respuesta_correcta": "ABCD"[i % 4],
+        "explicacion": f"Explicación detallada de la pregunta {i} del mazo {mazo}. " * 3,
+    }
+
+
+def medir(abrir, sesiones):
+    """Memoria retenida (MB) y ms por apertura al abrir un mazo en cada una de las sesiones."""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    abiertos = [abrir(*sesion) for sesion in sesiones]
+    duracion = time.perf_counter() - inicio
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return abiertos, memoria / 1e6, duracion / len(sesiones) * 1000
+
+
+def main():
+    num_sesiones = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    num_mazos = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    por_mazo = int(sys.argv[3]) if len(sys.argv) > 3 else 500
+
+    with tempfile.TemporaryDirectory() as directorio:
+        biblioteca = BibliotecaMazos(os.path.join(directorio, "biblioteca.sqlite"))
+        mazos = [[tarjeta_sintetica(m, i) for i in range(por_mazo)] for m in range(num_mazos)]
+        sesiones = [(f"estudiante{s}", f"Mazo {s % num_mazos}") for s in range(num_sesiones)]
+        for usuario, nombre in sesiones:
+            biblioteca.guardar(usuario, nombre, mazos[int(nombre.split()[-1])])
+        print(f"{num_sesiones} sesiones · {num_mazos} mazos distintos de {por_mazo} tarjetas")
+
+        copias, memoria_copias, ms_copias = medir(biblioteca.cargar, sesiones)
+        print(f"  una copia por sesión: {memoria_copias:.1f} MB · {ms_copias:.2f} ms por apertura")
+        del copias
+
+        almacen = AlmacenMazos()
+        manejadores, memoria_compartida, ms_compartido = medir(
+            lambda usuario, nombre: almacen.abrir(biblioteca, usuario, nombre), sesiones
+        )
+        estadisticas = almacen.estadisticas()
+        print(f"  mazos compartidos:   {memoria_compartida:.1f} MB · {ms_compartido:.2f} ms por apertura "
+              f"({estadisticas['mazos']} mazos en memoria, {estadisticas['referencias']} manejadores) · "
+              f"{memoria_copias / memoria_compartida:.0f}× menos memoria")
+
+        inicio = time.perf_counter()
+        for _ in range(100):
+            almacen.abrir(biblioteca, *sesiones[0]).liberar()
+        print(f"  abrir un mazo ya compartido: {(time.perf_counter() - inicio) * 10:.2f} ms")
+
+        manejador = manejadores[0]
+        inicio = time.perf_counter()
+        tarjeta = manejador[0]
+        manejador.quitar(0)
+        biblioteca.quitar_tarjeta(tarjeta.id)
+        duracion = time.perf_counter() - inicio
+        otros = sum(1 for m in manejadores[1:] if len(m) == por_mazo)
+        print(f"  quitar una tarjeta (copy-on-write): {duracion * 1000:.2f} ms · "
+              f"{otros} de {num_sesiones - 1} sesiones conservan el mazo original · "
+              f"{almacen.estadisticas()['mazos']} mazos en memoria")
+
+        del manejadores, manejador
+        print(f"  tras cerrar todas las sesiones: {almacen.estadisticas()['mazos']} mazos en memoria")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# --- Benchmark: memoria de tarjetas y resultados ---
+# Mide con tracemalloc la memoria de N tarjetas y N respuestas en el formato
+# de dicts anterior frente a Tarjeta/Respuesta (__slots__, opciones internadas,
+# respuestas como índices). Comprueba además que la conversión es sin pérdidas.
+#
+# Uso: python benchmarks/bench_memoria_tarjetas.py [tarjetas]
+
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from modelo_tarjetas import Respuesta, Tarjeta
+
+# Opciones que se repiten mucho en bancos de preguntas reales.
+OPCIONES_COMUNES = ["Todas las anteriores", "Ninguna de las anteriores", "Solo A y B", "Aumenta", "Disminuye"]
+
+
+def json_sintetico(n):
+    """Mazos en JSON (como los guarda la biblioteca): cada carga crea cadenas nuevas."""
+    tarjetas = []
+    for i in range(n):
+        opciones = {
+            "A": f"Inhibición de la enzima {i % 97}",
+            "B": OPCIONES_COMUNES[i % 5],
+            "C": OPCIONES_COMUNES[(i + 1) % 5],
+            "D": OPCIONES_COMUNES[(i + 2) % 5],
+        }
+        tarjetas.append({
+            "pregunta": f"Pregunta {i}: ¿Cuál es el efecto principal del fármaco {i}?",
+            "opciones": opciones,
+            "respuesta_correcta": "ABCD"[i % 4],
+            "explicacion": f"Explicación de la tarjeta {i}.",
+        })
+    return json.dumps(tarjetas, ensure_ascii=False)
+
+
+def medir(construir):
+    tracemalloc.start()
+    objeto = construir()
+    actual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return objeto, actual
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    texto = json_sintetico(n)
+
+    dicts, mem_dicts = medir(lambda: json.loads(texto))
+    tarjetas, mem_tarjetas = medir(lambda: [Tarjeta.desde_dict(d) for d in json.loads(texto)])
+    assert [t.a_dict() for t in tarjetas] == dicts, "La conversión no es sin pérdidas"
+
+    resultados, mem_resultados = medir(lambda: [
+        {
+            "correcta": i % 3 == 0,
+            "seleccionada": d["opciones"]["ABCD"[i % 4]],
+            "correcta_texto": d["opciones"][d["respuesta_correcta"]],
+        }
+        for i, d in enumerate(json.loads(texto))
+    ])
+    respuestas, mem_respuestas = medir(lambda: [Respuesta(i % 4, t.correcta) for i, t in enumerate(tarjetas)])
+
+    print(f"{n} tarjetas")
+    print(f"{'estructura':>12} {'dicts (MB)':>11} {'compacto (MB)':>14} {'ahorro':>7}")
+    for nombre, antes, despues in (
+        ("tarjetas", mem_dicts, mem_tarjetas),
+        ("respuestas", mem_resultados, mem_respuestas),
+    ):
+        print(f"{nombre:>12} {antes / 2**20:>11.1f} {despues / 2**20:>14.1f} {1 - despues / antes:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# --- Benchmark: OCR de páginas escaneadas ---
+# Genera un PDF mixto: páginas con capa de texto y páginas "escaneadas" (la
+# misma página rasterizada e insertada como imagen). Mide la extracción
+# completa en páginas por segundo:
+#   - en frío (OCR de las páginas escaneadas, con 1 worker y con el pool),
+#   - en caliente (las páginas escaneadas salen de la caché por página),
+# y el coste de la detección y el hash por página. Sin Tesseract instalado
+# solo se miden la detección y el hash (las páginas quedan marcadas).
+#
+# Uso: python benchmarks/bench_ocr.py [paginas] [fraccion_escaneada] [workers]
+
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import fitz  # PyMuPDF
+
+from extraccion import extraer_texto_pdf
+from ocr import clave_pagina, contar_paginas_sin_ocr, ocr_disponible, paginas_escaneadas
+
+PARRAFO = (
+    "La farmacocinética describe la absorción, distribución, metabolismo y "
+    "excreción de los fármacos. El volumen de distribución relaciona la dosis "
+    "administrada con la concentración plasmática alcanzada. "
+)
+
+
+class CacheEnMemoria:
+    """Misma interfaz que CacheExtraccion (obtener/guardar), sin disco."""
+
+    def __init__(self):
+        self.entradas = {}
+
+    def obtener(self, clave):
+        return self.entradas.get(clave)
+
+    def guardar(self, clave, texto):
+        self.entradas[clave] = texto
+
+
+def crear_pdf_mixto(paginas, fraccion_escaneada, dpi=150):
+    """PDF con una de cada 1/fraccion páginas escaneada (imagen sin texto)."""
+    doc = fitz.open()
+    cada = max(1, round(1 / fraccion_escaneada)) if fraccion_escaneada else 0
+    for n in range(paginas):
+        texto = f"Página {n + 1}. " + PARRAFO * 6
+        if cada and n % cada == 0:
+            # Se compone la página en un documento aparte y se inserta como imagen.
+            fuente = fitz.open()
+            pagina_fuente = fuente.new_page()
+            pagina_fuente.insert_textbox(fitz.Rect(36, 36, 576, 806), texto, fontsize=11)
+            imagen = pagina_fuente.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY).tobytes("png")
+            fuente.close()
+            doc.new_page().insert_image(fitz.Rect(0, 0, 595, 842), stream=imagen)
+        else:
+            doc.new_page().insert_textbox(fitz.Rect(36, 36, 576, 806), texto, fontsize=9)
+    datos = doc.tobytes()
+    doc.close()
+    return datos
+
+
+def main():
+    paginas = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    fraccion = float(sys.argv[2]) if len(sys.argv) > 2 else 0.25
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else max(1, min(os.cpu_count() or 1, 8))
+    datos = crear_pdf_mixto(paginas, fraccion)
+
+    with fitz.open(stream=datos, filetype="pdf") as doc:
+        textos = [pagina.get_text() for pagina in doc]
+        inicio = time.perf_counter()
+        escaneadas = paginas_escaneadas(doc, textos)
+        deteccion = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        for i in escaneadas:
+            clave_pagina(doc, i)
+        hashes = time.perf_counter() - inicio
+    print(f"{paginas} páginas, {len(escaneadas)} escaneadas · {len(datos) / 2**20:.1f} MB · {os.cpu_count()} CPU")
+    print(f"  detección: {deteccion * 1000:.1f} ms ({paginas / deteccion:,.0f} páginas/s) · "
+          f"hash: {hashes * 1000:.1f} ms ({len(escaneadas) / max(hashes, 1e-9):,.0f} páginas/s)")
+
+    if not ocr_disponible():
+        inicio = time.perf_counter()
+        texto = extraer_texto_pdf(io.BytesIO(datos), max_workers=1)
+        duracion = time.perf_counter() - inicio
+        print(f"  Tesseract no está instalado: {contar_paginas_sin_ocr(texto)} páginas marcadas sin OCR; "
+              f"extracción {paginas / duracion:,.0f} páginas/s")
+        return
+
+    for num_workers in sorted({1, workers}):
+        cache = CacheEnMemoria()
+        inicio = time.perf_counter()
+        texto = extraer_texto_pdf(io.BytesIO(datos), max_workers=num_workers, cache_ocr=cache)
+        frio = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        extraer_texto_pdf(io.BytesIO(datos), max_workers=num_workers, cache_ocr=cache)
+        caliente = time.perf_counter() - inicio
+        reconocidas = sum("farmacocin" in t for t in cache.entradas.values())
+        print(
+            f"  {num_workers} worker(s): en frío {frio:.2f} s ({paginas / frio:.1f} páginas/s, "
+            f"{len(escaneadas) / frio:.2f} escaneadas/s) · en caliente {caliente:.2f} s "
+            f"({paginas / caliente:,.0f} páginas/s) · {reconocidas}/{len(escaneadas)} con texto reconocido · "
+            f"{len(texto)} caracteres"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# --- Benchmark: índice de recuperación ---
+# Construye el índice de un "libro de texto" sintético con muchos temas, mide
+# la construcción, la recarga desde disco y la búsqueda top-k, y compara los
+# caracteres que se enviarían a Gemini con y sin enfoque en un tema.
+#
+# Uso: python benchmarks/bench_recuperacion.py [megabytes] [consultas]
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from recuperacion import AlmacenIndices, buscar_fragmentos
+
+TEMAS = [
+    "ciclo cardíaco sístole diástole presión ventricular válvula mitral",
+    "insuficiencia renal aguda creatinina filtrado glomerular oliguria",
+    "epilepsia crisis focales electroencefalograma levetiracetam",
+    "diabetes mellitus insulina hemoglobina glicosilada cetoacidosis",
+    "asma broncoespasmo salbutamol corticoides inhalados espirometría",
+    "anemia ferropénica ferritina hierro sérico microcitosis",
+    "sepsis lactato noradrenalina hemocultivos antibióticos empíricos",
+    "hipotiroidismo tirotropina levotiroxina mixedema",
+]
+RELLENO = "paciente tratamiento diagnóstico clínica evolución pronóstico fisiopatología".split()
+
+
+def libro_sintetico(megabytes, semilla=0):
+    rng = random.Random(semilla)
+    parrafos, tamano = [], 0
+    while tamano < megabytes * 1024 * 1024:
+        palabras = TEMAS[rng.randrange(len(TEMAS))].split()
+        parrafo = " ".join(rng.choice(palabras if rng.random() < 0.4 else RELLENO) for _ in range(120)) + "."
+        parrafos.append(parrafo)
+        tamano += len(parrafo) + 2
+    return "\n\n".join(parrafos)
+
+
+def main():
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    consultas = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    texto = libro_sintetico(megabytes)
+    with tempfile.TemporaryDirectory() as directorio:
+        inicio = time.perf_counter()
+        indice = AlmacenIndices(directorio).indexar(texto)
+        t_construir = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        AlmacenIndices(directorio).indexar(texto)
+        t_recargar = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for i in range(consultas):
+        resultados = buscar_fragmentos([indice], "ciclo cardíaco" if i % 2 else "insuficiencia renal", 12)
+    t_buscar = (time.perf_counter() - inicio) / consultas
+
+    enviados = sum(int(indice.posiciones[f][1] - indice.posiciones[f][0]) for _, f, _ in resultados)
+    print(f"{len(texto) / 1e6:.1f} M caracteres, {indice.num_fragmentos} fragmentos, índice de {indice.nbytes / 1e6:.1f} MB")
+    print(f"construcción: {t_construir:.2f} s · recarga desde disco: {t_recargar * 1000:.0f} ms")
+    print(f"búsqueda top-12: {t_buscar * 1000:.1f} ms por consulta")
+    print(
+        f"material enviado: {enviados} bytes con tema frente a {len(texto.encode('utf-8'))} sin tema "
+        f"({len(texto.encode('utf-8')) / enviados:.0f}x menos, ~{enviados // 4} tokens)"
+    )
+
+
+if __name__ == "__main__":
+    main()
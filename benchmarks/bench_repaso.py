@@ -0,0 +1,62 @@
+# --- Benchmark: simulación de un año de repaso espaciado ---
+# Reproduce un año de repasos sintéticos sobre una biblioteca grande con el
+# PlanificadorRepaso en memoria: cada día se repasan las tarjetas vencidas
+# (hasta un máximo diario) y el acierto depende de la retención esperada.
+# Informa del coste medio de elegir la siguiente tarjeta, de registrar y de
+# contar las pendientes para el botón de repaso.
+#
+# Uso: python benchmarks/bench_repaso.py [tarjetas] [repasos_por_dia]
+
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from repaso import SEGUNDOS_POR_DIA, PlanificadorRepaso
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    por_dia = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+    rng = random.Random(42)
+    planificador = PlanificadorRepaso()
+    inicio_sim = 0.0
+    # Las tarjetas se van incorporando a lo largo del año, como mazos nuevos.
+    for tarjeta_id in range(total):
+        planificador.agregar(tarjeta_id, ahora=inicio_sim + (tarjeta_id * 365 // total) * SEGUNDOS_POR_DIA)
+
+    t_siguiente = t_registrar = 0.0
+    repasos = aciertos = 0
+    for dia in range(365):
+        ahora = inicio_sim + dia * SEGUNDOS_POR_DIA + 3600
+        for _ in range(por_dia):
+            t0 = time.perf_counter()
+            tarjeta_id = planificador.siguiente(ahora)
+            t1 = time.perf_counter()
+            t_siguiente += t1 - t0
+            if tarjeta_id is None:
+                break
+            estado = planificador._estados[tarjeta_id]
+            # Retención aproximada exp(-1/intervalo): más intervalo, más estable.
+            acierto = rng.random() < math.exp(-1 / max(estado.intervalo, 0.5)) + 0.1
+            t2 = time.perf_counter()
+            planificador.registrar(tarjeta_id, acierto, ahora)
+            t_registrar += time.perf_counter() - t2
+            repasos += 1
+            aciertos += acierto
+
+    print(f"{total} tarjetas, {repasos} repasos en 365 días ({aciertos / repasos:.0%} aciertos)")
+    print(f"siguiente(): {t_siguiente / repasos * 1e6:.1f} µs por llamada")
+    print(f"registrar(): {t_registrar / repasos * 1e6:.1f} µs por llamada")
+    print(f"pendientes al final del año: {planificador.num_pendientes(total, ahora)}")
+    t = time.perf_counter()
+    for _ in range(100):
+        planificador.num_pendientes(100, ahora)
+    print(f"num_pendientes() con tope 100: {(time.perf_counter() - t) * 10:.2f} ms por llamada")
+
+
+if __name__ == "__main__":
+    main()
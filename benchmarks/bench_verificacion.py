@@ -0,0 +1,109 @@
+# --- Benchmark: verificación incremental por secciones ---
+# Verifica unos apuntes sintéticos con el backend local del modelo y luego
+# versiones revisadas (1, 5 y 20 párrafos editados o insertados). Para cada
+# una compara el análisis incremental (solo las secciones nuevas o
+# modificadas) con enviar el documento entero con el prompt anterior:
+# secciones enviadas, tokens de entrada y salida (estimados), coste (con la
+# tarifa del modelo Gemini) y tiempo. El primer análisis cuesta más que una
+# sola llamada porque cada sección recibe su propio informe; los siguientes,
+# solo lo que cambió.
+#
+# Uso: python benchmarks/bench_verificacion.py [parrafos] [latencia_modelo]
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from backends import NOMBRE_MODELO, PRECIOS_POR_MILLON, BackendLocal, estimar_tokens
+from cliente_modelo import CacheRespuestas, ClienteModelo
+from verificacion import TTL_INFORMES, InformeVerificacion, verificar_secciones
+
+EDICIONES = (1, 5, 20)
+TERMINOS = ["gasto cardíaco", "precarga", "poscarga", "contractilidad", "fracción de eyección", "presión arterial"]
+
+
+def prompt_documento(texto):
+    """Prompt del análisis anterior, con el documento entero en una sola llamada."""
+    return [
+        "Rol: Eres un profesor de medicina y revisor científico experto.",
+        f"Texto a revisar:\n---\n{texto}\n---\n",
+        "Tu Tarea: Analiza el texto y evalúa su precisión científica, coherencia y claridad.",
+        "Marca los conceptos clave con un color/ícono:",
+        "🟢 Correcto y claro.",
+        "🟡 Parcialmente correcto (requiere aclaración).",
+        "🔴 Incorrecto o confuso.",
+        "Provee un resumen de tu análisis en formato Markdown.",
+        "Para puntos 🟡 y 🔴, provee una breve sugerencia o corrección con referencia a fuentes médicas estándar (ej. Harrison, ILAE, etc.).",
+    ]
+
+
+def apuntes(num_parrafos, rng):
+    return [
+        " ".join(
+            f"{rng.choice(TERMINOS).capitalize()} ({p}.{l}): aumenta un {rng.randrange(5, 60)}% con el ejercicio."
+            for l in range(rng.randint(1, 5))
+        )
+        for p in range(num_parrafos)
+    ]
+
+
+def revisar(parrafos, ediciones, rng):
+    """Copia con `ediciones` cambios: la mitad edita un párrafo, la otra mitad inserta uno nuevo."""
+    revisados = list(parrafos)
+    for n in range(ediciones):
+        i = rng.randrange(len(revisados))
+        if n % 2:
+            revisados.insert(i, f"Párrafo añadido {n}: la frecuencia cardíaca modula el gasto.")
+        else:
+            revisados[i] += " (Revisado.)"
+    return revisados
+
+
+def main():
+    num_parrafos = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    latencia = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+
+    with tempfile.TemporaryDirectory() as directorio:
+        precio_entrada, precio_salida = PRECIOS_POR_MILLON[NOMBRE_MODELO]
+        backend = BackendLocal(latencia=latencia, tokens_por_segundo=2000,
+                               precio_entrada=precio_entrada, precio_salida=precio_salida)
+        cliente = ClienteModelo(backend, cache=CacheRespuestas(os.path.join(directorio, "respuestas.sqlite")))
+        cache = CacheRespuestas(os.path.join(directorio, "verificaciones.sqlite"), ttl=TTL_INFORMES)
+        rng = random.Random(0)
+        parrafos = apuntes(num_parrafos, rng)
+        texto = "\n\n".join(parrafos)
+        tokens_documento = sum(estimar_tokens(p) for p in prompt_documento(texto))
+        print(f"{num_parrafos} párrafos · {len(texto) / 1000:.0f} mil caracteres · documento entero "
+              f"≈{tokens_documento} tokens (${backend.coste(tokens_documento, 0):.4f} de entrada) · "
+              f"latencia del modelo {latencia} s")
+
+        def analizar(nombre, texto):
+            antes = dict(cliente.consumo)
+            inicio = time.perf_counter()
+            informe = verificar_secciones(InformeVerificacion(texto, cliente.nombre_modelo, cache), cliente, cache)
+            duracion = time.perf_counter() - inicio
+            tokens = cliente.consumo["tokens_entrada"] - antes["tokens_entrada"]
+            salida = cliente.consumo["tokens_salida"] - antes["tokens_salida"]
+            print(f"  {nombre:>20}: {informe.analizadas:>3} de {len(informe.secciones)} secciones enviadas · "
+                  f"≈{tokens} tokens de entrada ({tokens / tokens_documento:.0%} del documento), ≈{salida} de salida · "
+                  f"${cliente.consumo['coste'] - antes['coste']:.4f} · {duracion:.2f} s")
+
+        # Referencia: el análisis anterior, una sola llamada con el documento entero.
+        antes = dict(cliente.consumo)
+        inicio = time.perf_counter()
+        cliente.generar(prompt_documento(texto))
+        print(f"  {'documento entero':>20}: 1 llamada · ≈{tokens_documento} tokens de entrada, "
+              f"≈{cliente.consumo['tokens_salida'] - antes['tokens_salida']} de salida · "
+              f"${cliente.consumo['coste'] - antes['coste']:.4f} · {time.perf_counter() - inicio:.2f} s")
+        analizar("primer análisis", texto)
+        analizar("sin cambios", texto)
+        for ediciones in EDICIONES:
+            analizar(f"{ediciones} párrafo(s) cambiados", "\n\n".join(revisar(parrafos, ediciones, random.Random(ediciones))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+# --- Biblioteca de Mazos (SQLite) ---
+# Guarda los mazos y sus tarjetas una sola vez en disco. La página de progreso
+# solo consulta los nombres; las tarjetas de un mazo se cargan al abrirlo, así
+# que la memoria de cada sesión depende del mazo activo y no de la biblioteca.
+#
+# Los mazos se agrupan por usuario (el nombre opcional de la barra lateral o,
+# sin nombre, un id anónimo propio de la sesión). Cada mazo guarda la huella
+# (hash) de su contenido: mazos iguales de distintos usuarios se comparten en
+# memoria (ver mazos_compartidos.py).
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from modelo_tarjetas import Tarjeta
+
+DIRECTORIO_DATOS = os.environ.get(
+    "MEDFLASH_DATA_DIR", os.path.join(os.path.expanduser("~"), ".local", "share", "med_flash")
+)
+# Tarjetas por lote al recorrer o importar mazos en streaming.
+TARJETAS_POR_LOTE = 2000
+
+
+def huella_contenido(filas):
+    """Hash del contenido de un mazo (el JSON de sus tarjetas, en orden): mismo contenido, misma huella."""
+    resumen = hashlib.sha256()
+    for datos in filas:
+        resumen.update(datos.encode("utf-8"))
+        resumen.update(b"\x1e")
+    return resumen.hexdigest()
+
+
+# Con AUTOINCREMENT los ids no se reutilizan tras borrar un mazo: el repaso, las
+# estadísticas y el modelo adaptativo guardan estados por id de tarjeta.
+TABLAS = {
+    "mazos": """(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        usuario TEXT NOT NULL,
+        nombre TEXT NOT NULL,
+        creado REAL NOT NULL,
+        num_tarjetas INTEGER NOT NULL,
+        contenido TEXT,
+        UNIQUE (usuario, nombre)
+    )""",
+    "tarjetas": """(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        mazo_id INTEGER NOT NULL REFERENCES mazos(id) ON DELETE CASCADE,
+        posicion INTEGER NOT NULL,
+        datos TEXT NOT NULL
+    )""",
+}
+INDICE = "CREATE INDEX IF NOT EXISTS idx_tarjetas_mazo ON tarjetas(mazo_id, posicion);"
+# Última actividad de los usuarios cuyos datos caducan (las sesiones anónimas).
+ACTIVIDAD = "CREATE TABLE IF NOT EXISTS actividad (usuario TEXT PRIMARY KEY, visto REAL NOT NULL);"
+
+
+class BibliotecaMazos:
+    """Almacén persistente de mazos compartido por todas las sesiones del proceso."""
+
+    def __init__(self, ruta=None):
+        if ruta is None:
+            os.makedirs(DIRECTORIO_DATOS, exist_ok=True)
+            ruta = os.path.join(DIRECTORIO_DATOS, "biblioteca.sqlite")
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(ruta, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(
+            "".join(f"CREATE TABLE IF NOT EXISTS {tabla} {columnas};" for tabla, columnas in TABLAS.items())
+            + INDICE + ACTIVIDAD
+        )
+        # Bibliotecas anteriores a la huella: la columna se añade y se rellena al abrir cada mazo.
+        if "contenido" not in {fila[1] for fila in self._db.execute("PRAGMA table_info(mazos)")}:
+            self._db.execute("ALTER TABLE mazos ADD COLUMN contenido TEXT")
+        self._db.commit()
+        self._migrar_autoincremento()
+        self._db.commit()
+
+    def _migrar_autoincremento(self):
+        """Reconstruye las tablas de bibliotecas creadas sin AUTOINCREMENT, conservando los ids."""
+        esquemas = dict(self._db.execute("SELECT name, sql FROM sqlite_master WHERE name IN ('mazos', 'tarjetas')"))
+        pendientes = [tabla for tabla in TABLAS if "AUTOINCREMENT" not in esquemas[tabla].upper()]
+        if not pendientes:
+            return
+        # Sin claves foráneas mientras tanto, para que borrar la tabla vieja no borre en cascada.
+        self._db.execute("PRAGMA foreign_keys=OFF")
+        try:
+            with self._db:
+                self._db.execute("BEGIN")
+                for tabla in pendientes:
+                    columnas = ", ".join(fila[1] for fila in self._db.execute(f"PRAGMA table_info({tabla})"))
+                    self._db.execute(f"CREATE TABLE {tabla}_nueva {TABLAS[tabla]}")
+                    self._db.execute(f"INSERT INTO {tabla}_nueva ({columnas}) SELECT {columnas} FROM {tabla}")
+                    self._db.execute(f"DROP TABLE {tabla}")
+                    self._db.execute(f"ALTER TABLE {tabla}_nueva RENAME TO {tabla}")
+                self._db.execute(INDICE)
+        finally:
+            self._db.execute("PRAGMA foreign_keys=ON")
+
+    def nombres(self, usuario):
+        """Nombres de los mazos del usuario, del más antiguo al más reciente."""
+        with self._lock:
+            filas = self._db.execute(
+                "SELECT nombre FROM mazos WHERE usuario = ? ORDER BY creado, id", (usuario,)
+            ).fetchall()
+        return [nombre for (nombre,) in filas]
+
+    def existe(self, usuario, nombre):
+        with self._lock:
+            fila = self._db.execute(
+                "SELECT 1 FROM mazos WHERE usuario = ? AND nombre = ?", (usuario, nombre)
+            ).fetchone()
+        return fila is not None
+
+    def guardar(self, usuario, nombre, tarjetas):
+        """Guarda un mazo nuevo; falla con sqlite3.IntegrityError si el nombre ya existe."""
+        filas = [
+            json.dumps(t.a_dict() if isinstance(t, Tarjeta) else t, ensure_ascii=False) for t in tarjetas
+        ]
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "INSERT INTO mazos (usuario, nombre, creado, num_tarjetas, contenido) VALUES (?, ?, ?, ?, ?)",
+                (usuario, nombre, time.time(), len(filas), huella_contenido(filas)),
+            )
+            mazo_id = cursor.lastrowid
+            self._db.executemany(
+                "INSERT INTO tarjetas (mazo_id, posicion, datos) VALUES (?, ?, ?)",
+                ((mazo_id, i, datos) for i, datos in enumerate(filas)),
+            )
+        return mazo_id
+
+    def cargar(self, usuario, nombre):
+        """Carga las tarjetas de un mazo (objetos Tarjeta) en orden, o None si no existe."""
+        with self._lock:
+            fila = self._db.execute(
+                "SELECT id FROM mazos WHERE usuario = ? AND nombre = ?", (usuario, nombre)
+            ).fetchone()
+            if fila is None:
+                return None
+            filas = self._db.execute(
+                "SELECT id, datos FROM tarjetas WHERE mazo_id = ? ORDER BY posicion", (fila[0],)
+            ).fetchall()
+        nombre = sys.intern(nombre)
+        return [Tarjeta.desde_dict(json.loads(datos), id=tarjeta_id, mazo=nombre) for tarjeta_id, datos in filas]
+
+    def cargar_tarjetas(self, ids):
+        """Carga tarjetas sueltas por id, en el orden pedido; omite las que ya no existen."""
+        ids = list(ids)
+        if not ids:
+            return []
+        with self._lock:
+            filas = self._db.execute(
+                "SELECT t.id, t.datos, m.nombre FROM tarjetas t JOIN mazos m ON m.id = t.mazo_id"
+                f" WHERE t.id IN ({','.join('?' * len(ids))})",
+                ids,
+            ).fetchall()
+        por_id = {tarjeta_id: (datos, sys.intern(nombre)) for tarjeta_id, datos, nombre in filas}
+        return [
+            Tarjeta.desde_dict(json.loads(por_id[i][0]), id=i, mazo=por_id[i][1]) for i in ids if i in por_id
+        ]
+
+    def eliminar(self, usuario, nombre):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM mazos WHERE usuario = ? AND nombre = ?", (usuario, nombre))
+
+    # --- Usuarios que caducan ---
+    def registrar_actividad(self, usuario, instante=None):
+        """Anota que el usuario sigue activo (ver purgar_inactivos)."""
+        instante = time.time() if instante is None else instante
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO actividad (usuario, visto) VALUES (?, ?)", (usuario, instante))
+
+    def purgar_inactivos(self, prefijo, antes_de):
+        """Borra los mazos (y en cascada sus tarjetas y estados) de los usuarios que empiezan por `prefijo`
+        sin actividad ni mazos nuevos desde `antes_de`. Devuelve esos usuarios.
+        """
+        patron = prefijo + "*"  # GLOB: distingue mayúsculas, a diferencia de LIKE
+        with self._lock, self._db:
+            usuarios = [usuario for (usuario,) in self._db.execute(
+                "SELECT usuario FROM (SELECT usuario, visto FROM actividad WHERE usuario GLOB ?"
+                " UNION ALL SELECT usuario, creado FROM mazos WHERE usuario GLOB ?)"
+                " GROUP BY usuario HAVING MAX(visto) < ?",
+                (patron, patron, antes_de),
+            )]
+            for usuario in usuarios:
+                self._db.execute("DELETE FROM mazos WHERE usuario = ?", (usuario,))
+                self._db.execute("DELETE FROM actividad WHERE usuario = ?", (usuario,))
+        return usuarios
+
+    # --- Contenido compartido (ver mazos_compartidos.py) ---
+    def _actualizar_huella(self, mazo_id):
+        # Llamar con self._lock tomado y dentro de una transacción.
+        filas = [datos for (datos,) in self._db.execute(
+            "SELECT datos FROM tarjetas WHERE mazo_id = ? ORDER BY posicion", (mazo_id,)
+        )]
+        huella = huella_contenido(filas)
+        self._db.execute(
+            "UPDATE mazos SET num_tarjetas = ?, contenido = ? WHERE id = ?", (len(filas), huella, mazo_id)
+        )
+        return huella
+
+    def abrir(self, usuario, nombre):
+        """(id del mazo, huella del contenido, ids de sus tarjetas en orden) sin leer las tarjetas, o None."""
+        with self._lock, self._db:
+            fila = self._db.execute(
+                "SELECT id, contenido FROM mazos WHERE usuario = ? AND nombre = ?", (usuario, nombre)
+            ).fetchone()
+            if fila is None:
+                return None
+            mazo_id, huella = fila
+            if huella is None:
+                huella = self._actualizar_huella(mazo_id)
+            ids = [tarjeta_id for (tarjeta_id,) in self._db.execute(
+                "SELECT id FROM tarjetas WHERE mazo_id = ? ORDER BY posicion", (mazo_id,)
+            )]
+        return mazo_id, huella, ids
+
+    def datos_mazo(self, mazo_id, huella):
+        """JSON de las tarjetas del mazo en orden, o None si su contenido ya no tiene esa huella."""
+        with self._lock:
+            fila = self._db.execute("SELECT contenido FROM mazos WHERE id = ?", (mazo_id,)).fetchone()
+            if fila is None or fila[0] != huella:
+                return None
+            return [datos for (datos,) in self._db.execute(
+                "SELECT datos FROM tarjetas WHERE mazo_id = ? ORDER BY posicion", (mazo_id,)
+            )]
+
+    def quitar_tarjeta(self, tarjeta_id):
+        """Borra una tarjeta de su mazo; devuelve la nueva huella del mazo, o None si no existía."""
+        with self._lock, self._db:
+            fila = self._db.execute("SELECT mazo_id FROM tarjetas WHERE id = ?", (tarjeta_id,)).fetchone()
+            if fila is None:
+                return None
+            self._db.execute("DELETE FROM tarjetas WHERE id = ?", (tarjeta_id,))
+            return self._actualizar_huella(fila[0])
+
+    def nombre_libre(self, usuario, nombre):
+        """`nombre` o, si ya existe, la primera variante "nombre (2)", "nombre (3)"... libre."""
+        candidato, n = nombre, 1
+        while self.existe(usuario, candidato):
+            n += 1
+            candidato = f"{nombre} ({n})"
+        return candidato
+
+    # --- Streaming (exportar / importar) ---
+    def _conexion_aparte(self):
+        # Conexión propia para operaciones largas: con WAL no bloquea a las demás sesiones.
+        conexion = sqlite3.connect(self.ruta, timeout=30)
+        conexion.execute("PRAGMA foreign_keys=ON")
+        return conexion
+
+    def iterar_mazos(self, usuario):
+        """Recorre los mazos del usuario sin cargarlos: ("mazo", nombre, num_tarjetas) seguido de
+        un ("tarjeta", datos_json) por tarjeta. Lee una instantánea coherente de la biblioteca."""
+        conexion = self._conexion_aparte()
+        try:
+            conexion.execute("BEGIN")
+            cursor = conexion.execute(
+                "SELECT m.id, m.nombre, m.num_tarjetas, t.datos FROM mazos m JOIN tarjetas t ON t.mazo_id = m.id"
+                " WHERE m.usuario = ? ORDER BY m.creado, m.id, t.posicion",
+                (usuario,),
+            )
+            actual = None
+            while filas := cursor.fetchmany(TARJETAS_POR_LOTE):
+                for mazo_id, nombre, num_tarjetas, datos in filas:
+                    if mazo_id != actual:
+                        actual = mazo_id
+                        yield "mazo", nombre, num_tarjetas
+                    yield "tarjeta", datos
+        finally:
+            conexion.close()
+
+    def importar_mazo(self, usuario, nombre, tarjetas):
+        """Guarda un mazo a partir de un iterable de tarjetas (dicts) sin materializarlo.
+
+        Si el nombre ya existe se usa una variante libre; devuelve (nombre, num_tarjetas).
+        El mazo aparece completo o no aparece (una transacción por mazo).
+        """
+        nombre = self.nombre_libre(usuario, nombre)
+        conexion = self._conexion_aparte()
+        try:
+            with conexion:
+                mazo_id = conexion.execute(
+                    "INSERT INTO mazos (usuario, nombre, creado, num_tarjetas) VALUES (?, ?, ?, 0)",
+                    (usuario, nombre, time.time()),
+                ).lastrowid
+                posicion = 0
+                lote = []
+                resumen = hashlib.sha256()  # huella_contenido, calculada sobre la marcha
+                for tarjeta in tarjetas:
+                    datos = json.dumps(tarjeta, ensure_ascii=False)
+                    resumen.update(datos.encode("utf-8"))
+                    resumen.update(b"\x1e")
+                    lote.append((mazo_id, posicion, datos))
+                    posicion += 1
+                    if len(lote) >= TARJETAS_POR_LOTE:
+                        conexion.executemany("INSERT INTO tarjetas (mazo_id, posicion, datos) VALUES (?, ?, ?)", lote)
+                        lote = []
+                conexion.executemany("INSERT INTO tarjetas (mazo_id, posicion, datos) VALUES (?, ?, ?)", lote)
+                conexion.execute(
+                    "UPDATE mazos SET num_tarjetas = ?, contenido = ? WHERE id = ?",
+                    (posicion, resumen.hexdigest(), mazo_id),
+                )
+        finally:
+            conexion.close()
+        return nombre, posicion
@@ -0,0 +1,136 @@
+# --- Caché de Extracción por Contenido ---
+# Guarda el texto extraído de cada archivo bajo el SHA-256 de sus bytes (más la
+# versión del extractor), de modo que un archivo ya visto, por cualquier
+# sesión, no vuelve a pasar por PyMuPDF ni python-pptx.
+#
+# Dos niveles:
+#   - Memoria: LRU con presupuesto en bytes.
+#   - Disco: un archivo por entrada; al superar el presupuesto se eliminan las
+#     entradas usadas hace más tiempo.
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from extraccion import VERSION_EXTRACTOR, es_error_extraccion
+from instrumentacion import tramo
+from ocr import ocr_disponible
+
+DIRECTORIO_CACHE = os.environ.get(
+    "MEDFLASH_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "med_flash")
+)
+BYTES_MAX_MEMORIA = 256 * 1024 * 1024
+BYTES_MAX_DISCO = 2 * 1024 * 1024 * 1024
+
+
+def clave_contenido(datos, tipo):
+    """Clave de caché: SHA-256 del tipo, la versión del extractor y los bytes.
+
+    En PDF cuenta también si hay OCR: al instalar Tesseract se vuelven a
+    extraer los documentos que tenían páginas escaneadas.
+    """
+    ocr = "ocr" if tipo == "pdf" and ocr_disponible() else ""
+    h = hashlib.sha256()
+    h.update(f"{tipo}:{VERSION_EXTRACTOR}:{ocr}:".encode("utf-8"))
+    h.update(datos)
+    return h.hexdigest()
+
+
+class CacheExtraccion:
+    """Caché de dos niveles (memoria LRU + disco) compartida entre sesiones."""
+
+    def __init__(self, directorio=None, bytes_max_memoria=BYTES_MAX_MEMORIA, bytes_max_disco=BYTES_MAX_DISCO):
+        self.directorio = os.path.join(directorio or DIRECTORIO_CACHE, "extraccion")
+        self.bytes_max_memoria = bytes_max_memoria
+        self.bytes_max_disco = bytes_max_disco
+        self._memoria = OrderedDict()  # clave -> (texto, bytes)
+        self._bytes_memoria = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directorio, exist_ok=True)
+        self._bytes_disco = sum(e.stat().st_size for e in os.scandir(self.directorio) if e.is_file())
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, f"{clave}.txt")
+
+    # --- Nivel en memoria ---
+    def _guardar_en_memoria(self, clave, texto, tamano):
+        if tamano > self.bytes_max_memoria:
+            return
+        anterior = self._memoria.pop(clave, None)
+        if anterior:
+            self._bytes_memoria -= anterior[1]
+        self._memoria[clave] = (texto, tamano)
+        self._bytes_memoria += tamano
+        while self._bytes_memoria > self.bytes_max_memoria:
+            _, (_, liberados) = self._memoria.popitem(last=False)
+            self._bytes_memoria -= liberados
+
+    # --- Nivel en disco ---
+    def _guardar_en_disco(self, clave, codificado):
+        ruta = self._ruta(clave)
+        if os.path.exists(ruta):
+            return
+        temporal = f"{ruta}.{threading.get_ident()}.tmp"
+        with open(temporal, "wb") as f:
+            f.write(codificado)
+        os.replace(temporal, ruta)
+        self._bytes_disco += len(codificado)
+        if self._bytes_disco > self.bytes_max_disco:
+            self._desalojar_disco()
+
+    def _desalojar_disco(self):
+        """Elimina las entradas con acceso más antiguo hasta volver al presupuesto."""
+        entradas = sorted(
+            (e for e in os.scandir(self.directorio) if e.is_file() and e.name.endswith(".txt")),
+            key=lambda e: e.stat().st_mtime,
+        )
+        self._bytes_disco = sum(e.stat().st_size for e in entradas)
+        for entrada in entradas:
+            if self._bytes_disco <= self.bytes_max_disco:
+                break
+            try:
+                tamano = entrada.stat().st_size
+                os.remove(entrada.path)
+                self._bytes_disco -= tamano
+            except FileNotFoundError:
+                pass
+
+    # --- API pública ---
+    def obtener(self, clave):
+        """Devuelve el texto cacheado o None."""
+        with self._lock:
+            entrada = self._memoria.get(clave)
+            if entrada:
+                self._memoria.move_to_end(clave)
+                return entrada[0]
+            ruta = self._ruta(clave)
+            try:
+                with open(ruta, "rb") as f:
+                    codificado = f.read()
+            except FileNotFoundError:
+                return None
+            # Se marca como usado recientemente para la política de desalojo.
+            os.utime(ruta)
+            texto = codificado.decode("utf-8")
+            self._guardar_en_memoria(clave, texto, len(codificado))
+            return texto
+
+    def guardar(self, clave, texto):
+        codificado = texto.encode("utf-8")
+        with self._lock:
+            self._guardar_en_memoria(clave, texto, len(codificado))
+            self._guardar_en_disco(clave, codificado)
+
+    def obtener_o_extraer(self, datos, tipo, extractor):
+        """Devuelve el texto cacheado para `datos` o lo extrae con `extractor(datos)` y lo guarda."""
+        clave = clave_contenido(datos, tipo)
+        texto = self.obtener(clave)
+        if texto is not None:
+            return texto
+        with tramo(f"extraccion.{tipo}"):
+            texto = extractor(datos)
+        # Los errores de extracción no se cachean para poder reintentar.
+        if not es_error_extraccion(texto):
+            self.guardar(clave, texto)
+        return texto
@@ -0,0 +1,257 @@
+# --- Cliente del Modelo ---
+# Un único cliente por proceso, sobre un backend intercambiable (Gemini o el
+# sustituto local, ver backends.py), con:
+#   - Caché persistente de respuestas (SQLite) con TTL y desalojo por tamaño,
+#     indexada por (modelo, hash del prompt, parámetros de generación).
+#   - Coalescencia de peticiones idénticas en vuelo: si varias sesiones piden
+#     lo mismo a la vez, solo se hace una llamada real a la API.
+#   - Modo streaming con medición de latencia (primer fragmento y total).
+#   - Opcionalmente, una ColaTrabajos que limita la tasa de llamadas reales y
+#     reintenta los errores transitorios.
+#   - Contabilidad de llamadas reales, tokens (estimados) y coste.
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from backends import estimar_tokens
+from cache_extraccion import DIRECTORIO_CACHE
+from instrumentacion import registrar, tramo
+
+TTL_RESPUESTAS = 7 * 24 * 3600  # segundos
+BYTES_MAX_RESPUESTAS = 256 * 1024 * 1024
+
+
+def clave_peticion(nombre_modelo, prompt_parts, parametros):
+    """Clave de caché: modelo + hash del prompt + parámetros de generación."""
+    hash_prompt = hashlib.sha256("\x1f".join(prompt_parts).encode("utf-8")).hexdigest()
+    params = json.dumps(parametros or {}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(f"{nombre_modelo}\x1e{hash_prompt}\x1e{params}".encode("utf-8")).hexdigest()
+
+
+class CacheRespuestas:
+    """Almacén persistente de respuestas del modelo con TTL y presupuesto en bytes."""
+
+    def __init__(self, ruta=None, ttl=TTL_RESPUESTAS, bytes_max=BYTES_MAX_RESPUESTAS):
+        if ruta is None:
+            os.makedirs(DIRECTORIO_CACHE, exist_ok=True)
+            ruta = os.path.join(DIRECTORIO_CACHE, "respuestas.sqlite")
+        self.ttl = ttl
+        self.bytes_max = bytes_max
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(ruta, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS respuestas ("
+            " clave TEXT PRIMARY KEY, texto TEXT NOT NULL, creado REAL NOT NULL,"
+            " usado REAL NOT NULL, bytes INTEGER NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_respuestas_usado ON respuestas(usado)")
+        self._db.commit()
+
+    def obtener(self, clave):
+        ahora = time.time()
+        with self._lock:
+            fila = self._db.execute("SELECT texto, creado FROM respuestas WHERE clave = ?", (clave,)).fetchone()
+            if fila is None:
+                return None
+            texto, creado = fila
+            if ahora - creado > self.ttl:
+                self._db.execute("DELETE FROM respuestas WHERE clave = ?", (clave,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE respuestas SET usado = ? WHERE clave = ?", (ahora, clave))
+            self._db.commit()
+            return texto
+
+    def guardar(self, clave, texto):
+        ahora = time.time()
+        tamano = len(texto.encode("utf-8"))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO respuestas (clave, texto, creado, usado, bytes) VALUES (?, ?, ?, ?, ?)",
+                (clave, texto, ahora, ahora, tamano),
+            )
+            self._desalojar(ahora)
+            self._db.commit()
+
+    def _desalojar(self, ahora):
+        """Elimina caducadas y, si se supera el presupuesto, las menos usadas."""
+        self._db.execute("DELETE FROM respuestas WHERE creado < ?", (ahora - self.ttl,))
+        total = self._db.execute("SELECT COALESCE(SUM(bytes), 0) FROM respuestas").fetchone()[0]
+        if total <= self.bytes_max:
+            return
+        exceso = total - self.bytes_max
+        liberados = 0
+        claves = []
+        for clave, tamano in self._db.execute("SELECT clave, bytes FROM respuestas ORDER BY usado"):
+            if liberados >= exceso:
+                break
+            claves.append((clave,))
+            liberados += tamano
+        self._db.executemany("DELETE FROM respuestas WHERE clave = ?", claves)
+
+
+class MedicionLatencia:
+    """Tiempos de una respuesta en streaming: hasta el primer fragmento y total."""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.primer_fragmento = None
+        self.fin = None
+        self.fragmentos = 0
+        self.desde_cache = False
+
+    def registrar_fragmento(self):
+        if self.primer_fragmento is None:
+            self.primer_fragmento = time.perf_counter()
+        self.fragmentos += 1
+
+    def terminar(self):
+        self.fin = time.perf_counter()
+
+    @property
+    def tiempo_primer_fragmento(self):
+        return None if self.primer_fragmento is None else self.primer_fragmento - self.inicio
+
+    @property
+    def tiempo_total(self):
+        return None if self.fin is None else self.fin - self.inicio
+
+
+class ClienteModelo:
+    """Cliente del modelo compartido por todas las sesiones del proceso."""
+
+    def __init__(self, backend, cache=None, cola=None):
+        self.backend = backend
+        self.nombre_modelo = backend.nombre
+        self.cache = cache if cache is not None else CacheRespuestas()
+        self.cola = cola
+        self.consumo = {"llamadas": 0, "tokens_entrada": 0, "tokens_salida": 0, "coste": 0.0}
+        self._en_vuelo = {}  # clave -> Future
+        self._lock = threading.Lock()
+
+    def _contabilizar(self, prompt_parts, texto):
+        """Suma una llamada real (no las servidas desde la caché) al consumo del cliente."""
+        entrada = sum(estimar_tokens(parte) for parte in prompt_parts)
+        salida = estimar_tokens(texto)
+        with self._lock:
+            self.consumo["llamadas"] += 1
+            self.consumo["tokens_entrada"] += entrada
+            self.consumo["tokens_salida"] += salida
+            self.consumo["coste"] += self.backend.coste(entrada, salida)
+
+    def _llamar_api(self, prompt_parts, parametros, stream):
+        """Fragmentos de una llamada real, respetando el límite de la cola y reintentando errores transitorios.
+
+        Un stream solo se reintenta si aún no había entregado ningún fragmento.
+        """
+        intento = 0
+        while True:
+            if self.cola is not None:
+                self.cola.adquirir()
+            partes = []
+            try:
+                if stream:
+                    for fragmento in self.backend.generar_stream(prompt_parts, parametros):
+                        partes.append(fragmento)
+                        yield fragmento
+                else:
+                    partes.append(self.backend.generar(prompt_parts, parametros))
+                    yield partes[0]
+                self._contabilizar(prompt_parts, "".join(partes))
+                return
+            except Exception as e:
+                if partes or self.cola is None or not self.cola.debe_reintentar(e, intento):
+                    raise
+                self.cola.esperar_reintento(intento)
+                intento += 1
+
+    def _unirse_o_registrar(self, clave):
+        """Devuelve (futuro, propietario): el futuro de la petición en vuelo o uno nuevo."""
+        with self._lock:
+            futuro = self._en_vuelo.get(clave)
+            if futuro is not None:
+                return futuro, False
+            futuro = Future()
+            self._en_vuelo[clave] = futuro
+            return futuro, True
+
+    def generar(self, prompt_parts, usar_cache=True, **parametros):
+        """Devuelve el texto de la respuesta, desde la caché si es posible.
+
+        Con `usar_cache=False` no se consulta ni se guarda la caché de
+        respuestas (para quien ya guarda el resultado en su propia caché).
+        """
+        clave = clave_peticion(self.nombre_modelo, prompt_parts, parametros)
+        texto = self.cache.obtener(clave) if usar_cache else None
+        if texto is not None:
+            return texto
+
+        futuro, propietario = self._unirse_o_registrar(clave)
+
+        # Otra sesión ya está haciendo esta misma petición: se espera su resultado.
+        if not propietario:
+            return futuro.result()
+
+        try:
+            with tramo("modelo.llamada"):
+                texto = "".join(self._llamar_api(prompt_parts, parametros, stream=False))
+            if usar_cache:
+                self.cache.guardar(clave, texto)
+            futuro.set_result(texto)
+            return texto
+        except Exception as e:
+            futuro.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._en_vuelo[clave]
+
+    def generar_stream(self, prompt_parts, medicion=None, usar_cache=True, **parametros):
+        """Como `generar`, pero entrega el texto por fragmentos a medida que llega."""
+        medicion = medicion if medicion is not None else MedicionLatencia()
+        clave = clave_peticion(self.nombre_modelo, prompt_parts, parametros)
+        texto = self.cache.obtener(clave) if usar_cache else None
+        if texto is not None:
+            medicion.desde_cache = True
+            medicion.registrar_fragmento()
+            yield texto
+            medicion.terminar()
+            return
+
+        futuro, propietario = self._unirse_o_registrar(clave)
+
+        if not propietario:
+            texto = futuro.result()
+            medicion.registrar_fragmento()
+            yield texto
+            medicion.terminar()
+            return
+
+        partes = []
+        try:
+            for fragmento in self._llamar_api(prompt_parts, parametros, stream=True):
+                medicion.registrar_fragmento()
+                partes.append(fragmento)
+                yield fragmento
+            texto = "".join(partes)
+            if usar_cache:
+                self.cache.guardar(clave, texto)
+            futuro.set_result(texto)
+        except BaseException as e:
+            # Incluye GeneratorExit: si el consumidor abandona el stream, los
+            # que esperaban esta petición reciben el error en vez de bloquearse.
+            futuro.set_exception(e if isinstance(e, Exception) else RuntimeError("Stream interrumpido"))
+            raise
+        finally:
+            with self._lock:
+                del self._en_vuelo[clave]
+            medicion.terminar()
+            if medicion.tiempo_primer_fragmento is not None:
+                registrar("modelo.primer_fragmento", medicion.tiempo_primer_fragmento)
+            registrar("modelo.llamada", medicion.tiempo_total)
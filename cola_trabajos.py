@@ -0,0 +1,224 @@
+# --- Cola de Trabajos del Modelo ---
+# Cola compartida por el proceso para todo el trabajo con el LLM:
+#   - Trabajos en segundo plano (generar un mazo, verificar un texto) con
+#     estado consultable, de modo que sobreviven a los reruns de Streamlit.
+#   - Carriles de prioridad: lo interactivo (verificación) pasa por delante
+#     de la generación por lotes, tanto al asignar hilos como al repartir el
+#     cupo de peticiones.
+#   - Cubo de tokens: limita las peticiones reales a la API por segundo, con
+#     una ráfaga máxima.
+#   - Reintentos con espera exponencial y jitter completo ante errores
+#     transitorios (429, 5xx, timeouts).
+
+import contextvars
+import heapq
+import itertools
+import random
+import threading
+import time
+import uuid
+
+from instrumentacion import registrar
+
+PRIORIDAD_INTERACTIVA = 0
+PRIORIDAD_LOTE = 1
+
+SOLICITUDES_POR_SEGUNDO = 1.0
+RAFAGA_SOLICITUDES = 10
+MAX_TRABAJOS_CONCURRENTES = 4
+MAX_REINTENTOS = 5
+ESPERA_BASE = 1.0    # segundos
+ESPERA_MAXIMA = 30.0
+# Tiempo que se conservan los trabajos terminados para que la página los consulte.
+RETENCION_TRABAJOS = 3600
+
+CODIGOS_TRANSITORIOS = frozenset({408, 429, 500, 502, 503, 504})
+NOMBRES_TRANSITORIOS = frozenset({
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable",
+    "DeadlineExceeded", "InternalServerError", "GatewayTimeout",
+})
+
+# Estados de un trabajo.
+PENDIENTE = "pendiente"
+EN_CURSO = "en curso"
+COMPLETADO = "completado"
+FALLIDO = "fallido"
+CANCELADO = "cancelado"
+
+# Trabajo que está ejecutando el hilo actual (None fuera de la cola).
+_trabajo_actual = contextvars.ContextVar("trabajo_actual", default=None)
+
+
+def es_error_transitorio(error):
+    """Indica si merece la pena reintentar la petición que produjo `error`."""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    codigo = getattr(error, "code", None)  # google.api_core.exceptions expone el código HTTP
+    if isinstance(codigo, int) and codigo in CODIGOS_TRANSITORIOS:
+        return True
+    return type(error).__name__ in NOMBRES_TRANSITORIOS
+
+
+class CuboTokens:
+    """Limitador de tasa; con varios hilos esperando, sirve primero a la prioridad más alta."""
+
+    def __init__(self, tasa, capacidad):
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self._tokens = float(capacidad)
+        self._ultimo = time.monotonic()
+        self._condicion = threading.Condition()
+        self._esperando = []  # heap de (prioridad, turno)
+        self._turnos = itertools.count()
+
+    def _recargar(self):
+        ahora = time.monotonic()
+        self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.tasa)
+        self._ultimo = ahora
+
+    def adquirir(self, prioridad=PRIORIDAD_INTERACTIVA):
+        """Bloquea hasta obtener un token; devuelve los segundos esperados."""
+        inicio = time.monotonic()
+        with self._condicion:
+            turno = (prioridad, next(self._turnos))
+            heapq.heappush(self._esperando, turno)
+            try:
+                while True:
+                    self._recargar()
+                    primero = self._esperando[0] == turno
+                    if primero and self._tokens >= 1:
+                        self._tokens -= 1
+                        return time.monotonic() - inicio
+                    # Solo el primero de la fila sabe cuánto falta; el resto espera a ser avisado.
+                    self._condicion.wait((1 - self._tokens) / self.tasa if primero else None)
+            finally:
+                self._esperando.remove(turno)
+                heapq.heapify(self._esperando)
+                self._condicion.notify_all()
+
+
+class Trabajo:
+    """Unidad de trabajo en segundo plano; la página la consulta en cada rerun."""
+
+    def __init__(self, funcion, args, kwargs, prioridad, descripcion):
+        self.id = uuid.uuid4().hex[:12]
+        self.descripcion = descripcion
+        self.prioridad = prioridad
+        self.estado = PENDIENTE
+        self.progreso = ""      # texto libre que actualiza la función
+        self.parcial = []       # resultados parciales (p. ej. tarjetas o fragmentos ya recibidos)
+        self.resultado = None
+        self.error = None
+        self.reintentos = 0
+        self.cancelado = False
+        self.creado = time.time()
+        self.iniciado = None
+        self.terminado = None
+        self._funcion = funcion
+        self._args = args
+        self._kwargs = kwargs
+        # El trabajo se ejecuta con el contexto de quien lo envió (p. ej. la sesión, para la instrumentación).
+        self._contexto = contextvars.copy_context()
+
+    @property
+    def activo(self):
+        return self.estado in (PENDIENTE, EN_CURSO)
+
+    def cancelar(self):
+        """Pide la cancelación; la función la comprueba en `trabajo.cancelado` entre pasos."""
+        self.cancelado = True
+
+    def _ejecutar(self):
+        _trabajo_actual.set(self)
+        self.estado = EN_CURSO
+        self.iniciado = time.time()
+        registrar(f"cola.espera.p{self.prioridad}", self.iniciado - self.creado)
+        try:
+            self.resultado = self._funcion(self, *self._args, **self._kwargs)
+            self.estado = CANCELADO if self.cancelado else COMPLETADO
+        except Exception as e:
+            self.error = e
+            self.estado = FALLIDO
+        finally:
+            self.terminado = time.time()
+            registrar(f"cola.trabajo.p{self.prioridad}", self.terminado - self.iniciado)
+
+
+class ColaTrabajos:
+    """Cola de trabajos con prioridades, límite de peticiones y reintentos, compartida por el proceso."""
+
+    def __init__(self, max_trabajos=MAX_TRABAJOS_CONCURRENTES, solicitudes_por_segundo=SOLICITUDES_POR_SEGUNDO,
+                 rafaga=RAFAGA_SOLICITUDES, max_reintentos=MAX_REINTENTOS, espera_base=ESPERA_BASE,
+                 espera_maxima=ESPERA_MAXIMA, retencion=RETENCION_TRABAJOS):
+        self.cubo = CuboTokens(solicitudes_por_segundo, rafaga)
+        self.max_reintentos = max_reintentos
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.retencion = retencion
+        self._pendientes = []  # heap de (prioridad, turno, trabajo)
+        self._trabajos = {}    # id -> Trabajo
+        self._turnos = itertools.count()
+        self._condicion = threading.Condition()
+        self._hilos = [
+            threading.Thread(target=self._bucle, name=f"cola-trabajos-{i}", daemon=True)
+            for i in range(max_trabajos)
+        ]
+        for hilo in self._hilos:
+            hilo.start()
+
+    # --- Trabajos ---
+    def enviar(self, funcion, *args, prioridad=PRIORIDAD_LOTE, descripcion="", **kwargs):
+        """Encola `funcion(trabajo, *args, **kwargs)` y devuelve el Trabajo para consultarlo."""
+        trabajo = Trabajo(funcion, args, kwargs, prioridad, descripcion)
+        with self._condicion:
+            self._purgar()
+            self._trabajos[trabajo.id] = trabajo
+            heapq.heappush(self._pendientes, (prioridad, next(self._turnos), trabajo))
+            self._condicion.notify()
+        return trabajo
+
+    def obtener(self, trabajo_id):
+        """El trabajo con ese id, o None si no existe o ya se purgó."""
+        with self._condicion:
+            return self._trabajos.get(trabajo_id)
+
+    def pendientes(self):
+        with self._condicion:
+            return len(self._pendientes)
+
+    def _purgar(self):
+        limite = time.time() - self.retencion
+        for trabajo_id in [i for i, t in self._trabajos.items() if t.terminado and t.terminado < limite]:
+            del self._trabajos[trabajo_id]
+
+    def _bucle(self):
+        while True:
+            with self._condicion:
+                while not self._pendientes:
+                    self._condicion.wait()
+                _, _, trabajo = heapq.heappop(self._pendientes)
+            if trabajo.cancelado:
+                trabajo.estado = CANCELADO
+                trabajo.terminado = time.time()
+                continue
+            trabajo._contexto.run(trabajo._ejecutar)
+
+    # --- Peticiones al modelo (las usa el cliente antes de cada llamada real) ---
+    def adquirir(self):
+        """Espera un token del cubo con la prioridad del trabajo en curso (interactiva fuera de la cola)."""
+        trabajo = _trabajo_actual.get()
+        prioridad = trabajo.prioridad if trabajo is not None else PRIORIDAD_INTERACTIVA
+        espera = self.cubo.adquirir(prioridad)
+        registrar(f"cola.limite.p{prioridad}", espera)
+
+    def debe_reintentar(self, error, intento):
+        return intento < self.max_reintentos and es_error_transitorio(error)
+
+    def esperar_reintento(self, intento):
+        """Espera exponencial con jitter completo antes del reintento número `intento` + 1."""
+        trabajo = _trabajo_actual.get()
+        if trabajo is not None:
+            trabajo.reintentos += 1
+        espera = random.uniform(0, min(self.espera_maxima, self.espera_base * 2 ** intento))
+        registrar("cola.reintento", espera)
+        time.sleep(espera)
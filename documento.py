@@ -0,0 +1,97 @@
+# --- Documento Paginado en Disco ---
+# El texto extraído de cada fuente se escribe una sola vez (UTF-8) en un
+# archivo temporal anónimo y se lee mediante mmap. La sesión solo guarda el
+# manejador; la interfaz pide ventanas de tamaño fijo (página anterior /
+# siguiente, salto a la siguiente coincidencia de una búsqueda), así que lo que
+# viaja al navegador en cada rerun es una ventana, no el documento entero.
+
+import mmap
+import re
+import tempfile
+import weakref
+
+# Tamaño de cada ventana (página) en bytes UTF-8.
+BYTES_POR_VENTANA = 16 * 1024
+
+
+def _es_continuacion(byte):
+    """Indica si el byte es la continuación de un carácter UTF-8 multibyte."""
+    return byte & 0xC0 == 0x80
+
+
+def _cerrar(mapa, archivo):
+    if mapa is not None:
+        mapa.close()
+    archivo.close()
+
+
+class DocumentoTexto:
+    """Texto de solo lectura respaldado por un archivo temporal mapeado en memoria."""
+
+    def __init__(self, fragmentos, bytes_por_ventana=BYTES_POR_VENTANA):
+        self.bytes_por_ventana = bytes_por_ventana
+        # TemporaryFile se desvincula del disco al crearse: no quedan restos aunque el proceso muera.
+        self._archivo = tempfile.TemporaryFile(prefix="medflash_")
+        self.num_caracteres = 0
+        for fragmento in fragmentos:
+            self.num_caracteres += len(fragmento)
+            self._archivo.write(fragmento.encode("utf-8"))
+        self._archivo.flush()
+        self.num_bytes = self._archivo.tell()
+        # mmap no admite archivos vacíos.
+        self._mapa = mmap.mmap(self._archivo.fileno(), 0, access=mmap.ACCESS_READ) if self.num_bytes else None
+        self._finalizador = weakref.finalize(self, _cerrar, self._mapa, self._archivo)
+
+    @classmethod
+    def desde_texto(cls, texto, bytes_por_ventana=BYTES_POR_VENTANA):
+        return cls((texto,), bytes_por_ventana)
+
+    def cerrar(self):
+        self._finalizador()
+
+    @property
+    def num_paginas(self):
+        return max(1, -(-self.num_bytes // self.bytes_por_ventana))
+
+    def _limite(self, posicion):
+        """Retrocede `posicion` hasta el inicio de un carácter UTF-8."""
+        posicion = min(max(posicion, 0), self.num_bytes)
+        while 0 < posicion < self.num_bytes and _es_continuacion(self._mapa[posicion]):
+            posicion -= 1
+        return posicion
+
+    def leer(self, inicio=0, fin=None):
+        """Texto entre dos posiciones en bytes (ajustadas a límites de carácter)."""
+        if self._mapa is None:
+            return ""
+        fin = self.num_bytes if fin is None else fin
+        return self._mapa[self._limite(inicio):self._limite(fin)].decode("utf-8")
+
+    def ventana(self, pagina):
+        """Texto de la página `pagina` (empezando en 0)."""
+        pagina = min(max(pagina, 0), self.num_paginas - 1)
+        inicio = pagina * self.bytes_por_ventana
+        return self.leer(inicio, inicio + self.bytes_por_ventana)
+
+    def pagina_de(self, posicion):
+        """Página que contiene la posición en bytes `posicion`."""
+        return min(posicion // self.bytes_por_ventana, self.num_paginas - 1)
+
+    def buscar(self, consulta, desde=0):
+        """Posición en bytes de la siguiente coincidencia a partir de `desde`, o None.
+
+        La búsqueda no distingue mayúsculas en ASCII y prueba además las variantes
+        en minúsculas, mayúsculas y capitalizada de la consulta (para acentos y ñ).
+        Si no hay coincidencias después de `desde`, vuelve a empezar desde el principio.
+        """
+        if self._mapa is None or not consulta:
+            return None
+        variantes = {consulta, consulta.lower(), consulta.upper(), consulta.capitalize()}
+        patron = re.compile(
+            b"|".join(re.escape(v.encode("utf-8")) for v in sorted(variantes, key=len, reverse=True)),
+            re.IGNORECASE,
+        )
+        coincidencia = patron.search(self._mapa, min(max(desde, 0), self.num_bytes))
+        if coincidencia is None and desde > 0:
+            coincidencia = patron.search(self._mapa, 0)
+        return coincidencia.start() if coincidencia else None
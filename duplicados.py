@@ -0,0 +1,216 @@
+# --- Detección de Tarjetas Casi Duplicadas (MinHash + LSH) ---
+# Cada tarjeta se resume en una firma MinHash de los 5-gramas de caracteres de
+# su enunciado y sus opciones (normalizados, sin acentos y con las opciones
+# ordenadas). Las firmas se dividen en bandas; dos tarjetas son candidatas si
+# coinciden en alguna banda, y solo las candidatas se comparan con la
+# similitud estimada (fracción de posiciones iguales). Buscar una tarjeta
+# nueva cuesta una búsqueda binaria por banda, no una comparación con toda la
+# biblioteca.
+#
+# Las firmas se guardan en la tabla `firmas` de la base de datos de la
+# biblioteca (se borran en cascada con su tarjeta), así que solo se calculan
+# una vez por tarjeta.
+
+import json
+import sqlite3
+import threading
+
+import numpy as np
+
+from modelo_tarjetas import Tarjeta
+from recuperacion import normalizar
+
+NUM_PERMUTACIONES = 128
+# 32 bandas de 4 filas: las parejas con similitud >= ~0.45 casi siempre son candidatas.
+NUM_BANDAS = 32
+LONGITUD_SHINGLE = 5
+# Similitud (Jaccard estimada) a partir de la cual dos tarjetas se consideran duplicadas.
+UMBRAL_SIMILITUD = 0.8
+# Filas nuevas que se buscan por fuerza bruta antes de reordenar las bandas.
+MAX_FILAS_SIN_ORDENAR = 1024
+
+_PRIMO = np.uint64((1 << 31) - 1)
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, int(_PRIMO), NUM_PERMUTACIONES, dtype=np.uint64)
+_B = _rng.integers(0, int(_PRIMO), NUM_PERMUTACIONES, dtype=np.uint64)
+_MEZCLA_BANDA = _rng.integers(1, 1 << 62, NUM_PERMUTACIONES // NUM_BANDAS, dtype=np.uint64) | np.uint64(1)
+
+
+def texto_tarjeta(tarjeta):
+    """Enunciado y opciones (ordenadas) normalizados; el orden de las opciones no importa."""
+    if isinstance(tarjeta, Tarjeta):
+        pregunta, opciones = tarjeta.pregunta, tarjeta.opciones
+    else:
+        pregunta, opciones = tarjeta["pregunta"], tarjeta["opciones"].values()
+    partes = [pregunta] + sorted(normalizar(o) for o in opciones)
+    return " ".join(normalizar(" ".join(partes)).split())
+
+
+def firma_minhash(texto):
+    """Firma MinHash (uint32) de los 5-gramas de caracteres del texto."""
+    datos = np.frombuffer(texto.encode("ascii", "ignore"), dtype=np.uint8).astype(np.uint64)
+    if len(datos) < LONGITUD_SHINGLE:
+        datos = np.pad(datos, (0, LONGITUD_SHINGLE - len(datos)))
+    # Hash polinómico de cada ventana de 5 caracteres, vectorizado.
+    n = len(datos) - LONGITUD_SHINGLE + 1
+    shingles = np.zeros(n, dtype=np.uint64)
+    for j in range(LONGITUD_SHINGLE):
+        shingles = shingles * np.uint64(257) + datos[j:j + n]
+    shingles = np.unique(shingles % _PRIMO)
+    return ((_A[:, None] * shingles[None, :] + _B[:, None]) % _PRIMO).min(axis=1).astype(np.uint32)
+
+
+def claves_bandas(firmas):
+    """Clave (uint64) de cada banda de cada firma: matriz (n, NUM_BANDAS)."""
+    bandas = firmas.reshape(len(firmas), NUM_BANDAS, NUM_PERMUTACIONES // NUM_BANDAS).astype(np.uint64)
+    return (bandas * _MEZCLA_BANDA).sum(axis=2)
+
+
+def similitud(firma, firmas):
+    """Jaccard estimada entre una firma y cada fila de `firmas`."""
+    return (firmas == firma).mean(axis=1)
+
+
+class Duplicado:
+    """Tarjeta nueva (por posición) que se parece a otra de la biblioteca o del propio lote."""
+
+    __slots__ = ("posicion", "tarjeta_id", "mazo", "posicion_lote", "similitud")
+
+    def __init__(self, posicion, similitud, tarjeta_id=None, mazo=None, posicion_lote=None):
+        self.posicion = posicion
+        self.similitud = similitud
+        self.tarjeta_id = tarjeta_id        # tarjeta existente en la biblioteca...
+        self.mazo = mazo
+        self.posicion_lote = posicion_lote  # ...o una anterior del mismo lote
+
+
+class DetectorDuplicados:
+    """Índice LSH de las tarjetas de un usuario, sincronizado con la biblioteca."""
+
+    def __init__(self, ruta, usuario=""):
+        self.usuario = usuario
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(ruta, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS firmas ("
+            " tarjeta_id INTEGER PRIMARY KEY REFERENCES tarjetas(id) ON DELETE CASCADE,"
+            " firma BLOB NOT NULL)"
+        )
+        self._db.commit()
+        self.reiniciar()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def reiniciar(self):
+        """Vacía el índice en memoria (p. ej. tras eliminar un mazo); se recarga de la tabla al sincronizar."""
+        with self._lock:
+            self._ids = np.empty(0, np.int64)
+            self._firmas = np.empty((0, NUM_PERMUTACIONES), np.uint32)
+            # Por banda: claves ordenadas y la fila a la que pertenece cada una.
+            self._claves_ordenadas = np.empty((NUM_BANDAS, 0), np.uint64)
+            self._orden = np.empty((NUM_BANDAS, 0), np.int32)
+            self._ordenadas = 0  # filas cubiertas por _orden; el resto se busca por fuerza bruta
+            self._ultimo_id = 0
+
+    # --- Sincronización con la biblioteca ---
+    def sincronizar(self):
+        """Añade las tarjetas guardadas desde la última sincronización (calculando las firmas que falten)."""
+        with self._lock:
+            filas = self._db.execute(
+                "SELECT t.id, t.datos, f.firma FROM tarjetas t JOIN mazos m ON m.id = t.mazo_id"
+                " LEFT JOIN firmas f ON f.tarjeta_id = t.id"
+                " WHERE m.usuario = ? AND t.id > ? ORDER BY t.id",
+                (self.usuario, self._ultimo_id),
+            ).fetchall()
+            if not filas:
+                return
+            ids, firmas, nuevas = [], [], []
+            for tarjeta_id, datos, firma in filas:
+                if firma is None:
+                    firma = firma_minhash(texto_tarjeta(json.loads(datos)))
+                    nuevas.append((tarjeta_id, firma.tobytes()))
+                else:
+                    firma = np.frombuffer(firma, dtype=np.uint32)
+                ids.append(tarjeta_id)
+                firmas.append(firma)
+            if nuevas:
+                with self._db:
+                    self._db.executemany("INSERT OR REPLACE INTO firmas (tarjeta_id, firma) VALUES (?, ?)", nuevas)
+            firmas = np.array(firmas, dtype=np.uint32)
+            self._ids = np.concatenate((self._ids, np.array(ids, dtype=np.int64)))
+            self._firmas = np.concatenate((self._firmas, firmas))
+            self._ultimo_id = ids[-1]
+            if len(self._ids) - self._ordenadas > MAX_FILAS_SIN_ORDENAR:
+                claves = claves_bandas(self._firmas).T
+                self._orden = np.argsort(claves, axis=1).astype(np.int32)
+                self._claves_ordenadas = np.take_along_axis(claves, self._orden, axis=1)
+                self._ordenadas = len(self._ids)
+
+    # --- Búsqueda ---
+    def _candidatas(self, claves):
+        """Filas que comparten al menos una banda con las claves dadas."""
+        encontradas = []
+        for banda in range(NUM_BANDAS):
+            columna = self._claves_ordenadas[banda]
+            inicio = np.searchsorted(columna, claves[banda], side="left")
+            fin = np.searchsorted(columna, claves[banda], side="right")
+            if fin > inicio:
+                encontradas.append(self._orden[banda, inicio:fin].astype(np.int64))
+        # Filas añadidas desde la última ordenación.
+        recientes = claves_bandas(self._firmas[self._ordenadas:])
+        encontradas.append(self._ordenadas + np.flatnonzero((recientes == claves).any(axis=1)))
+        return np.unique(np.concatenate(encontradas))
+
+    def _etiquetar(self, duplicados):
+        """Rellena el mazo de las tarjetas existentes y descarta las que ya no están en la biblioteca."""
+        ids = [d.tarjeta_id for d in duplicados if d.tarjeta_id is not None]
+        if not ids:
+            return duplicados
+        with self._lock:
+            filas = self._db.execute(
+                "SELECT t.id, m.nombre FROM tarjetas t JOIN mazos m ON m.id = t.mazo_id"
+                f" WHERE t.id IN ({','.join('?' * len(ids))})",
+                ids,
+            ).fetchall()
+        mazos = dict(filas)
+        etiquetados = []
+        for duplicado in duplicados:
+            if duplicado.tarjeta_id is not None:
+                if duplicado.tarjeta_id not in mazos:
+                    continue  # su mazo se eliminó después de sincronizar
+                duplicado.mazo = mazos[duplicado.tarjeta_id]
+            etiquetados.append(duplicado)
+        return etiquetados
+
+    def revisar(self, tarjetas, umbral=UMBRAL_SIMILITUD):
+        """Busca, para cada tarjeta nueva, la más parecida de la biblioteca o del propio lote.
+
+        Devuelve una lista de Duplicado solo para las tarjetas con similitud >= umbral.
+        No modifica el índice: las tarjetas se añaden al sincronizar tras guardarlas.
+        """
+        self.sincronizar()
+        if not tarjetas:
+            return []
+        firmas = np.array([firma_minhash(texto_tarjeta(t)) for t in tarjetas], dtype=np.uint32)
+        claves = claves_bandas(firmas)
+        duplicados = []
+        with self._lock:
+            for posicion, (firma, clave) in enumerate(zip(firmas, claves)):
+                mejor = None
+                candidatas = self._candidatas(clave)
+                if len(candidatas):
+                    similitudes = similitud(firma, self._firmas[candidatas])
+                    i = int(similitudes.argmax())
+                    if similitudes[i] >= umbral:
+                        mejor = Duplicado(posicion, float(similitudes[i]), tarjeta_id=int(self._ids[candidatas[i]]))
+                # Dentro del lote (como mucho unos cientos de tarjetas) se compara directamente.
+                if posicion:
+                    similitudes = similitud(firma, firmas[:posicion])
+                    i = int(similitudes.argmax())
+                    if similitudes[i] >= umbral and (mejor is None or similitudes[i] > mejor.similitud):
+                        mejor = Duplicado(posicion, float(similitudes[i]), posicion_lote=i)
+                if mejor is not None:
+                    duplicados.append(mejor)
+        return self._etiquetar(duplicados)
@@ -0,0 +1,286 @@
+# --- Estadísticas de Estudio ---
+# Registro de eventos de respuesta (usuario, mazo, tema, tarjeta, acierto,
+# latencia, instante) en formato columnar: un archivo binario append-only por
+# columna, con las cadenas codificadas por diccionario. Al arrancar, los
+# agregados se calculan con group-bys vectorizados de pandas/NumPy; después se
+# actualizan en O(1) por respuesta, así que el panel de progreso solo lee
+# contadores, independientemente del tamaño del registro. pandas se importa
+# en la primera carga o consulta, no al importar el módulo.
+
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from biblioteca import DIRECTORIO_DATOS
+
+COLUMNAS = {
+    "usuario": np.dtype("<i4"),
+    "mazo": np.dtype("<i4"),
+    "tema": np.dtype("<i4"),
+    "tarjeta": np.dtype("<i8"),
+    "correcta": np.dtype("u1"),
+    "latencia": np.dtype("<f4"),
+    "instante": np.dtype("<f8"),
+}
+CATEGORICAS = ("usuario", "mazo", "tema")
+
+
+def tema_de_mazo(nombre):
+    """Tema de un mazo: la parte anterior a ' - ' (ej. 'Fisiología Cardíaca - Ciclo')."""
+    return nombre.split(" - ", 1)[0].strip() or nombre
+
+
+def _dia_local(instantes):
+    """Número de día en la zona horaria local (escalar o array)."""
+    return np.floor_divide(np.asarray(instantes) + time.localtime().tm_gmtoff, 86400).astype(np.int64)
+
+
+class _Agregados:
+    """Contadores incrementales de un usuario."""
+
+    def __init__(self):
+        self.por_mazo = {}  # código -> [respuestas, aciertos, latencia_total]
+        self.por_tema = {}
+        self.por_dia = {}   # día -> [respuestas, aciertos]
+        self.racha_actual = 0
+        self.racha_mejor = 0
+
+    def sumar(self, mazo, tema, dia, correcta, latencia):
+        for tabla, clave in ((self.por_mazo, mazo), (self.por_tema, tema)):
+            fila = tabla.setdefault(clave, [0, 0, 0.0])
+            fila[0] += 1
+            fila[1] += correcta
+            fila[2] += latencia
+        fila = self.por_dia.setdefault(dia, [0, 0])
+        fila[0] += 1
+        fila[1] += correcta
+        self.racha_actual = self.racha_actual + 1 if correcta else 0
+        self.racha_mejor = max(self.racha_mejor, self.racha_actual)
+
+
+class RegistroRespuestas:
+    """Registro de respuestas compartido por el proceso, con agregados por usuario."""
+
+    def __init__(self, directorio=None):
+        self.directorio = os.path.join(directorio or DIRECTORIO_DATOS, "respuestas")
+        os.makedirs(self.directorio, exist_ok=True)
+        self._lock = threading.Lock()
+        self._categorias = {c: {} for c in CATEGORICAS}  # valor -> código
+        self._valores = {c: [] for c in CATEGORICAS}     # código -> valor
+        self._cargar_categorias()
+        self._agregados = {}
+        self._cargar_agregados()
+        self._archivos = {c: open(self._ruta(c), "ab") for c in COLUMNAS}
+        self._archivo_categorias = open(os.path.join(self.directorio, "categorias.jsonl"), "a", encoding="utf-8")
+
+    def _ruta(self, columna):
+        return os.path.join(self.directorio, f"{columna}.bin")
+
+    # --- Carga ---
+    def _cargar_categorias(self):
+        ruta = os.path.join(self.directorio, "categorias.jsonl")
+        if not os.path.exists(ruta):
+            return
+        with open(ruta, encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    columna, valor = json.loads(linea)
+                except ValueError:
+                    continue  # línea truncada por un cierre abrupto
+                self._categorias[columna][valor] = len(self._valores[columna])
+                self._valores[columna].append(valor)
+
+    def columnas(self):
+        """Lee el registro completo como arrays NumPy (una columna por archivo)."""
+        datos = {}
+        for columna, dtype in COLUMNAS.items():
+            ruta = self._ruta(columna)
+            datos[columna] = np.fromfile(ruta, dtype=dtype) if os.path.exists(ruta) else np.empty(0, dtype)
+        # Tras un cierre abrupto alguna columna puede tener un registro de más.
+        n = min(len(v) for v in datos.values())
+        for columna, dtype in COLUMNAS.items():
+            if len(datos[columna]) != n:
+                datos[columna] = datos[columna][:n]
+                with open(self._ruta(columna), "r+b") as f:
+                    f.truncate(n * dtype.itemsize)
+        return datos
+
+    def _cargar_agregados(self):
+        columnas = self.columnas()
+        if not len(columnas["correcta"]):
+            return
+        import pandas as pd
+
+        df = pd.DataFrame(columnas)
+        df["dia"] = _dia_local(df["instante"].to_numpy())
+        for columna, atributo in (("mazo", "por_mazo"), ("tema", "por_tema")):
+            grupos = df.groupby(["usuario", columna]).agg(
+                n=("correcta", "size"), ok=("correcta", "sum"), lat=("latencia", "sum")
+            )
+            for (usuario, codigo), n, ok, lat in zip(
+                grupos.index, grupos["n"].tolist(), grupos["ok"].tolist(), grupos["lat"].tolist()
+            ):
+                getattr(self._usuario(usuario), atributo)[int(codigo)] = [n, ok, lat]
+        grupos = df.groupby(["usuario", "dia"]).agg(n=("correcta", "size"), ok=("correcta", "sum"))
+        for (usuario, dia), n, ok in zip(grupos.index, grupos["n"].tolist(), grupos["ok"].tolist()):
+            self._usuario(usuario).por_dia[int(dia)] = [n, ok]
+        # Rachas de aciertos consecutivos, vectorizadas a partir de la posición de los fallos.
+        for usuario, correctas in df.groupby("usuario")["correcta"]:
+            valores = correctas.to_numpy()
+            fallos = np.flatnonzero(valores == 0)
+            limites = np.concatenate(([-1], fallos, [len(valores)]))
+            agregados = self._usuario(usuario)
+            agregados.racha_mejor = int((np.diff(limites) - 1).max())
+            agregados.racha_actual = int(len(valores) - 1 - fallos[-1]) if fallos.size else len(valores)
+
+    def _usuario(self, codigo):
+        return self._agregados.setdefault(int(codigo), _Agregados())
+
+    def _codigo(self, columna, valor):
+        codigo = self._categorias[columna].get(valor)
+        if codigo is None:
+            codigo = self._categorias[columna][valor] = len(self._valores[columna])
+            self._valores[columna].append(valor)
+            self._archivo_categorias.write(json.dumps([columna, valor], ensure_ascii=False) + "\n")
+            self._archivo_categorias.flush()
+        return codigo
+
+    # --- Escritura ---
+    def registrar(self, usuario, mazo, tarjeta_id, correcta, latencia, instante=None, tema=None):
+        """Añade una respuesta al registro y actualiza los agregados en O(1)."""
+        instante = time.time() if instante is None else instante
+        tema = tema_de_mazo(mazo) if tema is None else tema
+        with self._lock:
+            fila = {
+                "usuario": self._codigo("usuario", usuario),
+                "mazo": self._codigo("mazo", mazo),
+                "tema": self._codigo("tema", tema),
+                "tarjeta": -1 if tarjeta_id is None else tarjeta_id,
+                "correcta": int(bool(correcta)),
+                "latencia": latencia,
+                "instante": instante,
+            }
+            for columna, dtype in COLUMNAS.items():
+                self._archivos[columna].write(np.array(fila[columna], dtype=dtype).tobytes())
+                self._archivos[columna].flush()
+            self._usuario(fila["usuario"]).sumar(
+                fila["mazo"], fila["tema"], int(_dia_local(instante)), fila["correcta"], latencia
+            )
+
+    def olvidar_usuarios(self, usuarios):
+        """Borra las respuestas de esos usuarios y las categorías que solo usaban ellas. Devuelve las filas borradas.
+
+        Reescribe el registro entero (con los códigos renumerados) y recalcula
+        los agregados: es para purgas ocasionales, no para cada respuesta.
+        """
+        with self._lock:
+            codigos = [self._categorias["usuario"][u] for u in usuarios if u in self._categorias["usuario"]]
+            if not codigos:
+                return 0
+            columnas = self.columnas()
+            conservar = ~np.isin(columnas["usuario"], codigos)
+            columnas = {columna: valores[conservar] for columna, valores in columnas.items()}
+            valores = {}
+            for columna in CATEGORICAS:
+                usados = np.unique(columnas[columna])
+                nuevos = np.full(len(self._valores[columna]), -1, COLUMNAS[columna])
+                nuevos[usados] = np.arange(len(usados))
+                columnas[columna] = nuevos[columnas[columna]]
+                valores[columna] = [self._valores[columna][codigo] for codigo in usados]
+
+            # Se escribe todo en archivos temporales y luego se sustituyen los originales.
+            for archivo in (*self._archivos.values(), self._archivo_categorias):
+                archivo.close()
+            reemplazos = {}
+            for columna, datos in columnas.items():
+                reemplazos[self._ruta(columna)] = datos.astype(COLUMNAS[columna]).tobytes()
+            reemplazos[os.path.join(self.directorio, "categorias.jsonl")] = "".join(
+                json.dumps([columna, valor], ensure_ascii=False) + "\n"
+                for columna in CATEGORICAS for valor in valores[columna]
+            ).encode("utf-8")
+            for ruta, datos in reemplazos.items():
+                with open(ruta + ".tmp", "wb") as f:
+                    f.write(datos)
+            for ruta in reemplazos:
+                os.replace(ruta + ".tmp", ruta)
+
+            self._categorias = {c: {} for c in CATEGORICAS}
+            self._valores = {c: [] for c in CATEGORICAS}
+            self._cargar_categorias()
+            self._agregados = {}
+            self._cargar_agregados()
+            self._archivos = {c: open(self._ruta(c), "ab") for c in COLUMNAS}
+            self._archivo_categorias = open(os.path.join(self.directorio, "categorias.jsonl"), "a", encoding="utf-8")
+        return int((~conservar).sum())
+
+    # --- Consultas (solo leen contadores) ---
+    def _agregados_de(self, usuario):
+        codigo = self._categorias["usuario"].get(usuario)
+        return self._agregados.get(codigo) if codigo is not None else None
+
+    def _tabla(self, filas, columna):
+        import pandas as pd
+
+        datos = [
+            (self._valores[columna][codigo], n, ok, lat / n)
+            for codigo, (n, ok, lat) in filas.items()
+        ]
+        df = pd.DataFrame(datos, columns=[columna, "respuestas", "aciertos", "latencia_media"])
+        df["precision"] = df["aciertos"] / df["respuestas"]
+        return df.sort_values("respuestas", ascending=False, ignore_index=True)
+
+    def por_mazo(self, usuario):
+        agregados = self._agregados_de(usuario)
+        with self._lock:
+            return self._tabla(agregados.por_mazo if agregados else {}, "mazo")
+
+    def por_tema(self, usuario):
+        agregados = self._agregados_de(usuario)
+        with self._lock:
+            return self._tabla(agregados.por_tema if agregados else {}, "tema")
+
+    def serie_diaria(self, usuario):
+        """Respuestas, aciertos y precisión por día (índice de fechas)."""
+        import pandas as pd
+
+        agregados = self._agregados_de(usuario)
+        with self._lock:
+            filas = sorted((agregados.por_dia if agregados else {}).items())
+        dias = np.array([d for d, _ in filas], dtype=np.int64)
+        df = pd.DataFrame(
+            [v for _, v in filas], columns=["respuestas", "aciertos"],
+            index=pd.to_datetime(dias * 86400, unit="s").rename("fecha"),
+        )
+        df["precision"] = df["aciertos"] / df["respuestas"]
+        return df
+
+    def resumen(self, usuario):
+        """Totales, precisión y rachas (de aciertos y de días seguidos estudiando)."""
+        agregados = self._agregados_de(usuario)
+        if agregados is None:
+            return {"respuestas": 0, "aciertos": 0, "precision": 0.0,
+                    "racha_aciertos": 0, "mejor_racha_aciertos": 0, "racha_dias": 0}
+        with self._lock:
+            respuestas = sum(v[0] for v in agregados.por_dia.values())
+            aciertos = sum(v[1] for v in agregados.por_dia.values())
+            dias = set(agregados.por_dia)
+            racha_actual, racha_mejor = agregados.racha_actual, agregados.racha_mejor
+        # La racha de días cuenta hacia atrás desde hoy (o desde ayer si hoy aún no hay respuestas).
+        dia = int(_dia_local(time.time()))
+        if dia not in dias:
+            dia -= 1
+        racha_dias = 0
+        while dia in dias:
+            racha_dias += 1
+            dia -= 1
+        return {
+            "respuestas": respuestas,
+            "aciertos": aciertos,
+            "precision": aciertos / respuestas if respuestas else 0.0,
+            "racha_aciertos": racha_actual,
+            "mejor_racha_aciertos": racha_mejor,
+            "racha_dias": racha_dias,
+        }
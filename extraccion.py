@@ -0,0 +1,250 @@
+# --- Motor de Extracción de Texto ---
+# Extrae el texto de PDFs y presentaciones grandes repartiendo rangos de
+# páginas/diapositivas entre un pool de procesos. Cada worker abre el
+# documento una sola vez (initializer) y devuelve el resultado de su rango;
+# el proceso principal lo va entregando, en orden, mediante un generador.
+#
+# En PPTX se conserva la estructura de cada diapositiva (número, título,
+# cuerpo y notas del orador), incluyendo formas agrupadas y tablas. En PDF,
+# las páginas escaneadas (sin capa de texto) pasan por OCR (ver ocr.py).
+#
+# PyMuPDF y python-pptx se importan al abrir el primer documento de su tipo:
+# arrancar la app (o cualquier página que no sea la de carga) no los paga.
+
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from ocr import aplicar_ocr
+
+# Cambia cuando la salida de los extractores cambie (invalida la caché).
+VERSION_EXTRACTOR = "4"
+
+# Por debajo de este número de páginas/diapositivas no compensa arrancar procesos.
+PAGINAS_MINIMAS_PARALELO = 48
+DIAPOSITIVAS_MINIMAS_PARALELO = 64
+# Elementos por tarea enviada al pool (equilibra reparto y overhead de IPC).
+PAGINAS_POR_BLOQUE = 16
+DIAPOSITIVAS_POR_BLOQUE = 16
+
+
+# --- Segmentos de PPTX ---
+class SegmentoDiapositiva:
+    __slots__ = ("numero", "titulo", "cuerpo", "notas")
+
+    def __init__(self, numero, titulo, cuerpo, notas):
+        self.numero = numero
+        self.titulo = titulo
+        self.cuerpo = cuerpo
+        self.notas = notas
+
+    def texto(self):
+        """Texto de la diapositiva con su número y título como encabezado."""
+        partes = [f"--- Diapositiva {self.numero}" + (f": {self.titulo}" if self.titulo else "") + " ---"]
+        if self.cuerpo:
+            partes.append(self.cuerpo)
+        if self.notas:
+            partes.append(f"Notas: {self.notas}")
+        return "\n".join(partes) + "\n"
+
+
+# Las formas se recorren sobre el XML de la diapositiva: los objetos de
+# python-pptx (shape_type, shapes.title, text_frame...) repiten búsquedas XPath
+# en cada acceso y triplicaban el tiempo de extracción.
+_A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+_P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+_FORMAS = (_P + "sp", _P + "grpSp", _P + "graphicFrame")
+_CONTENIDO_PARRAFO = (_A + "r", _A + "fld", _A + "br")
+
+
+def _texto_cuerpo(cuerpo):
+    """Texto de un txBody como TextFrame.text: un párrafo por línea y cada <a:br> como \\v."""
+    if cuerpo is None:
+        return ""
+    parrafos = []
+    for parrafo in cuerpo.iterchildren(_A + "p"):
+        partes = []
+        for elemento in parrafo.iterchildren(*_CONTENIDO_PARRAFO):
+            if elemento.tag == _A + "br":
+                partes.append("\v")
+            else:
+                texto = elemento.find(_A + "t")
+                partes.append((texto.text if texto is not None else None) or "")
+        parrafos.append("".join(partes))
+    return "\n".join(parrafos)
+
+
+def _es_titulo(forma):
+    # Como slide.shapes.title: el primer marcador de posición con idx 0.
+    marcador = forma.find(f"*/{_P}nvPr/{_P}ph")
+    return marcador is not None and int(marcador.get("idx", 0)) == 0
+
+
+def _textos_forma(forma):
+    """Textos de una forma (elemento XML), entrando en grupos y tablas."""
+    if forma.tag == _P + "grpSp":
+        for interna in forma.iterchildren(*_FORMAS):
+            yield from _textos_forma(interna)
+    elif forma.tag == _P + "graphicFrame":
+        tabla = forma.find(f"{_A}graphic/{_A}graphicData/{_A}tbl")
+        if tabla is not None:
+            for fila in tabla.iterchildren(_A + "tr"):
+                celdas = [_texto_cuerpo(celda.find(_A + "txBody")).strip() for celda in fila.iterchildren(_A + "tc")]
+                if any(celdas):
+                    yield " | ".join(celdas)
+    else:
+        texto = _texto_cuerpo(forma.find(_P + "txBody"))
+        if texto.strip():
+            yield texto
+
+
+def _texto_notas(notas):
+    # Como notes_slide.notes_text_frame.text: el marcador de cuerpo ("" si la página de notas no lo tiene).
+    for forma in notas.find(f"{_P}cSld/{_P}spTree").iterchildren(_P + "sp"):
+        marcador = forma.find(f"{_P}nvSpPr/{_P}nvPr/{_P}ph")
+        if marcador is not None and marcador.get("type") == "body":
+            return _texto_cuerpo(forma.find(_P + "txBody"))
+    return ""
+
+
+def _segmento_diapositiva(slide, numero):
+    formas = list(slide.element.find(f"{_P}cSld/{_P}spTree").iterchildren(*_FORMAS))
+    titulo_forma = next((forma for forma in formas if _es_titulo(forma)), None)
+    titulo = _texto_cuerpo(titulo_forma.find(_P + "txBody")).strip() if titulo_forma is not None else ""
+    cuerpo = [texto for forma in formas if forma is not titulo_forma for texto in _textos_forma(forma)]
+    notas = ""
+    if slide.has_notes_slide:
+        notas = _texto_notas(slide.notes_slide.element).strip()
+    return SegmentoDiapositiva(numero, titulo, "\n".join(cuerpo), notas)
+
+
+# --- Apertura y extracción por tipo de documento ---
+def abrir_pdf(datos):
+    import fitz  # PyMuPDF
+
+    return fitz.open(stream=datos, filetype="pdf")
+
+
+def abrir_pptx(datos):
+    from pptx import Presentation
+
+    return Presentation(io.BytesIO(datos))
+
+
+def _diapositivas_pptx(datos):
+    # Lista de diapositivas: prs.slides[i] busca la parte de la diapositiva en cada acceso.
+    return list(abrir_pptx(datos).slides)
+
+
+_ABRIR = {
+    "pdf": abrir_pdf,
+    "pptx": _diapositivas_pptx,
+}
+_CONTAR = {
+    "pdf": lambda doc: doc.page_count,
+    "pptx": len,
+}
+_EXTRAER = {
+    "pdf": lambda doc, i: doc[i].get_text(),
+    "pptx": lambda diapositivas, i: _segmento_diapositiva(diapositivas[i], i + 1),
+}
+_PARAMETROS = {  # (mínimo para paralelizar, elementos por bloque)
+    "pdf": (PAGINAS_MINIMAS_PARALELO, PAGINAS_POR_BLOQUE),
+    "pptx": (DIAPOSITIVAS_MINIMAS_PARALELO, DIAPOSITIVAS_POR_BLOQUE),
+}
+
+# Documento abierto dentro de cada proceso worker.
+_doc_worker = None
+
+
+def _iniciar_worker(tipo, datos):
+    """Abre el documento una sola vez por proceso worker."""
+    global _doc_worker
+    _doc_worker = _ABRIR[tipo](datos)
+
+
+def _extraer_rango(tipo, inicio, fin):
+    """Devuelve el resultado de los elementos [inicio, fin) del documento del worker."""
+    return [_EXTRAER[tipo](_doc_worker, i) for i in range(inicio, fin)]
+
+
+def _num_workers(max_workers):
+    if max_workers:
+        return max_workers
+    return max(1, min(os.cpu_count() or 1, 8))
+
+
+def _iterar_elementos(tipo, datos, max_workers, progreso):
+    """Genera, en orden, el resultado de cada página/diapositiva del documento."""
+    minimo, por_bloque = _PARAMETROS[tipo]
+    doc = _ABRIR[tipo](datos)
+    try:
+        total = _CONTAR[tipo](doc)
+        workers = _num_workers(max_workers)
+
+        # Documentos pequeños: se recorren en el propio hilo.
+        if workers == 1 or total < minimo:
+            for i in range(total):
+                yield _EXTRAER[tipo](doc, i)
+                if progreso:
+                    progreso(i + 1, total)
+            return
+    finally:
+        if tipo == "pdf":
+            doc.close()
+
+    bloques = [(i, min(i + por_bloque, total)) for i in range(0, total, por_bloque)]
+    # "spawn" evita heredar los hilos del servidor de Streamlit al hacer fork.
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(bloques)),
+        mp_context=contexto,
+        initializer=_iniciar_worker,
+        initargs=(tipo, datos),
+    ) as pool:
+        futuros = [pool.submit(_extraer_rango, tipo, inicio, fin) for inicio, fin in bloques]
+        hechos = 0
+        for futuro in futuros:
+            for resultado in futuro.result():
+                hechos += 1
+                yield resultado
+            if progreso:
+                progreso(hechos, total)
+
+
+def iterar_paginas_pdf(datos, max_workers=None, progreso=None):
+    """Genera el texto de cada página del PDF, en orden, usando un pool de procesos."""
+    return _iterar_elementos("pdf", datos, max_workers, progreso)
+
+
+def iterar_diapositivas_pptx(datos, max_workers=None, progreso=None):
+    """Genera un SegmentoDiapositiva por diapositiva, en orden, usando un pool de procesos."""
+    return _iterar_elementos("pptx", datos, max_workers, progreso)
+
+
+def es_error_extraccion(texto):
+    """Indica si el texto es el mensaje de error devuelto por un extractor."""
+    return texto.startswith("Error al procesar")
+
+
+def extraer_texto_pdf(file_stream, max_workers=None, progreso=None, cache_ocr=None):
+    try:
+        datos = file_stream.read()
+        textos = list(iterar_paginas_pdf(datos, max_workers=max_workers, progreso=progreso))
+        # Solo las páginas sin capa de texto pasan por OCR (cacheado por página en `cache_ocr`).
+        with abrir_pdf(datos) as doc:
+            aplicar_ocr(datos, doc, textos, cache=cache_ocr, workers=_num_workers(max_workers))
+        # Se une una sola vez al final en lugar de concatenar página a página.
+        return "".join(textos)
+    except Exception as e:
+        return f"Error al procesar PDF: {e}"
+
+
+def extraer_texto_pptx(file_stream, max_workers=None, progreso=None):
+    try:
+        datos = file_stream.read()
+        segmentos = iterar_diapositivas_pptx(datos, max_workers=max_workers, progreso=progreso)
+        return "\n".join(segmento.texto() for segmento in segmentos)
+    except Exception as e:
+        return f"Error al procesar PPTX: {e}"
@@ -0,0 +1,188 @@
+# --- Generación de Mazos (map-reduce) ---
+# Divide el material en secciones, pide a Gemini las preguntas de cada sección
+# en llamadas concurrentes (pool de hilos acotado) y luego une y deduplica las
+# listas parciales en un único mazo. Las respuestas se leen en streaming con
+# el parser incremental, de modo que cada tarjeta válida se entrega en cuanto
+# se cierra y una respuesta truncada no invalida las tarjetas ya recibidas.
+
+import contextvars
+import queue
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentacion import tramo
+from parser_preguntas import ParserPreguntas
+
+# Tamaño máximo de cada sección enviada al modelo (en caracteres).
+CARACTERES_POR_SECCION = 12000
+# Llamadas simultáneas al modelo.
+MAX_LLAMADAS_CONCURRENTES = 8
+
+FORMATO_JSON = """
+                        [
+                          {
+                            "pregunta": "El texto completo de la pregunta 1...",
+                            "opciones": {
+                              "A": "Texto de la opción A",
+                              "B": "Texto de la opción B",
+                              "C": "Texto de la opción C",
+                              "D": "Texto de la opción D"
+                            },
+                            "respuesta_correcta": "B",
+                            "explicacion": "Una breve pero completa explicación médica..."
+                          },
+                          {
+                            "pregunta": "El texto completo de la pregunta 2...",
+                            "opciones": { "A": "...", "B": "...", "C": "...", "D": "..." },
+                            "respuesta_correcta": "A",
+                            "explicacion": "..."
+                          }
+                        ]
+                        """
+
+
+class ErrorGeneracion(Exception):
+    """Ninguna sección produjo preguntas válidas."""
+
+    def __init__(self, mensaje, respuesta=None):
+        super().__init__(mensaje)
+        self.respuesta = respuesta
+
+
+# --- División del texto ---
+def dividir_en_secciones(texto, max_caracteres=CARACTERES_POR_SECCION):
+    """Agrupa párrafos consecutivos en secciones de como mucho `max_caracteres`."""
+    secciones = []
+    actual = []
+    longitud = 0
+    for parrafo in re.split(r"\n\s*\n", texto):
+        parrafo = parrafo.strip()
+        if not parrafo:
+            continue
+        # Párrafos enormes (p. ej. PDFs sin saltos) se cortan en trozos fijos.
+        while len(parrafo) > max_caracteres:
+            if actual:
+                secciones.append("\n\n".join(actual))
+                actual, longitud = [], 0
+            secciones.append(parrafo[:max_caracteres])
+            parrafo = parrafo[max_caracteres:]
+        if longitud + len(parrafo) > max_caracteres and actual:
+            secciones.append("\n\n".join(actual))
+            actual, longitud = [], 0
+        actual.append(parrafo)
+        longitud += len(parrafo) + 2
+    if actual:
+        secciones.append("\n\n".join(actual))
+    return secciones
+
+
+def repartir_preguntas(num_preguntas, num_secciones):
+    """Reparte las preguntas entre secciones distribuidas uniformemente por el documento."""
+    if num_secciones == 0:
+        return {}
+    if num_preguntas >= num_secciones:
+        base, resto = divmod(num_preguntas, num_secciones)
+        return {i: base + (1 if i < resto else 0) for i in range(num_secciones)}
+    # Menos preguntas que secciones: una pregunta por sección, espaciadas.
+    paso = num_secciones / num_preguntas
+    return {int(i * paso): 1 for i in range(num_preguntas)}
+
+
+# --- Prompt y respuesta ---
+def construir_prompt_generacion(texto, num_preguntas, dificultad, materia):
+    return [
+        "Rol: Eres un profesor de medicina experto en crear preguntas de examen tipo USMLE/MIR.",
+        f"Contexto del Estudiante: Nivel {dificultad}, Materia {materia}.",
+        f"Texto base (Material de estudio):\n---\n{texto}\n---\n",
+        f"Tu Tarea: Genera {num_preguntas} preguntas de opción múltiple (4 opciones) basadas *únicamente* en el texto base.",
+        "Las preguntas deben ser claras, concisas y relevantes al estilo de examen médico.",
+        "Formato de Respuesta: Responde OBLIGATORIAMENTE en formato JSON. La estructura debe ser una LISTA de objetos:",
+        FORMATO_JSON,
+    ]
+
+
+def clave_pregunta(pregunta):
+    """Forma normalizada del enunciado para detectar preguntas repetidas."""
+    texto = unicodedata.normalize("NFKD", pregunta.get("pregunta", "")).lower()
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(re.findall(r"\w+", texto))
+
+
+# --- Pipeline ---
+_FIN_SECCION = object()
+
+
+def iterar_preguntas(texto, llamar_modelo, num_preguntas, dificultad, materia,
+                     max_workers=MAX_LLAMADAS_CONCURRENTES, max_caracteres=CARACTERES_POR_SECCION):
+    """Genera las preguntas del mazo, sin duplicados, a medida que cada sección las produce.
+
+    `llamar_modelo(prompt_parts)` puede devolver el texto completo o un
+    iterable de fragmentos (streaming).
+    """
+    secciones = dividir_en_secciones(texto, max_caracteres)
+    reparto = repartir_preguntas(num_preguntas, len(secciones))
+    if not reparto:
+        raise ErrorGeneracion("El material no contiene texto.")
+
+    cola = queue.Queue()
+
+    def generar_seccion(indice):
+        with tramo("prompt.generacion"):
+            prompt_parts = construir_prompt_generacion(secciones[indice], reparto[indice], dificultad, materia)
+        parser = ParserPreguntas()
+        recibido = []
+        validas = 0
+        try:
+            respuesta = llamar_modelo(prompt_parts)
+            for fragmento in [respuesta] if isinstance(respuesta, str) else respuesta:
+                recibido.append(fragmento)
+                with tramo("parser.alimentar"):
+                    completas = parser.alimentar(fragmento)
+                for pregunta in completas:
+                    validas += 1
+                    cola.put(pregunta)
+            if not validas:
+                raise ErrorGeneracion(f"Respuesta no válida en la sección {indice + 1}.", "".join(recibido))
+        except Exception as e:
+            # Las tarjetas ya entregadas de esta sección se conservan.
+            cola.put(e)
+        finally:
+            cola.put(_FIN_SECCION)
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(reparto))))
+    try:
+        for indice in reparto:
+            # Cada hilo hereda el contexto para que sus tiempos cuenten en la sesión que generó el mazo.
+            pool.submit(contextvars.copy_context().run, generar_seccion, indice)
+
+        pendientes = len(reparto)
+        vistas = set()
+        errores = []
+        while pendientes and len(vistas) < num_preguntas:
+            elemento = cola.get()
+            if elemento is _FIN_SECCION:
+                pendientes -= 1
+            elif isinstance(elemento, Exception):
+                errores.append(elemento)
+            else:
+                clave = clave_pregunta(elemento)
+                if clave not in vistas:
+                    vistas.add(clave)
+                    yield elemento
+
+        # Una sección fallida no invalida el resto del mazo.
+        if not vistas:
+            if errores and isinstance(errores[0], ErrorGeneracion):
+                raise errores[0]
+            raise ErrorGeneracion(str(errores[0]) if errores else "No se generaron preguntas.")
+    finally:
+        # Al alcanzar el número pedido no se espera a las secciones restantes.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def generar_mazo(texto, llamar_modelo, num_preguntas, dificultad, materia,
+                 max_workers=MAX_LLAMADAS_CONCURRENTES, max_caracteres=CARACTERES_POR_SECCION):
+    """Genera un mazo de hasta `num_preguntas` con una llamada concurrente por sección."""
+    return list(iterar_preguntas(texto, llamar_modelo, num_preguntas, dificultad, materia,
+                                 max_workers=max_workers, max_caracteres=max_caracteres))
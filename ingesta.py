@@ -0,0 +1,116 @@
+# --- Ingesta por Lotes ---
+# Procesa varios archivos (y archivos .zip con apuntes dentro) en un pool de
+# hilos acotado. Cada archivo pasa por el extractor que le corresponde y por
+# la caché de extracción; un fallo solo afecta a su propio archivo. El
+# resultado se guarda como un corpus etiquetado por fuente.
+
+import contextvars
+import io
+import os
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from extraccion import es_error_extraccion, extraer_texto_pdf, extraer_texto_pptx
+
+EXTENSIONES_SOPORTADAS = (".pdf", ".pptx", ".txt", ".md")
+# Archivos extraídos a la vez; cada PDF/PPTX grande usa además su propio pool de procesos.
+MAX_ARCHIVOS_CONCURRENTES = 4
+# Segundos entre avisos de progreso mientras se extraen los archivos.
+INTERVALO_PROGRESO = 0.2
+
+
+class FuenteExtraida:
+    __slots__ = ("nombre", "texto", "error")
+
+    def __init__(self, nombre, texto=None, error=None):
+        self.nombre = nombre
+        self.texto = texto
+        self.error = error
+
+
+def expandir_archivos(archivos):
+    """Convierte (nombre, bytes) en entradas individuales, abriendo los .zip.
+
+    Devuelve (entradas, errores): los .zip dañados se reportan como errores.
+    """
+    entradas = []
+    errores = []
+    for nombre, datos in archivos:
+        if not nombre.lower().endswith(".zip"):
+            entradas.append((nombre, datos))
+            continue
+        try:
+            with zipfile.ZipFile(io.BytesIO(datos)) as archivo_zip:
+                for info in archivo_zip.infolist():
+                    interno = info.filename
+                    if info.is_dir() or interno.startswith("__MACOSX/") or os.path.basename(interno).startswith("."):
+                        continue
+                    if interno.lower().endswith(EXTENSIONES_SOPORTADAS):
+                        entradas.append((f"{nombre}/{interno}", archivo_zip.read(info)))
+        except (zipfile.BadZipFile, OSError) as e:
+            errores.append(FuenteExtraida(nombre, error=f"Archivo .zip no válido: {e}"))
+    return entradas, errores
+
+
+def extraer_fuente(nombre, datos, cache=None, workers_documento=None, progreso=None):
+    """Extrae el texto de un archivo según su extensión; `progreso(hechas, total)` por página o diapositiva."""
+    extension = os.path.splitext(nombre)[1].lower()
+    if extension in (".txt", ".md"):
+        return datos.decode("utf-8")
+    if extension == ".pdf":
+        tipo, extractor = "pdf", lambda d: extraer_texto_pdf(
+            io.BytesIO(d), max_workers=workers_documento, progreso=progreso, cache_ocr=cache
+        )
+    elif extension == ".pptx":
+        tipo, extractor = "pptx", lambda d: extraer_texto_pptx(
+            io.BytesIO(d), max_workers=workers_documento, progreso=progreso
+        )
+    else:
+        raise ValueError(f"Tipo de archivo no soportado: {extension or nombre}")
+    texto = cache.obtener_o_extraer(datos, tipo, extractor) if cache else extractor(datos)
+    if es_error_extraccion(texto):
+        raise ValueError(texto)
+    return texto
+
+
+def iterar_ingesta(entradas, cache=None, max_workers=MAX_ARCHIVOS_CONCURRENTES, progreso=None):
+    """Extrae las entradas en paralelo y genera cada FuenteExtraida según termina.
+
+    Mientras tanto llama a `progreso(avance)` desde el hilo que consume el
+    generador (cada INTERVALO_PROGRESO s), con {nombre: (hechas, total)} de
+    las páginas o diapositivas de los archivos en curso.
+    """
+    if not entradas:
+        return
+    workers = max(1, min(max_workers, len(entradas)))
+    # Reparte los núcleos entre los documentos que se procesan a la vez.
+    workers_documento = max(1, (os.cpu_count() or 1) // workers)
+    avance = {}
+
+    def procesar(nombre, datos):
+        def al_avanzar(hechas, total):
+            avance[nombre] = (hechas, total)
+
+        try:
+            return FuenteExtraida(nombre, texto=extraer_fuente(nombre, datos, cache, workers_documento, al_avanzar))
+        except Exception as e:
+            return FuenteExtraida(nombre, error=str(e))
+        finally:
+            avance.pop(nombre, None)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pendientes = {pool.submit(contextvars.copy_context().run, procesar, nombre, datos) for nombre, datos in entradas}
+        while pendientes:
+            terminados, pendientes = wait(pendientes, timeout=INTERVALO_PROGRESO, return_when=FIRST_COMPLETED)
+            if progreso:
+                progreso(dict(avance))
+            for futuro in terminados:
+                yield futuro.result()
+
+
+def combinar_corpus(corpus, nombres=None):
+    """Une el texto de las fuentes elegidas (todas por defecto), etiquetando cada una."""
+    nombres = list(corpus) if nombres is None else nombres
+    if len(nombres) == 1:
+        return corpus[nombres[0]]
+    return "\n\n".join(f"### Fuente: {nombre}\n\n{corpus[nombre]}" for nombre in nombres if nombre in corpus)
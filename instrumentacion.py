@@ -0,0 +1,135 @@
+# --- Instrumentación de Tiempos ---
+# Tramos con nombre ("extraccion.pdf", "modelo.llamada", "pagina.Estudiar"...)
+# medidos con perf_counter y acumulados en histogramas de cubetas
+# logarítmicas (tamaño fijo, O(1) por muestra). Cada muestra va al registro
+# del proceso y, si el hilo está atendiendo una sesión, también al registro
+# de esa sesión (se propaga con contextvars). Los registros se exportan como
+# JSON para comparar la latencia entre versiones.
+
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Cubetas: de 1 µs a ~17 min, cuatro por cada potencia de dos (error < 19 %).
+SEGUNDOS_MINIMOS = 1e-6
+CUBETAS_POR_OCTAVA = 4
+NUM_CUBETAS = 30 * CUBETAS_POR_OCTAVA
+PERCENTILES = (50, 95, 99)
+
+
+def _cubeta(segundos):
+    if segundos <= SEGUNDOS_MINIMOS:
+        return 0
+    return min(NUM_CUBETAS - 1, int(math.log2(segundos / SEGUNDOS_MINIMOS) * CUBETAS_POR_OCTAVA) + 1)
+
+
+def limite_cubeta(indice):
+    """Límite superior (en segundos) de la cubeta `indice`."""
+    return SEGUNDOS_MINIMOS * 2 ** (indice / CUBETAS_POR_OCTAVA)
+
+
+class Histograma:
+    __slots__ = ("cuentas", "n", "suma", "minimo", "maximo")
+
+    def __init__(self):
+        self.cuentas = [0] * NUM_CUBETAS
+        self.n = 0
+        self.suma = 0.0
+        self.minimo = math.inf
+        self.maximo = 0.0
+
+    def agregar(self, segundos):
+        self.cuentas[_cubeta(segundos)] += 1
+        self.n += 1
+        self.suma += segundos
+        self.minimo = min(self.minimo, segundos)
+        self.maximo = max(self.maximo, segundos)
+
+    def percentil(self, p):
+        """Percentil aproximado (límite superior de su cubeta, acotado por el máximo)."""
+        if not self.n:
+            return 0.0
+        objetivo = math.ceil(self.n * p / 100)
+        acumulado = 0
+        for indice, cuenta in enumerate(self.cuentas):
+            acumulado += cuenta
+            if acumulado >= objetivo:
+                return min(max(limite_cubeta(indice), self.minimo), self.maximo)
+        return self.maximo
+
+    def exportar(self):
+        return {
+            "n": self.n,
+            "media": self.suma / self.n if self.n else 0.0,
+            "min": self.minimo if self.n else 0.0,
+            "max": self.maximo,
+            **{f"p{p}": self.percentil(p) for p in PERCENTILES},
+            # Solo las cubetas no vacías: {límite superior en segundos: cuenta}.
+            "cubetas": {f"{limite_cubeta(i):.6g}": c for i, c in enumerate(self.cuentas) if c},
+        }
+
+
+class RegistroTiempos:
+    """Histogramas por nombre de tramo; seguro entre hilos."""
+
+    def __init__(self):
+        self._histogramas = {}
+        self._lock = threading.Lock()
+        self.desde = time.time()
+
+    def registrar(self, nombre, segundos):
+        with self._lock:
+            histograma = self._histogramas.get(nombre)
+            if histograma is None:
+                histograma = self._histogramas[nombre] = Histograma()
+            histograma.agregar(segundos)
+
+    def reiniciar(self):
+        with self._lock:
+            self._histogramas = {}
+            self.desde = time.time()
+
+    def exportar(self):
+        """Resumen JSON-serializable de todos los tramos, ordenados por nombre."""
+        with self._lock:
+            return {nombre: self._histogramas[nombre].exportar() for nombre in sorted(self._histogramas)}
+
+
+# Registro compartido por todo el proceso y registro de la sesión activa en este contexto.
+REGISTRO_PROCESO = RegistroTiempos()
+_registro_sesion = contextvars.ContextVar("registro_sesion", default=None)
+
+
+def activar_sesion(registro):
+    """Hace que los tramos medidos en este contexto se sumen también a `registro`."""
+    _registro_sesion.set(registro)
+
+
+def registrar(nombre, segundos):
+    REGISTRO_PROCESO.registrar(nombre, segundos)
+    registro = _registro_sesion.get()
+    if registro is not None:
+        registro.registrar(nombre, segundos)
+
+
+@contextmanager
+def tramo(nombre):
+    """Mide el bloque y lo registra con `nombre` (también si el bloque lanza una excepción)."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar(nombre, time.perf_counter() - inicio)
+
+
+def exportar(registro_sesion=None):
+    """Informe JSON con los registros del proceso y, opcionalmente, de una sesión."""
+    informe = {
+        "generado": time.time(),
+        "proceso": {"desde": REGISTRO_PROCESO.desde, "tramos": REGISTRO_PROCESO.exportar()},
+    }
+    if registro_sesion is not None:
+        informe["sesion"] = {"desde": registro_sesion.desde, "tramos": registro_sesion.exportar()}
+    return informe
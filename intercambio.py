@@ -0,0 +1,236 @@
+# --- Exportar e Importar la Biblioteca ---
+# Formato .mflash para mover bibliotecas enteras entre sesiones, servidores o
+# usuarios sin volver a pagar su generación:
+#   cabecera sin comprimir: b"MFLASH" + versión (1 byte) + longitud y nombre
+#                           de la compresión ("zstd" o "gzip")
+#   cuerpo comprimido:      registros [longitud u32 big-endian][tipo 1 byte][datos]
+#     tipo b"M": mazo    -> JSON {"nombre": ..., "num_tarjetas": ...}
+#     tipo b"T": tarjeta -> JSON de la tarjeta, tal como está en la biblioteca
+# Las tarjetas de un mazo siguen a su registro "M". Exportar e importar van
+# en streaming: ni el archivo ni la biblioteca se cargan enteros en memoria.
+# zstd usa el paquete `zstandard` (en requirements.txt); sin él se usa gzip.
+#
+# También se exporta a texto separado por tabuladores importable en Anki
+# (Archivo → Importar), un mazo de Anki por cada mazo de la biblioteca.
+
+import csv
+import gzip
+import html
+import json
+import struct
+import zlib
+
+from parser_preguntas import validar_pregunta
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Errores de los descompresores ante un archivo dañado (gzip lanza zlib.error
+# si el flujo comprimido está corrupto y OSError si falla su CRC).
+_ERRORES_LECTURA = (OSError, EOFError, zlib.error) + ((zstandard.ZstdError,) if zstandard is not None else ())
+
+MAGIA = b"MFLASH"
+VERSION = 1
+NIVEL_ZSTD = 10
+MAZO = b"M"
+TARJETA = b"T"
+_REGISTRO = struct.Struct(">Ic")
+EXTENSION = ".mflash"
+PREFIJO_MAZO_ANKI = "MedFlash::"
+
+
+class ErrorIntercambio(Exception):
+    """El archivo no es una biblioteca .mflash válida (o no se puede leer aquí).
+
+    Si la importación ya había guardado mazos, `resumen` los describe (los
+    mazos guardados antes del error se conservan).
+    """
+
+    resumen = None
+
+
+def compresion_por_defecto():
+    return "zstd" if zstandard is not None else "gzip"
+
+
+# --- Compresión ---
+def _escritor(destino, compresion):
+    if compresion == "zstd":
+        if zstandard is None:
+            raise ErrorIntercambio("La compresión zstd requiere el paquete 'zstandard'.")
+        return zstandard.ZstdCompressor(level=NIVEL_ZSTD).stream_writer(destino, closefd=False)
+    if compresion == "gzip":
+        return gzip.GzipFile(fileobj=destino, mode="wb", compresslevel=6)
+    raise ErrorIntercambio(f"Compresión desconocida: {compresion!r}")
+
+
+def _lector(origen, compresion):
+    if compresion == "zstd":
+        if zstandard is None:
+            raise ErrorIntercambio("Este archivo usa zstd: instala el paquete 'zstandard' para importarlo.")
+        return zstandard.ZstdDecompressor().stream_reader(origen, closefd=False)
+    if compresion == "gzip":
+        return gzip.GzipFile(fileobj=origen, mode="rb")
+    raise ErrorIntercambio(f"Compresión desconocida: {compresion!r}")
+
+
+def _leer_exacto(flujo, n):
+    """Lee exactamente n bytes (los lectores comprimidos pueden devolver menos); b"" si el flujo acabó."""
+    partes = []
+    while n:
+        parte = flujo.read(n)
+        if not parte:
+            if partes:
+                raise ErrorIntercambio("El archivo está truncado.")
+            return b""
+        partes.append(parte)
+        n -= len(parte)
+    return b"".join(partes)
+
+
+# --- .mflash ---
+def exportar_biblioteca(biblioteca, usuario, destino, compresion=None):
+    """Escribe la biblioteca del usuario en `destino` (archivo binario). Devuelve (mazos, tarjetas)."""
+    compresion = compresion or compresion_por_defecto()
+    nombre = compresion.encode("ascii")
+    destino.write(MAGIA + bytes([VERSION, len(nombre)]) + nombre)
+    mazos = tarjetas = 0
+    escritor = _escritor(destino, compresion)
+    try:
+        for registro in biblioteca.iterar_mazos(usuario):
+            if registro[0] == "mazo":
+                datos = json.dumps({"nombre": registro[1], "num_tarjetas": registro[2]}, ensure_ascii=False)
+                tipo = MAZO
+                mazos += 1
+            else:
+                datos = registro[1]
+                tipo = TARJETA
+                tarjetas += 1
+            datos = datos.encode("utf-8")
+            escritor.write(_REGISTRO.pack(len(datos), tipo))
+            escritor.write(datos)
+    finally:
+        escritor.close()
+    return mazos, tarjetas
+
+
+def _registros(origen):
+    cabecera = origen.read(len(MAGIA) + 2)
+    if len(cabecera) < len(MAGIA) + 2 or cabecera[:len(MAGIA)] != MAGIA:
+        raise ErrorIntercambio("No es un archivo de biblioteca de Med-Flash.")
+    version, longitud = cabecera[len(MAGIA)], cabecera[len(MAGIA) + 1]
+    if version > VERSION:
+        raise ErrorIntercambio(f"El archivo es de una versión más reciente ({version}).")
+    compresion = _leer_exacto(origen, longitud).decode("ascii", "replace")
+    flujo = _lector(origen, compresion)
+    try:
+        while cabecera := _leer_exacto(flujo, _REGISTRO.size):
+            longitud, tipo = _REGISTRO.unpack(cabecera)
+            yield tipo, _leer_exacto(flujo, longitud)
+    except _ERRORES_LECTURA as e:
+        raise ErrorIntercambio(f"El archivo está dañado ({e}).") from e
+
+
+class ResumenImportacion:
+    def __init__(self):
+        self.mazos = []          # (nombre en el archivo, nombre guardado, tarjetas)
+        self.tarjetas = 0
+        self.descartadas = 0     # tarjetas que no cumplen el esquema
+
+    @property
+    def renombrados(self):
+        return [(original, guardado) for original, guardado, _ in self.mazos if original != guardado]
+
+
+def importar_biblioteca(biblioteca, usuario, origen):
+    """Importa en streaming los mazos de un .mflash (archivo binario) en la biblioteca del usuario.
+
+    Cada mazo se guarda en su propia transacción; si el nombre ya existe se
+    guarda como "nombre (2)". Las tarjetas inválidas se descartan. Un archivo
+    mal formado lanza ErrorIntercambio con el resumen de lo ya importado.
+    """
+    resumen = ResumenImportacion()
+    try:
+        _importar_mazos(biblioteca, usuario, _registros(origen), resumen)
+    except ErrorIntercambio as e:
+        e.resumen = resumen
+        raise
+    return resumen
+
+
+def _nombre_mazo(datos):
+    try:
+        nombre = json.loads(datos)["nombre"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ErrorIntercambio("El archivo está dañado (registro de mazo inválido).") from e
+    if not isinstance(nombre, str) or not nombre.strip():
+        raise ErrorIntercambio(f"Nombre de mazo inválido: {nombre!r}")
+    return nombre
+
+
+def _importar_mazos(biblioteca, usuario, registros, resumen):
+    siguiente = next(registros, None)
+
+    def tarjetas_del_mazo():
+        nonlocal siguiente
+        for tipo, datos in registros:
+            if tipo == MAZO:
+                siguiente = (tipo, datos)
+                return
+            if tipo != TARJETA:
+                raise ErrorIntercambio(f"Registro desconocido: {tipo!r}")
+            try:
+                tarjeta = json.loads(datos)
+            except ValueError:
+                tarjeta = None
+            if validar_pregunta(tarjeta):
+                yield tarjeta
+            else:
+                resumen.descartadas += 1
+        siguiente = None
+
+    while siguiente is not None:
+        tipo, datos = siguiente
+        if tipo != MAZO:
+            raise ErrorIntercambio("El archivo no empieza por un mazo.")
+        nombre = _nombre_mazo(datos)
+        guardado, num_tarjetas = biblioteca.importar_mazo(usuario, nombre, tarjetas_del_mazo())
+        resumen.mazos.append((nombre, guardado, num_tarjetas))
+        resumen.tarjetas += num_tarjetas
+
+
+# --- Anki ---
+def _campo_anki(texto):
+    # Anki interpreta el campo como HTML; los saltos de línea se convierten en <br>.
+    return html.escape(texto).replace("\t", " ").replace("\n", "<br>")
+
+
+def exportar_anki(biblioteca, usuario, destino):
+    """Escribe la biblioteca como texto para Anki en `destino` (archivo de texto). Devuelve las tarjetas.
+
+    Anverso: enunciado y opciones. Reverso: respuesta correcta y explicación.
+    """
+    destino.write("#separator:tab\n#html:true\n#deck column:3\n#tags column:4\n")
+    escritor = csv.writer(destino, delimiter="\t", quoting=csv.QUOTE_ALL, lineterminator="\n")
+    mazo = None
+    total = 0
+    for registro in biblioteca.iterar_mazos(usuario):
+        if registro[0] == "mazo":
+            mazo = PREFIJO_MAZO_ANKI + registro[1]
+            continue
+        tarjeta = json.loads(registro[1])
+        opciones = "".join(
+            f"<li><b>{_campo_anki(letra)}.</b> {_campo_anki(texto)}</li>" for letra, texto in tarjeta["opciones"].items()
+        )
+        correcta = tarjeta["respuesta_correcta"]
+        escritor.writerow([
+            f"{_campo_anki(tarjeta['pregunta'])}<ul>{opciones}</ul>",
+            f"<b>{_campo_anki(correcta)}. {_campo_anki(tarjeta['opciones'].get(correcta, ''))}</b>"
+            f"<br><br>{_campo_anki(tarjeta.get('explicacion', ''))}",
+            mazo,
+            "medflash",
+        ])
+        total += 1
+    return total
@@ -0,0 +1,161 @@
+# --- Mazos Compartidos entre Sesiones ---
+# Un mismo mazo suele estar abierto por muchos estudiantes a la vez. En lugar
+# de que cada sesión cargue su propia copia de las tarjetas, el proceso guarda
+# una sola copia inmutable por contenido (la huella de biblioteca.py) con un
+# contador de referencias; cada sesión guarda un ManejadorMazo con lo que es
+# suyo: los ids de sus tarjetas (para el repaso y las estadísticas) y el orden
+# de estudio. La memoria crece con los mazos distintos, no con usuarios × mazos.
+#
+# Los mazos compartidos nunca se modifican: quitar una tarjeta crea una copia
+# (copy-on-write) solo para quien la quita, y eliminar un mazo de la
+# biblioteca no afecta a las sesiones que lo tienen abierto. Un mazo se libera
+# cuando la última sesión suelta su manejador (o este se recolecta).
+
+import json
+import threading
+from array import array
+import weakref
+
+import numpy as np
+
+from biblioteca import huella_contenido
+from modelo_tarjetas import Tarjeta
+
+
+class MazoCompartido:
+    """Tarjetas de un mazo (sin id ni mazo de origen), compartidas e inmutables."""
+
+    __slots__ = ("clave", "tarjetas")
+
+    def __init__(self, clave, tarjetas):
+        self.clave = clave
+        self.tarjetas = tuple(tarjetas)
+
+
+class AlmacenMazos:
+    """Mazos compartidos del proceso, por huella de contenido y con contador de referencias."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._mazos = {}  # clave -> [MazoCompartido, referencias]
+
+    def _adquirir(self, clave, cargar):
+        """El mazo de esa clave (+1 referencia); si no está, lo crea con `cargar()` (None si falla)."""
+        with self._lock:
+            entrada = self._mazos.get(clave)
+            if entrada is not None:
+                entrada[1] += 1
+                return entrada[0]
+        # Se carga fuera del lock; si otra sesión se adelanta, se usa su copia.
+        tarjetas = cargar()
+        if tarjetas is None:
+            return None
+        with self._lock:
+            entrada = self._mazos.setdefault(clave, [MazoCompartido(clave, tarjetas), 0])
+            entrada[1] += 1
+            return entrada[0]
+
+    def _liberar(self, clave):
+        with self._lock:
+            entrada = self._mazos.get(clave)
+            if entrada is None:
+                return
+            entrada[1] -= 1
+            if entrada[1] <= 0:
+                del self._mazos[clave]
+
+    def abrir(self, biblioteca, usuario, nombre):
+        """Manejador del mazo del usuario, o None si no existe.
+
+        Si otra sesión ya tiene abierto un mazo con el mismo contenido, solo se
+        leen de la biblioteca los ids de las tarjetas del usuario.
+        """
+        fila = biblioteca.abrir(usuario, nombre)
+        if fila is None:
+            return None
+        mazo_id, huella, ids = fila
+
+        def cargar():
+            filas = biblioteca.datos_mazo(mazo_id, huella)
+            return None if filas is None else [Tarjeta.desde_dict(json.loads(datos)) for datos in filas]
+
+        mazo = self._adquirir(huella, cargar)
+        if mazo is None:
+            return None  # el mazo cambió o se eliminó mientras se abría
+        return ManejadorMazo(self, mazo, nombre, ids)
+
+    def estadisticas(self):
+        """Mazos distintos en memoria, referencias (manejadores abiertos) y tarjetas compartidas."""
+        with self._lock:
+            entradas = list(self._mazos.values())
+        return {
+            "mazos": len(entradas),
+            "referencias": sum(referencias for _, referencias in entradas),
+            "tarjetas": sum(len(mazo.tarjetas) for mazo, _ in entradas),
+        }
+
+
+class ManejadorMazo:
+    """Mazo abierto por una sesión: referencia al mazo compartido más el estado propio del usuario.
+
+    Se usa como una lista de tarjetas de solo lectura; cada acceso devuelve una
+    copia ligera con el id y el mazo del usuario.
+    """
+
+    __slots__ = ("_almacen", "mazo", "nombre", "ids", "orden", "_finalizador", "__weakref__")
+
+    def __init__(self, almacen, mazo, nombre, ids):
+        self._almacen = almacen
+        self.mazo = mazo
+        self.nombre = nombre
+        self.ids = array("q", ids)  # ids de las tarjetas del usuario, por posición en el mazo
+        self.orden = None  # posiciones en el orden de estudio de la sesión (None: el del mazo)
+        self._finalizador = weakref.finalize(self, almacen._liberar, mazo.clave)
+
+    def __len__(self):
+        return len(self.mazo.tarjetas) if self.orden is None else len(self.orden)
+
+    def _posicion(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return i if self.orden is None else int(self.orden[i])
+
+    def __getitem__(self, i):
+        posicion = self._posicion(i)
+        return self.mazo.tarjetas[posicion].con_origen(self.ids[posicion], self.nombre)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def reordenar(self, orden):
+        """Fija el orden de estudio de esta sesión (índices sobre el orden actual)."""
+        orden = np.asarray(orden, dtype=np.int64)
+        self.orden = orden if self.orden is None else self.orden[orden]
+
+    def quitar(self, i):
+        """Quita la tarjeta i (en el orden de estudio) solo para esta sesión, con copy-on-write.
+
+        El mazo compartido no se toca: la copia sin la tarjeta se registra bajo
+        la huella de su propio contenido (no la de la biblioteca, que refleja
+        lo que hayan quitado otras sesiones del usuario) y se suelta la
+        referencia al anterior. No se puede quitar la última tarjeta.
+        """
+        posicion = self._posicion(i)
+        if len(self) <= 1:
+            raise ValueError("No se puede quitar la última tarjeta del mazo.")
+        tarjetas = self.mazo.tarjetas[:posicion] + self.mazo.tarjetas[posicion + 1:]
+        clave = huella_contenido(json.dumps(t.a_dict(), ensure_ascii=False) for t in tarjetas)
+        nuevo = self._almacen._adquirir(clave, lambda: tarjetas)
+        del self.ids[posicion]
+        if self.orden is not None:
+            orden = self.orden[self.orden != posicion]
+            self.orden = orden - (orden > posicion)
+        self._finalizador()
+        self.mazo = nuevo
+        self._finalizador = weakref.finalize(self, self._almacen._liberar, nuevo.clave)
+
+    def liberar(self):
+        """Suelta la referencia al mazo compartido (también ocurre al recolectar el manejador)."""
+        self._finalizador()
@@ -0,0 +1,79 @@
+# --- Modelo Compacto de Tarjetas ---
+# Representación en memoria de las tarjetas y respuestas de estudio:
+#   - Tarjeta: clase con __slots__; las opciones son tuplas de cadenas
+#     internadas y la respuesta correcta es un índice entero.
+#   - Respuesta: índices de la opción elegida y de la correcta, sin copiar
+#     el texto de las opciones.
+# La conversión desde/hacia el formato JSON de Gemini es sin pérdidas.
+
+import sys
+
+from parser_preguntas import CAMPOS_PREGUNTA
+
+
+class Tarjeta:
+    __slots__ = ("id", "mazo", "pregunta", "letras", "opciones", "correcta", "explicacion", "extras")
+
+    def __init__(self, pregunta, letras, opciones, correcta, explicacion, id=None, extras=None, mazo=None):
+        self.id = id
+        self.mazo = mazo  # nombre del mazo de origen (no forma parte del JSON)
+        self.pregunta = pregunta
+        self.letras = letras
+        self.opciones = opciones
+        self.correcta = correcta
+        self.explicacion = explicacion
+        self.extras = extras  # claves adicionales del JSON original (normalmente None)
+
+    @classmethod
+    def desde_dict(cls, datos, id=None, mazo=None):
+        """Crea una tarjeta a partir del dict JSON generado por el modelo."""
+        letras = tuple(sys.intern(letra) for letra in datos["opciones"])
+        opciones = tuple(sys.intern(texto) for texto in datos["opciones"].values())
+        extras = {k: v for k, v in datos.items() if k not in CAMPOS_PREGUNTA} or None
+        return cls(
+            datos["pregunta"],
+            letras,
+            opciones,
+            letras.index(datos["respuesta_correcta"]),
+            datos["explicacion"],
+            id=id,
+            extras=extras,
+            mazo=mazo,
+        )
+
+    def con_origen(self, id, mazo):
+        """Copia ligera con otro id y mazo; comparte la pregunta, las opciones y la explicación."""
+        return Tarjeta(
+            self.pregunta, self.letras, self.opciones, self.correcta, self.explicacion,
+            id=id, extras=self.extras, mazo=mazo,
+        )
+
+    def a_dict(self):
+        """Devuelve la tarjeta en el formato JSON original."""
+        datos = {
+            "pregunta": self.pregunta,
+            "opciones": dict(zip(self.letras, self.opciones)),
+            "respuesta_correcta": self.letras[self.correcta],
+            "explicacion": self.explicacion,
+        }
+        if self.extras:
+            datos.update(self.extras)
+        return datos
+
+    @property
+    def texto_correcto(self):
+        return self.opciones[self.correcta]
+
+
+class Respuesta:
+    """Respuesta a una tarjeta, guardada como índices dentro de `Tarjeta.opciones`."""
+
+    __slots__ = ("seleccionada", "correcta")
+
+    def __init__(self, seleccionada, correcta):
+        self.seleccionada = seleccionada
+        self.correcta = correcta
+
+    @property
+    def es_correcta(self):
+        return self.seleccionada == self.correcta
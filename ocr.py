@@ -0,0 +1,134 @@
+# --- OCR de Páginas Escaneadas ---
+# Las páginas de un PDF sin capa de texto (apuntes escaneados) devuelven una
+# cadena vacía con get_text(). Aquí se detectan (casi sin texto y con alguna
+# imagen) y solo esas pasan por Tesseract mediante el OCR de PyMuPDF, en un
+# pool de procesos. El resultado se cachea por página, bajo un hash de su
+# contenido (operadores de la página e imágenes que usa), así que la misma
+# hoja escaneada en otro documento no se vuelve a reconocer.
+#
+# Sin Tesseract instalado, cada página escaneada se sustituye por una marca
+# visible (MARCA_SIN_OCR) en lugar de quedar vacía.
+#
+# PyMuPDF solo se importa al comprobar si hay OCR o al abrir el documento en
+# un worker (ver extraccion.py).
+
+import functools
+import hashlib
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from instrumentacion import tramo
+
+VERSION_OCR = "1"
+IDIOMAS_OCR = os.environ.get("MEDFLASH_OCR_IDIOMAS", "spa+eng")
+DPI_OCR = 300
+# Una página con menos caracteres que esto se considera sin capa de texto.
+MIN_CARACTERES_PAGINA = 16
+MARCA_SIN_OCR = "[Página {numero} sin capa de texto: OCR no disponible]"
+_RE_MARCA_SIN_OCR = re.compile(r"\[Página \d+ sin capa de texto: OCR no disponible\]")
+
+
+@functools.lru_cache(maxsize=1)
+def ocr_disponible():
+    """Indica si Tesseract (y sus datos de idioma) están instalados."""
+    import fitz  # PyMuPDF
+
+    try:
+        fitz.get_tessdata()
+        return True
+    except RuntimeError:
+        return False
+
+
+def contar_paginas_sin_ocr(texto):
+    """Páginas escaneadas que quedaron sin texto por no haber OCR."""
+    return len(_RE_MARCA_SIN_OCR.findall(texto))
+
+
+def paginas_escaneadas(doc, textos):
+    """Índices de las páginas sin capa de texto que contienen alguna imagen."""
+    return [
+        i for i, texto in enumerate(textos)
+        if len(texto.strip()) < MIN_CARACTERES_PAGINA and doc[i].get_images(full=False)
+    ]
+
+
+def clave_pagina(doc, i):
+    """Hash del contenido de la página (y de la configuración del OCR) para la caché."""
+    pagina = doc[i]
+    h = hashlib.sha256(f"ocr:{VERSION_OCR}:{IDIOMAS_OCR}:{DPI_OCR}:{pagina.rotation}:".encode("utf-8"))
+    h.update(pagina.read_contents())
+    for imagen in pagina.get_images(full=True):
+        h.update(doc.xref_stream_raw(imagen[0]) or b"")
+    return h.hexdigest()
+
+
+def _ocr_pagina(doc, i):
+    """(texto, correcto) de la página i; un fallo solo afecta a esa página."""
+    pagina = doc[i]
+    try:
+        textpage = pagina.get_textpage_ocr(language=IDIOMAS_OCR, dpi=DPI_OCR, full=True)
+        return pagina.get_text(textpage=textpage), True
+    except Exception as e:
+        return f"[Página {i + 1}: error de OCR: {e}]\n", False
+
+
+# Documento abierto dentro de cada proceso worker.
+_doc_worker = None
+
+
+def _iniciar_worker(datos):
+    from extraccion import abrir_pdf
+
+    global _doc_worker
+    _doc_worker = abrir_pdf(datos)
+
+
+def _ocr_en_worker(i):
+    return _ocr_pagina(_doc_worker, i)
+
+
+def aplicar_ocr(datos, doc, textos, cache=None, workers=1):
+    """Sustituye en `textos` (uno por página) el de las páginas escaneadas por su OCR.
+
+    `cache` es cualquier objeto con obtener(clave)/guardar(clave, texto)
+    (normalmente la CacheExtraccion compartida). Devuelve `textos`.
+    """
+    escaneadas = paginas_escaneadas(doc, textos)
+    if not escaneadas:
+        return textos
+    if not ocr_disponible():
+        for i in escaneadas:
+            textos[i] = MARCA_SIN_OCR.format(numero=i + 1) + "\n"
+        return textos
+
+    claves = {i: clave_pagina(doc, i) for i in escaneadas}
+    pendientes = []
+    for i in escaneadas:
+        texto = cache.obtener(claves[i]) if cache is not None else None
+        if texto is None:
+            pendientes.append(i)
+        else:
+            textos[i] = texto
+    if not pendientes:
+        return textos
+
+    with tramo("extraccion.ocr"):
+        workers = max(1, min(workers, len(pendientes)))
+        if workers == 1:
+            resultados = [_ocr_pagina(doc, i) for i in pendientes]
+        else:
+            # Una página por tarea: el OCR tarda mucho más que el reparto.
+            contexto = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=contexto, initializer=_iniciar_worker, initargs=(datos,)
+            ) as pool:
+                resultados = list(pool.map(_ocr_en_worker, pendientes))
+    for i, (texto, correcto) in zip(pendientes, resultados):
+        textos[i] = texto
+        # Los fallos no se cachean para poder reintentar.
+        if correcto and cache is not None:
+            cache.guardar(claves[i], texto)
+    return textos
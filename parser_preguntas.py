@@ -0,0 +1,93 @@
+# --- Parser Incremental de Preguntas ---
+# Extrae objetos de pregunta completos de una respuesta JSON que llega por
+# fragmentos (o que está truncada o mal formada al final). Cada objeto se
+# entrega en cuanto se cierra su llave y se valida contra el esquema; los
+# objetos inválidos se descartan sin perder el resto del mazo. Las preguntas
+# dentro de un envoltorio (p. ej. {"preguntas": [...]}) se extraen igual.
+
+import json
+
+CAMPOS_PREGUNTA = ("pregunta", "opciones", "respuesta_correcta", "explicacion")
+
+
+def validar_pregunta(obj):
+    """Indica si `obj` cumple el esquema de una tarjeta."""
+    if not isinstance(obj, dict):
+        return False
+    pregunta, opciones, correcta, explicacion = (obj.get(c) for c in CAMPOS_PREGUNTA)
+    if not all(isinstance(v, str) for v in (pregunta, correcta, explicacion)):
+        return False
+    if not isinstance(opciones, dict) or len(opciones) < 2:
+        return False
+    if not all(isinstance(v, str) and v.strip() for v in opciones.values()):
+        return False
+    return bool(pregunta.strip()) and correcta in opciones
+
+
+class ParserPreguntas:
+    """Parser incremental: `alimentar(fragmento)` devuelve las preguntas válidas completadas."""
+
+    def __init__(self):
+        self._buffer = []      # caracteres del objeto de nivel superior en curso
+        self._abiertos = []    # pila de [llave o corchete, inicio en el buffer, contenía preguntas]
+        self._en_cadena = False
+        self._escape = False
+        self.descartadas = 0
+
+    def alimentar(self, fragmento):
+        completas = []
+        for c in fragmento:
+            if not self._abiertos:
+                # Fuera de un objeto se ignora todo (``` , [ , comas, texto).
+                if c == "{":
+                    self._abiertos.append([c, 0, False])
+                    self._buffer = [c]
+                continue
+
+            self._buffer.append(c)
+            if self._en_cadena:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._en_cadena = False
+                continue
+
+            if c == '"':
+                self._en_cadena = True
+            elif c in "{[":
+                self._abiertos.append([c, len(self._buffer) - 1, False])
+            elif c in "}]":
+                _, inicio, con_preguntas = self._abiertos.pop()
+                padre = self._abiertos[-1] if self._abiertos else None
+                # Candidatos: los objetos de nivel superior y los elementos de una lista
+                # (p. ej. {"preguntas": [...]}); un envoltorio con preguntas no se valida.
+                if c == "}" and not con_preguntas and (padre is None or padre[0] == "["):
+                    pregunta = self._cerrar_objeto("".join(self._buffer[inicio:]))
+                    if pregunta is not None:
+                        completas.append(pregunta)
+                        con_preguntas = True
+                if padre is None:
+                    self._buffer = []
+                elif con_preguntas:
+                    padre[2] = True
+        return completas
+
+    def _cerrar_objeto(self, texto):
+        try:
+            obj = json.loads(texto)
+        except ValueError:
+            self.descartadas += 1
+            return None
+        if not validar_pregunta(obj):
+            self.descartadas += 1
+            return None
+        return obj
+
+
+def extraer_preguntas(texto_respuesta):
+    """Devuelve todas las preguntas válidas de una respuesta completa o parcial."""
+    parser = ParserPreguntas()
+    preguntas = parser.alimentar(texto_respuesta)
+    return preguntas, parser.descartadas
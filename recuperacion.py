@@ -0,0 +1,255 @@
+# --- Índice de Recuperación sobre el Corpus ---
+# Divide el texto de cada fuente en fragmentos contiguos y los representa con
+# TF-IDF sobre términos "hasheados" (palabras y bigramas sin acentos), en una
+# matriz dispersa CSR de NumPy. Como el hashing no necesita vocabulario, cada
+# fuente se indexa por separado al cargarla (incremental) y el IDF se combina
+# al consultar; la búsqueda es un producto disperso más un top-k con
+# argpartition. Los índices se guardan en disco junto a la caché de
+# extracción, bajo el SHA-256 del texto.
+
+import hashlib
+import os
+import re
+import threading
+import unicodedata
+import zlib
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from cache_extraccion import DIRECTORIO_CACHE
+from instrumentacion import tramo
+
+# Cambia cuando cambie la forma de fragmentar o de calcular los términos.
+VERSION_INDICE = "1"
+# Número de "cubos" del hashing de términos (potencia de dos).
+DIMENSIONES = 2 ** 18
+# Tamaño objetivo de cada fragmento (en caracteres).
+CARACTERES_POR_FRAGMENTO = 1500
+# Índices de fuentes que se mantienen cargados en memoria.
+MAX_INDICES_EN_MEMORIA = 64
+BYTES_MAX_DISCO = 512 * 1024 * 1024
+
+PALABRAS_VACIAS = frozenset(
+    "a al ante con como de del desde el en entre es esta este la las le lo los mas "
+    "o para pero por que se sin son su sus un una uno y ya the of and to in is".split()
+)
+
+
+# --- Fragmentación y términos ---
+def fragmentar(texto, caracteres_por_fragmento=CARACTERES_POR_FRAGMENTO):
+    """Parte el texto en fragmentos contiguos (inicio, fin), cortando entre párrafos.
+
+    Los fragmentos cubren el texto sin huecos ni solapes, así que sus posiciones
+    sirven para releerlos del documento original.
+    """
+    cortes = [m.end() for m in re.finditer(r"\n\s*\n", texto)] + [len(texto)]
+    fragmentos = []
+    inicio = 0
+    for corte in cortes:
+        # Párrafos enormes (p. ej. PDFs sin saltos) se cortan en trozos fijos.
+        while corte - inicio > 2 * caracteres_por_fragmento:
+            fragmentos.append((inicio, inicio + caracteres_por_fragmento))
+            inicio += caracteres_por_fragmento
+        if corte - inicio >= caracteres_por_fragmento or corte == len(texto):
+            if corte > inicio:
+                fragmentos.append((inicio, corte))
+            inicio = corte
+    return fragmentos
+
+
+def normalizar(texto):
+    """Minúsculas sin acentos (la ñ pasa a n)."""
+    return unicodedata.normalize("NFKD", texto.lower()).encode("ascii", "ignore").decode("ascii")
+
+
+def terminos(texto):
+    """Palabras significativas y bigramas consecutivos del texto normalizado."""
+    palabras = [p for p in re.findall(r"[a-z0-9]+", normalizar(texto)) if p not in PALABRAS_VACIAS and len(p) > 1]
+    return palabras + [f"{a} {b}" for a, b in zip(palabras, palabras[1:])]
+
+
+def _hash_termino(termino, _cache={}):
+    # crc32 es estable entre procesos (hash() no lo es) y basta para repartir en cubos.
+    cubo = _cache.get(termino)
+    if cubo is None:
+        if len(_cache) > 1_000_000:
+            _cache.clear()
+        cubo = _cache[termino] = zlib.crc32(termino.encode("utf-8")) & (DIMENSIONES - 1)
+    return cubo
+
+
+def vector_terminos(texto):
+    """Cubos y pesos TF (1 + log de la frecuencia) del texto, ordenados por cubo."""
+    cuenta = Counter(_hash_termino(t) for t in terminos(texto))
+    if not cuenta:
+        return np.empty(0, np.int32), np.empty(0, np.float32)
+    cubos = np.fromiter(cuenta.keys(), np.int32, len(cuenta))
+    pesos = 1.0 + np.log(np.fromiter(cuenta.values(), np.float32, len(cuenta)))
+    orden = np.argsort(cubos)
+    return cubos[orden], pesos[orden].astype(np.float32)
+
+
+class IndiceFuente:
+    """Matriz TF dispersa (CSR) de los fragmentos de una fuente y sus posiciones en bytes."""
+
+    __slots__ = ("indices", "datos", "punteros", "posiciones", "cubos_df", "cuentas_df")
+
+    def __init__(self, indices, datos, punteros, posiciones):
+        self.indices = indices      # cubo de cada valor no nulo
+        self.datos = datos          # peso TF de cada valor no nulo
+        self.punteros = punteros    # inicio de cada fragmento en indices/datos
+        self.posiciones = posiciones  # (inicio, fin) en bytes UTF-8 de cada fragmento
+        # Frecuencia documental de la fuente, para combinar el IDF entre fuentes.
+        self.cubos_df, self.cuentas_df = np.unique(indices, return_counts=True)
+
+    @classmethod
+    def construir(cls, texto, caracteres_por_fragmento=CARACTERES_POR_FRAGMENTO):
+        indices, datos, punteros, posiciones = [], [], [0], []
+        posicion_bytes = 0
+        for inicio, fin in fragmentar(texto, caracteres_por_fragmento):
+            fragmento = texto[inicio:fin]
+            cubos, pesos = vector_terminos(fragmento)
+            indices.append(cubos)
+            datos.append(pesos)
+            punteros.append(punteros[-1] + len(cubos))
+            tamano = len(fragmento.encode("utf-8"))
+            posiciones.append((posicion_bytes, posicion_bytes + tamano))
+            posicion_bytes += tamano
+        return cls(
+            np.concatenate(indices) if indices else np.empty(0, np.int32),
+            np.concatenate(datos) if datos else np.empty(0, np.float32),
+            np.array(punteros, dtype=np.int64),
+            np.array(posiciones, dtype=np.int64).reshape(-1, 2),
+        )
+
+    @property
+    def num_fragmentos(self):
+        return len(self.posiciones)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, campo).nbytes for campo in self.__slots__)
+
+
+def buscar_fragmentos(indices, consulta, k=10):
+    """Top-k de fragmentos por similitud coseno TF-IDF entre varias fuentes.
+
+    `indices` es una lista de IndiceFuente; devuelve [(fuente, fragmento, puntuacion)]
+    con la posición de la fuente en la lista, ordenado por puntuación descendente.
+    Los fragmentos sin ningún término de la consulta no se devuelven.
+    """
+    cubos_q, pesos_q = vector_terminos(consulta)
+    total = sum(indice.num_fragmentos for indice in indices)
+    if not len(cubos_q) or not total:
+        return []
+    df = np.zeros(DIMENSIONES, np.float32)
+    for indice in indices:
+        df[indice.cubos_df] += indice.cuentas_df
+    idf = np.log((1 + total) / (1 + df)) + 1.0
+
+    q = np.zeros(DIMENSIONES, np.float32)
+    q[cubos_q] = pesos_q * idf[cubos_q]
+    norma_q = np.linalg.norm(q[cubos_q])
+
+    puntuaciones = []
+    for indice in indices:
+        filas = np.repeat(np.arange(indice.num_fragmentos), np.diff(indice.punteros))
+        pesos = indice.datos * idf[indice.indices]
+        normas = np.sqrt(np.bincount(filas, pesos * pesos, minlength=indice.num_fragmentos))
+        productos = np.bincount(filas, pesos * q[indice.indices], minlength=indice.num_fragmentos)
+        puntuaciones.append(productos / np.maximum(normas * norma_q, 1e-12))
+    todas = np.concatenate(puntuaciones)
+    fuente_de = np.repeat(np.arange(len(indices)), [indice.num_fragmentos for indice in indices])
+    inicio_de = np.concatenate(([0], np.cumsum([indice.num_fragmentos for indice in indices])))
+
+    k = min(k, len(todas))
+    mejores = np.argpartition(-todas, k - 1)[:k]
+    mejores = mejores[np.argsort(-todas[mejores])]
+    return [
+        (int(fuente_de[i]), int(i - inicio_de[fuente_de[i]]), float(todas[i]))
+        for i in mejores
+        if todas[i] > 0
+    ]
+
+
+# --- Almacén de índices (memoria + disco) ---
+def clave_indice(texto):
+    h = hashlib.sha256()
+    h.update(f"indice:{VERSION_INDICE}:{CARACTERES_POR_FRAGMENTO}:{DIMENSIONES}:".encode("utf-8"))
+    h.update(texto.encode("utf-8"))
+    return h.hexdigest()
+
+
+class AlmacenIndices:
+    """Índices de fuentes compartidos por el proceso y persistidos junto a la caché de extracción."""
+
+    def __init__(self, directorio=None, max_en_memoria=MAX_INDICES_EN_MEMORIA, bytes_max_disco=BYTES_MAX_DISCO):
+        self.directorio = os.path.join(directorio or DIRECTORIO_CACHE, "indices")
+        self.max_en_memoria = max_en_memoria
+        self.bytes_max_disco = bytes_max_disco
+        self._memoria = OrderedDict()  # clave -> IndiceFuente
+        self._lock = threading.Lock()
+        os.makedirs(self.directorio, exist_ok=True)
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, f"{clave}.npz")
+
+    def _cargar_de_disco(self, clave):
+        ruta = self._ruta(clave)
+        try:
+            with np.load(ruta) as archivo:
+                indice = IndiceFuente(
+                    archivo["indices"], archivo["datos"], archivo["punteros"], archivo["posiciones"]
+                )
+        except (FileNotFoundError, OSError, ValueError, KeyError):
+            return None
+        os.utime(ruta)
+        return indice
+
+    def _guardar_en_disco(self, clave, indice):
+        ruta = self._ruta(clave)
+        temporal = f"{ruta}.{threading.get_ident()}.tmp"
+        with open(temporal, "wb") as f:
+            np.savez(
+                f, indices=indice.indices, datos=indice.datos,
+                punteros=indice.punteros, posiciones=indice.posiciones,
+            )
+        os.replace(temporal, ruta)
+        self._desalojar_disco()
+
+    def _desalojar_disco(self):
+        """Elimina los índices usados hace más tiempo hasta volver al presupuesto."""
+        entradas = sorted(
+            (e for e in os.scandir(self.directorio) if e.is_file() and e.name.endswith(".npz")),
+            key=lambda e: e.stat().st_mtime,
+        )
+        ocupados = sum(e.stat().st_size for e in entradas)
+        for entrada in entradas:
+            if ocupados <= self.bytes_max_disco:
+                break
+            try:
+                tamano = entrada.stat().st_size
+                os.remove(entrada.path)
+                ocupados -= tamano
+            except FileNotFoundError:
+                pass
+
+    def indexar(self, texto):
+        """Devuelve el índice del texto, construyéndolo solo si no está en memoria ni en disco."""
+        clave = clave_indice(texto)
+        with self._lock:
+            indice = self._memoria.get(clave)
+            if indice is not None:
+                self._memoria.move_to_end(clave)
+                return indice
+        indice = self._cargar_de_disco(clave)
+        if indice is None:
+            with tramo("recuperacion.indexar"):
+                indice = IndiceFuente.construir(texto)
+            self._guardar_en_disco(clave, indice)
+        with self._lock:
+            self._memoria[clave] = indice
+            while len(self._memoria) > self.max_en_memoria:
+                self._memoria.popitem(last=False)
+        return indice
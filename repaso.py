@@ -0,0 +1,198 @@
+# --- Repaso Espaciado (SM-2) ---
+# Registra el resultado de cada respuesta por tarjeta y mantiene un montículo
+# (heap) con el vencimiento de todas las tarjetas del usuario, de todos sus
+# mazos. Elegir la siguiente tarjeta pendiente es O(log n): las entradas
+# obsoletas del heap se descartan de forma perezosa al llegar a la cima. El
+# número de pendientes también se cuenta desde la cima, con un tope.
+#
+# El estado se persiste en la tabla `repasos` de la base de datos de la
+# biblioteca; al borrar un mazo, sus estados se borran en cascada.
+
+import heapq
+import sqlite3
+import threading
+import time
+
+SEGUNDOS_POR_DIA = 86400
+FACILIDAD_INICIAL = 2.5
+FACILIDAD_MINIMA = 1.3
+# Calidad SM-2 (0-5) asignada a cada resultado de la página de estudio.
+CALIDAD_ACIERTO = 4
+CALIDAD_FALLO = 1
+
+
+class EstadoRepaso:
+    __slots__ = ("facilidad", "intervalo", "repeticiones", "vence", "aciertos", "fallos", "version")
+
+    def __init__(self, vence, facilidad=FACILIDAD_INICIAL, intervalo=0.0, repeticiones=0, aciertos=0, fallos=0):
+        self.facilidad = facilidad
+        self.intervalo = intervalo  # días
+        self.repeticiones = repeticiones
+        self.vence = vence          # timestamp
+        self.aciertos = aciertos
+        self.fallos = fallos
+        self.version = 0
+
+
+def aplicar_sm2(estado, calidad, ahora):
+    """Actualiza `estado` según el algoritmo SM-2 para una respuesta de calidad 0-5."""
+    if calidad < 3:
+        estado.repeticiones = 0
+        estado.intervalo = 1.0
+        estado.fallos += 1
+    else:
+        if estado.repeticiones == 0:
+            estado.intervalo = 1.0
+        elif estado.repeticiones == 1:
+            estado.intervalo = 6.0
+        else:
+            estado.intervalo = estado.intervalo * estado.facilidad
+        estado.repeticiones += 1
+        estado.aciertos += 1
+    estado.facilidad = max(
+        FACILIDAD_MINIMA, estado.facilidad + 0.1 - (5 - calidad) * (0.08 + (5 - calidad) * 0.02)
+    )
+    estado.vence = ahora + estado.intervalo * SEGUNDOS_POR_DIA
+
+
+class AlmacenRepasos:
+    """Persistencia del estado de repaso en la base de datos de la biblioteca."""
+
+    def __init__(self, ruta):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(ruta, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS repasos ("
+            " tarjeta_id INTEGER PRIMARY KEY REFERENCES tarjetas(id) ON DELETE CASCADE,"
+            " facilidad REAL NOT NULL, intervalo REAL NOT NULL, repeticiones INTEGER NOT NULL,"
+            " vence REAL NOT NULL, aciertos INTEGER NOT NULL, fallos INTEGER NOT NULL)"
+        )
+        self._db.commit()
+
+    def cargar(self, usuario, desde_id=0):
+        """Estados de las tarjetas del usuario con id > desde_id; las nuevas vencen al crearse su mazo."""
+        with self._lock:
+            filas = self._db.execute(
+                "SELECT t.id, m.creado, r.facilidad, r.intervalo, r.repeticiones, r.vence, r.aciertos, r.fallos"
+                " FROM tarjetas t JOIN mazos m ON m.id = t.mazo_id"
+                " LEFT JOIN repasos r ON r.tarjeta_id = t.id"
+                " WHERE m.usuario = ? AND t.id > ?",
+                (usuario, desde_id),
+            ).fetchall()
+        for tarjeta_id, creado, facilidad, intervalo, repeticiones, vence, aciertos, fallos in filas:
+            if facilidad is None:
+                yield tarjeta_id, EstadoRepaso(creado)
+            else:
+                yield tarjeta_id, EstadoRepaso(vence, facilidad, intervalo, repeticiones, aciertos, fallos)
+
+    def guardar(self, tarjeta_id, estado):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO repasos"
+                " (tarjeta_id, facilidad, intervalo, repeticiones, vence, aciertos, fallos)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (tarjeta_id, estado.facilidad, estado.intervalo, estado.repeticiones,
+                 estado.vence, estado.aciertos, estado.fallos),
+            )
+
+
+class PlanificadorRepaso:
+    """Cola de prioridad de tarjetas por vencimiento, para un usuario."""
+
+    def __init__(self, almacen=None, usuario=""):
+        self.almacen = almacen
+        self.usuario = usuario
+        self._estados = {}  # tarjeta_id -> EstadoRepaso
+        self._heap = []     # (vence, tarjeta_id, version)
+        self._ultimo_id = 0
+        self._lock = threading.Lock()
+        self.sincronizar()
+
+    def sincronizar(self):
+        """Incorpora las tarjetas creadas desde la última carga."""
+        if self.almacen is None:
+            return
+        with self._lock:
+            for tarjeta_id, estado in self.almacen.cargar(self.usuario, self._ultimo_id):
+                self._estados[tarjeta_id] = estado
+                self._heap.append((estado.vence, tarjeta_id, estado.version))
+                self._ultimo_id = max(self._ultimo_id, tarjeta_id)
+            heapq.heapify(self._heap)
+
+    def reiniciar(self):
+        """Vuelve a cargar los estados desde la base de datos (p. ej. tras borrar un mazo)."""
+        with self._lock:
+            self._estados = {}
+            self._heap = []
+            self._ultimo_id = 0
+        self.sincronizar()
+
+    def agregar(self, tarjeta_id, ahora=None):
+        """Añade una tarjeta nueva, pendiente desde `ahora`."""
+        with self._lock:
+            if tarjeta_id in self._estados:
+                return
+            estado = EstadoRepaso(time.time() if ahora is None else ahora)
+            self._estados[tarjeta_id] = estado
+            heapq.heappush(self._heap, (estado.vence, tarjeta_id, estado.version))
+
+    def olvidar(self, tarjeta_id):
+        """Quita una tarjeta (p. ej. de un mazo borrado); su entrada del heap caduca sola."""
+        with self._lock:
+            self._estados.pop(tarjeta_id, None)
+
+    def registrar(self, tarjeta_id, es_correcta, ahora=None):
+        """Registra una respuesta y reprograma la tarjeta. O(log n)."""
+        ahora = time.time() if ahora is None else ahora
+        with self._lock:
+            estado = self._estados.get(tarjeta_id)
+            if estado is None:
+                estado = self._estados[tarjeta_id] = EstadoRepaso(ahora)
+            aplicar_sm2(estado, CALIDAD_ACIERTO if es_correcta else CALIDAD_FALLO, ahora)
+            estado.version += 1
+            heapq.heappush(self._heap, (estado.vence, tarjeta_id, estado.version))
+            if len(self._heap) > 2 * len(self._estados) + 1024:
+                self._compactar()
+        if self.almacen is not None:
+            self.almacen.guardar(tarjeta_id, estado)
+        return estado
+
+    def _compactar(self):
+        """Reconstruye el heap sin entradas obsoletas. O(n), amortizado entre registros."""
+        self._heap = [(e.vence, tarjeta_id, e.version) for tarjeta_id, e in self._estados.items()]
+        heapq.heapify(self._heap)
+
+    def _entrada_valida(self, entrada):
+        estado = self._estados.get(entrada[1])
+        return estado is not None and estado.version == entrada[2]
+
+    def siguiente(self, ahora=None):
+        """Id de la tarjeta pendiente que venció antes, o None. O(log n) amortizado."""
+        ahora = time.time() if ahora is None else ahora
+        with self._lock:
+            while self._heap and not self._entrada_valida(self._heap[0]):
+                heapq.heappop(self._heap)
+            if self._heap and self._heap[0][0] <= ahora:
+                return self._heap[0][1]
+            return None
+
+    def proximas(self, n, ahora=None):
+        """Hasta `n` ids de tarjetas pendientes, por orden de vencimiento. O(n log N)."""
+        ahora = time.time() if ahora is None else ahora
+        elegidas = []
+        with self._lock:
+            while self._heap and len(elegidas) < n and self._heap[0][0] <= ahora:
+                entrada = heapq.heappop(self._heap)
+                if self._entrada_valida(entrada):
+                    elegidas.append(entrada)
+            for entrada in elegidas:
+                heapq.heappush(self._heap, entrada)
+        return [tarjeta_id for _, tarjeta_id, _ in elegidas]
+
+    def num_pendientes(self, maximo, ahora=None):
+        """Tarjetas pendientes, contadas desde la cima del heap hasta `maximo`. O(maximo log n)."""
+        return len(self.proximas(maximo, ahora))
+
+    def __len__(self):
+        return len(self._estados)
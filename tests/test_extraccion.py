@@ -0,0 +1,41 @@
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+pptx = pytest.importorskip("pptx")
+
+from extraccion import extraer_texto_pptx
+
+
+def presentacion(quitar_cuerpo_notas=False):
+    prs = pptx.Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[1])
+    slide.shapes.title.text = "Gasto cardíaco"
+    slide.placeholders[1].text_frame.text = "Frecuencia × volumen sistólico"
+    marco = slide.notes_slide.notes_text_frame
+    marco.text = "Recordar la ley de Frank-Starling."
+    if quitar_cuerpo_notas:
+        forma = marco._txBody.getparent()
+        forma.getparent().remove(forma)
+    destino = io.BytesIO()
+    prs.save(destino)
+    return destino.getvalue()
+
+
+def test_notas_de_la_diapositiva():
+    texto = extraer_texto_pptx(io.BytesIO(presentacion()), max_workers=1)
+    assert "Gasto cardíaco" in texto
+    assert "Recordar la ley de Frank-Starling." in texto
+
+
+def test_notas_sin_marcador_de_cuerpo():
+    datos = presentacion(quitar_cuerpo_notas=True)
+    assert pptx.Presentation(io.BytesIO(datos)).slides[0].notes_slide.notes_text_frame is None
+    texto = extraer_texto_pptx(io.BytesIO(datos), max_workers=1)
+    assert not texto.startswith("Error")
+    assert "Frecuencia × volumen sistólico" in texto
+    assert "Frank-Starling" not in texto
@@ -0,0 +1,85 @@
+import json
+import os
+import re
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from generacion import ErrorGeneracion, dividir_en_secciones, generar_mazo, repartir_preguntas
+
+
+class ModeloFalso:
+    """Responde con N preguntas JSON por sección; `falla` y `repetidas` controlan su comportamiento."""
+
+    def __init__(self, falla=(), repetidas=False):
+        self.falla = set(falla)
+        self.repetidas = repetidas
+        self.secciones = []
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt_parts):
+        prompt = "\n".join(prompt_parts)
+        n = int(re.search(r"Genera (\d+) preguntas", prompt).group(1))
+        seccion = int(re.search(r"Sección (\d+)\.", prompt).group(1))
+        with self._lock:
+            self.secciones.append(seccion)
+        if seccion in self.falla:
+            raise TimeoutError(f"sección {seccion}")
+        origen = "común" if self.repetidas else f"la sección {seccion}"
+        return "```json\n" + json.dumps([
+            {
+                "pregunta": f"¿Pregunta {i} sobre {origen}?",
+                "opciones": {"A": "uno", "B": "dos"},
+                "respuesta_correcta": "A",
+                "explicacion": "Porque sí.",
+            }
+            for i in range(n)
+        ], ensure_ascii=False) + "\n```"
+
+
+def material(secciones):
+    # Un párrafo por sección: cada uno llena una sección de max_caracteres.
+    return "\n\n".join(f"Sección {i}. " + "El gasto cardíaco depende de la precarga. " * 10 for i in range(secciones))
+
+
+MAX_CARACTERES = 500
+
+
+def test_repartir_preguntas():
+    assert repartir_preguntas(10, 4) == {0: 3, 1: 3, 2: 2, 3: 2}
+    assert sum(repartir_preguntas(500, 37).values()) == 500
+    # Menos preguntas que secciones: una por sección, repartidas por todo el documento.
+    assert repartir_preguntas(3, 9) == {0: 1, 3: 1, 6: 1}
+    assert repartir_preguntas(5, 0) == {}
+
+
+def test_una_seccion_por_llamada():
+    texto = material(6)
+    assert len(dividir_en_secciones(texto, MAX_CARACTERES)) == 6
+    modelo = ModeloFalso()
+    mazo = generar_mazo(texto, modelo, 12, "Medio", "Fisiología", max_caracteres=MAX_CARACTERES)
+    assert len(mazo) == 12
+    assert sorted(modelo.secciones) == list(range(6))
+
+
+def test_deduplica_entre_secciones():
+    modelo = ModeloFalso(repetidas=True)
+    mazo = generar_mazo(material(4), modelo, 8, "Medio", "Fisiología", max_caracteres=MAX_CARACTERES)
+    # Cada sección devuelve las mismas dos preguntas: solo quedan dos.
+    assert sorted(p["pregunta"] for p in mazo) == ["¿Pregunta 0 sobre común?", "¿Pregunta 1 sobre común?"]
+
+
+def test_una_seccion_fallida_conserva_el_resto():
+    modelo = ModeloFalso(falla={2})
+    mazo = generar_mazo(material(4), modelo, 8, "Medio", "Fisiología", max_caracteres=MAX_CARACTERES)
+    assert len(mazo) == 6
+    assert not any("sección 2" in p["pregunta"] for p in mazo)
+
+
+def test_todas_las_secciones_fallan():
+    with pytest.raises(ErrorGeneracion):
+        generar_mazo(material(3), ModeloFalso(falla={0, 1, 2}), 6, "Medio", "Fisiología",
+                     max_caracteres=MAX_CARACTERES)
@@ -0,0 +1,55 @@
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from biblioteca import BibliotecaMazos
+from intercambio import MAGIA, ErrorIntercambio, exportar_biblioteca, importar_biblioteca
+
+
+def pregunta(i):
+    return {
+        "pregunta": f"¿Qué efecto tiene el factor {i} sobre el gasto cardíaco?",
+        "opciones": {"A": f"Lo aumenta ({i})", "B": f"Lo reduce ({i})"},
+        "respuesta_correcta": "A",
+        "explicacion": f"Explicación de la pregunta {i}.",
+    }
+
+
+@pytest.fixture
+def biblioteca(tmp_path):
+    biblioteca = BibliotecaMazos(str(tmp_path / "biblioteca.sqlite"))
+    biblioteca.guardar("origen", "Cardio", [pregunta(i) for i in range(40)])
+    biblioteca.guardar("origen", "Neuro", [pregunta(i) for i in range(40, 80)])
+    return biblioteca
+
+
+def exportado(biblioteca):
+    destino = io.BytesIO()
+    exportar_biblioteca(biblioteca, "origen", destino, compresion="gzip")
+    return destino.getvalue()
+
+
+def test_ida_y_vuelta(biblioteca):
+    resumen = importar_biblioteca(biblioteca, "destino", io.BytesIO(exportado(biblioteca)))
+    assert [(nombre, tarjetas) for nombre, _, tarjetas in resumen.mazos] == [("Cardio", 40), ("Neuro", 40)]
+    assert resumen.descartadas == 0
+
+
+def test_archivo_gzip_dañado(biblioteca):
+    datos = exportado(biblioteca)
+    # Cuerpo comprimido: tras la cabecera .mflash y la de gzip (10 bytes), sin los últimos bytes del flujo.
+    inicio = len(MAGIA) + 2 + len("gzip") + 10
+    for posicion in range(inicio, len(datos) - 16, max(1, (len(datos) - 16 - inicio) // 25)):
+        dañado = bytearray(datos)
+        dañado[posicion] ^= 0xFF
+        with pytest.raises(ErrorIntercambio):
+            importar_biblioteca(biblioteca, "destino", io.BytesIO(bytes(dañado)))
+
+
+def test_no_es_un_mflash(biblioteca):
+    with pytest.raises(ErrorIntercambio):
+        importar_biblioteca(biblioteca, "destino", io.BytesIO(b"PK\x03\x04 no es una biblioteca"))
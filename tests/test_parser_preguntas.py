@@ -0,0 +1,36 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from parser_preguntas import ParserPreguntas, extraer_preguntas
+
+
+def pregunta(i):
+    return {
+        "pregunta": f"¿Pregunta {i}?",
+        "opciones": {"A": "uno", "B": "dos"},
+        "respuesta_correcta": "B",
+        "explicacion": "Porque sí.",
+    }
+
+
+def test_lista_de_nivel_superior():
+    texto = "```json\n" + json.dumps([pregunta(0), pregunta(1)], ensure_ascii=False) + "\n```"
+    assert extraer_preguntas(texto) == ([pregunta(0), pregunta(1)], 0)
+
+
+def test_envoltorio_con_lista_de_preguntas():
+    texto = json.dumps({"preguntas": [pregunta(0), {"pregunta": ""}, pregunta(1)]}, ensure_ascii=False)
+    assert extraer_preguntas(texto) == ([pregunta(0), pregunta(1)], 1)
+
+
+def test_envoltorio_por_fragmentos_y_truncado():
+    texto = json.dumps({"mazo": {"preguntas": [pregunta(0), pregunta(1), pregunta(2)]}}, ensure_ascii=False)
+    parser = ParserPreguntas()
+    completas = []
+    for i in range(0, len(texto) - 40, 7):
+        completas += parser.alimentar(texto[i:i + 7])
+    assert completas == [pregunta(0), pregunta(1)]
+    assert parser.descartadas == 0
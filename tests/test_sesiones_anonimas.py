@@ -0,0 +1,56 @@
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from adaptativo import AlmacenAdaptativo
+from biblioteca import BibliotecaMazos
+from estadisticas import RegistroRespuestas
+from repaso import AlmacenRepasos, PlanificadorRepaso
+
+DIA = 86400
+
+
+def pregunta(i):
+    return {"pregunta": f"¿Pregunta {i}?", "opciones": {"A": "uno", "B": "dos"},
+            "respuesta_correcta": "A", "explicacion": "Porque sí."}
+
+
+def test_purgar_sesiones_anonimas_inactivas(tmp_path):
+    ruta = str(tmp_path / "biblioteca.sqlite")
+    biblioteca = BibliotecaMazos(ruta)
+    registro = RegistroRespuestas(str(tmp_path))
+    adaptativo = AlmacenAdaptativo(ruta)
+    for usuario in ("ana", "anonimo:inactivo", "anonimo:activo"):
+        biblioteca.guardar(usuario, f"Cardio - {usuario}", [pregunta(i) for i in range(3)])
+        planificador = PlanificadorRepaso(AlmacenRepasos(ruta), usuario)
+        for tarjeta in biblioteca.cargar(usuario, f"Cardio - {usuario}"):
+            planificador.registrar(tarjeta.id, True)
+            registro.registrar(usuario, f"Cardio - {usuario}", tarjeta.id, True, 1.0)
+        adaptativo.guardar(usuario, None, [("Cardio", 0.0, 3, 3, 0.0)])
+    hace_dos_dias = time.time() - 2 * DIA
+    with sqlite3.connect(ruta) as db:
+        db.execute("UPDATE mazos SET creado = ?", (hace_dos_dias,))
+    biblioteca.registrar_actividad("anonimo:inactivo", hace_dos_dias)
+    biblioteca.registrar_actividad("anonimo:activo")
+
+    usuarios = biblioteca.purgar_inactivos("anonimo:", time.time() - DIA)
+    adaptativo.olvidar_usuarios(usuarios)
+    assert usuarios == ["anonimo:inactivo"]
+    assert registro.olvidar_usuarios(usuarios) == 3
+
+    assert biblioteca.nombres("anonimo:inactivo") == []
+    assert biblioteca.nombres("ana") == ["Cardio - ana"]
+    with sqlite3.connect(ruta) as db:
+        assert db.execute("SELECT COUNT(*) FROM repasos").fetchone()[0] == 6
+        assert db.execute("SELECT DISTINCT usuario FROM adaptativo_temas ORDER BY usuario").fetchall() == [
+            ("ana",), ("anonimo:activo",)]
+    # El registro compactado se relee igual y sin rastro del usuario borrado.
+    releido = RegistroRespuestas(str(tmp_path))
+    assert "anonimo:inactivo" not in releido._valores["usuario"]
+    assert releido.resumen("ana")["respuestas"] == 3
+    assert releido.resumen("anonimo:activo")["respuestas"] == 3
+    registro.registrar("ana", "Cardio - ana", None, False, 1.0)
+    assert RegistroRespuestas(str(tmp_path)).resumen("ana")["respuestas"] == 4
@@ -0,0 +1,236 @@
+# --- Verificación Incremental por Secciones ---
+# El análisis de precisión ("🔬 Analizar Precisión") se hace por secciones:
+# cada sección se identifica por el hash de su texto (y del modelo y versión
+# del prompt) y su informe 🟢/🟡/🔴 se guarda bajo ese hash. Al volver a
+# analizar, solo las secciones nuevas o modificadas se envían al modelo (en
+# llamadas concurrentes); el informe se recompone con las partes cacheadas y
+# las nuevas, así que el coste y la latencia son proporcionales a lo que cambió.
+#
+# Los cortes entre secciones dependen del contenido (del hash de cada línea),
+# no de posiciones fijas: insertar o editar un párrafo solo cambia su sección
+# (y a lo sumo la siguiente) en lugar de desplazar todas las posteriores.
+#
+# Como el prompt se repite en cada sección, es corto y pide solo los puntos
+# 🟡/🔴; el veredicto global se compone aquí a partir de los informes, sin otra
+# llamada al modelo. Los informes solo se guardan en la caché de informes (las
+# llamadas no pasan por la caché de respuestas del cliente).
+
+import contextvars
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from cache_extraccion import DIRECTORIO_CACHE
+from cliente_modelo import CacheRespuestas, MedicionLatencia
+from generacion import MAX_LLAMADAS_CONCURRENTES
+from instrumentacion import tramo
+
+# Cambia cuando cambie el prompt (invalida los informes guardados).
+VERSION_VERIFICACION = "2"
+# Límites de tamaño de una sección (en caracteres).
+MIN_CARACTERES_SECCION = 1500
+MAX_CARACTERES_SECCION = 8000
+# Se corta tras una línea cuyo hash es múltiplo de esto (≈ una de cada 16 líneas).
+DIVISOR_CORTE = 16
+TTL_INFORMES = 30 * 24 * 3600  # segundos
+ICONOS = ("🟢", "🟡", "🔴")
+PALABRAS_TITULO = 8
+
+
+def crear_cache_informes():
+    """Informes por sección, persistidos junto a la caché de respuestas del modelo."""
+    os.makedirs(DIRECTORIO_CACHE, exist_ok=True)
+    return CacheRespuestas(os.path.join(DIRECTORIO_CACHE, "verificaciones.sqlite"), ttl=TTL_INFORMES)
+
+
+# --- División estable ---
+def _es_corte(linea):
+    resumen = hashlib.blake2b(linea.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(resumen, "big") % DIVISOR_CORTE == 0
+
+
+def dividir_secciones_estables(texto, min_caracteres=MIN_CARACTERES_SECCION, max_caracteres=MAX_CARACTERES_SECCION):
+    """Secciones de líneas consecutivas con cortes definidos por el contenido.
+
+    Se corta tras una línea "de corte" (según su hash) si la sección ya tiene
+    `min_caracteres`, o antes de superar `max_caracteres`.
+    """
+    secciones = []
+    actual = []
+    longitud = 0
+
+    def cerrar():
+        nonlocal actual, longitud
+        seccion = "\n".join(actual).strip()
+        if seccion:
+            secciones.append(seccion)
+        actual, longitud = [], 0
+
+    for linea in texto.split("\n"):
+        # Líneas enormes (p. ej. PDFs sin saltos) se cortan en trozos fijos.
+        while len(linea) > max_caracteres:
+            cerrar()
+            secciones.append(linea[:max_caracteres])
+            linea = linea[max_caracteres:]
+        if longitud + len(linea) > max_caracteres:
+            cerrar()
+        actual.append(linea)
+        longitud += len(linea) + 1
+        if longitud >= min_caracteres and linea.strip() and _es_corte(linea.strip()):
+            cerrar()
+    cerrar()
+    return secciones
+
+
+def clave_seccion(nombre_modelo, seccion):
+    """Hash de la sección (con espacios normalizados), del modelo y de la versión del prompt."""
+    normalizada = " ".join(seccion.split())
+    return hashlib.sha256(
+        f"verificacion:{VERSION_VERIFICACION}\x1e{nombre_modelo}\x1e{normalizada}".encode("utf-8")
+    ).hexdigest()
+
+
+def construir_prompt_verificacion(seccion):
+    # Solo depende del texto de la sección (ni su número ni el total), para que su informe sea reutilizable.
+    return [
+        "Revisa la precisión científica y la claridad de estos apuntes de medicina.",
+        f"Texto a revisar:\n---\n{seccion}\n---\n",
+        "Enumera solo los puntos 🟡 y 🔴 (🟡 incompleto o poco claro, 🔴 incorrecto), uno por línea en Markdown, "
+        "con una corrección breve y su fuente (Harrison, ILAE...). Si no hay ninguno, responde solo: 🟢 Sin observaciones.",
+    ]
+
+
+# --- Informe ---
+class InformeVerificacion:
+    """Informe de un texto por secciones: las cacheadas se rellenan al crearlo; el resto, al verificar."""
+
+    def __init__(self, texto, nombre_modelo, cache=None):
+        self.secciones = dividir_secciones_estables(texto)
+        self.claves = [clave_seccion(nombre_modelo, seccion) for seccion in self.secciones]
+        self.informes = [cache.obtener(clave) if cache is not None else None for clave in self.claves]
+        self.desde_cache = [informe is not None for informe in self.informes]
+        self.parciales = [[] for _ in self.secciones]  # fragmentos recibidos de las secciones en curso
+        self.errores = {}                               # índice -> excepción
+        self.mediciones = {}                            # índice -> MedicionLatencia
+
+    @property
+    def pendientes(self):
+        """Índices de las secciones sin informe, sin repetir las de texto idéntico."""
+        vistas = set()
+        indices = []
+        for i, clave in enumerate(self.claves):
+            if self.informes[i] is None and i not in self.errores and clave not in vistas:
+                vistas.add(clave)
+                indices.append(i)
+        return indices
+
+    @property
+    def reutilizadas(self):
+        return sum(self.desde_cache)
+
+    @property
+    def analizadas(self):
+        return sum(1 for i, informe in enumerate(self.informes) if informe is not None and not self.desde_cache[i])
+
+    def calificacion(self, i):
+        """Marca más grave del informe de la sección i (🟢 si no tiene observaciones), o None si no está."""
+        informe = self.informes[i]
+        if informe is None:
+            return None
+        return next((icono for icono in reversed(ICONOS) if icono in informe), ICONOS[0])
+
+    def recuento(self):
+        """Secciones terminadas según su marca más grave: 🟢/🟡/🔴 -> lista de números de sección."""
+        recuento = {icono: [] for icono in ICONOS}
+        for i in range(len(self.secciones)):
+            icono = self.calificacion(i)
+            if icono is not None:
+                recuento[icono].append(i + 1)
+        return recuento
+
+    def veredicto(self):
+        """Resumen global del texto a partir de los informes por sección."""
+        verdes, amarillas, rojas = self.recuento().values()
+        if rojas:
+            return f"🔴 Hay errores que corregir en {_enumerar(rojas)}."
+        if amarillas:
+            return f"🟡 Correcto en general; conviene aclarar {_enumerar(amarillas)}."
+        if verdes:
+            return "🟢 Sin errores ni puntos dudosos en las secciones analizadas."
+        return "⏳ Analizando..."
+
+    def markdown(self):
+        """Informe recompuesto en el orden del texto (las secciones en curso, con lo recibido hasta ahora)."""
+        recuento = self.recuento()
+        partes = [
+            f"**Veredicto:** {self.veredicto()}",
+            f"**Resumen:** {' · '.join(f'{icono} {len(n)}' for icono, n in recuento.items())} secciones — "
+            f"{len(self.secciones)} en total: {self.reutilizadas} sin cambios, {self.analizadas} analizadas ahora",
+        ]
+        for i, seccion in enumerate(self.secciones):
+            palabras = seccion.split()
+            titulo = " ".join(palabras[:PALABRAS_TITULO]) + ("…" if len(palabras) > PALABRAS_TITULO else "")
+            marca = " · ♻️ sin cambios" if self.desde_cache[i] else ""
+            partes.append(f"#### Sección {i + 1} de {len(self.secciones)}{marca}\n_{titulo}_")
+            if self.informes[i] is not None:
+                partes.append(self.informes[i])
+            elif i in self.errores:
+                partes.append(f"⚠️ No se pudo analizar esta sección: {self.errores[i]}")
+            else:
+                partes.append("⏳ _Analizando..._ " + "".join(self.parciales[i]))
+        return "\n\n".join(partes)
+
+
+def _enumerar(numeros, maximo=8):
+    texto = ", ".join(map(str, numeros[:maximo])) + (f" y {len(numeros) - maximo} más" if len(numeros) > maximo else "")
+    return f"la sección {texto}" if len(numeros) == 1 else f"las secciones {texto}"
+
+
+def _repetidas(informe, i):
+    return [j for j, clave in enumerate(informe.claves) if clave == informe.claves[i]]
+
+
+def verificar_secciones(informe, cliente, cache=None, max_workers=MAX_LLAMADAS_CONCURRENTES,
+                        al_avanzar=None, cancelado=None):
+    """Analiza las secciones pendientes del informe en llamadas concurrentes y guarda sus informes.
+
+    `al_avanzar()` se llama con cada fragmento recibido; `cancelado()` se
+    consulta entre fragmentos. Si ninguna sección tiene informe y todas las
+    analizadas fallaron, se relanza el primer error.
+    """
+    pendientes = informe.pendientes
+
+    def verificar(i):
+        with tramo("prompt.verificacion"):
+            prompt_parts = construir_prompt_verificacion(informe.secciones[i])
+        medicion = informe.mediciones[i] = MedicionLatencia()
+        try:
+            for fragmento in cliente.generar_stream(prompt_parts, medicion=medicion, usar_cache=False):
+                informe.parciales[i].append(fragmento)
+                if al_avanzar:
+                    al_avanzar()
+                if cancelado and cancelado():
+                    return
+            texto = "".join(informe.parciales[i])
+            if cache is not None:
+                cache.guardar(informe.claves[i], texto)
+        except Exception as e:
+            # Los errores no se cachean: la sección se reintenta en el próximo análisis.
+            for j in _repetidas(informe, i):
+                informe.errores[j] = e
+        else:
+            # Las secciones repetidas en el texto reciben el mismo informe.
+            for j in _repetidas(informe, i):
+                informe.informes[j] = texto
+        if al_avanzar:
+            al_avanzar()
+
+    if pendientes:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pendientes)))) as pool:
+            # Cada hilo hereda el contexto (sesión y trabajo actuales, para la instrumentación).
+            futuros = [pool.submit(contextvars.copy_context().run, verificar, i) for i in pendientes]
+            for futuro in futuros:
+                futuro.result()
+    if informe.errores and not any(informe.informes):
+        raise next(iter(informe.errores.values()))
+    return informe